@@ -0,0 +1,63 @@
+"""
+Latency of solve_equation for degree 2 to 4 with the closed-form formulas (no
+engine given) against the bisection engine, on random polynomials from known
+roots and on equations as they are usually written.
+
+Run from the api directory: python -m benchmark.closed_form_benchmark
+"""
+import random
+import time
+
+from benchmark.root_engine_benchmark import make_polynomial
+from solver import closed_form
+from solver.polynomial import parse_to_polynomial
+from solver.solve import solve_equation, convert_from_epsilon_to_n_digit
+
+DEGREES = [2, 3, 4]
+POLYNOMIALS_PER_DEGREE = 200
+EPSILON = 0.00001
+REPEAT = 200
+
+EXPRESSIONS = ["x^2-1=8", "x^2+2.5*x+1.5", "x^2-2*x+1", "x^3+x=100", "x^4-4*x^2+20*x-7", "x^4/4-x^2/2"]
+
+
+def time_solve(polynomials: list, engine) -> float:
+    start = time.perf_counter()
+    for polynomial in polynomials:
+        solve_equation(polynomial, EPSILON, engine)
+    return (time.perf_counter() - start) / len(polynomials)
+
+
+def main():
+    n_digits = convert_from_epsilon_to_n_digit(EPSILON)
+    rng = random.Random(0)
+    print("degree  closed form   bisection  speedup  fallbacks  agree")
+    for degree in DEGREES:
+        polynomials = [make_polynomial(degree, rng)[0] for _ in range(POLYNOMIALS_PER_DEGREE)]
+        closed_form_time = time_solve(polynomials, None)
+        bisection_time = time_solve(polynomials, "bisection")
+        fallbacks = sum(closed_form.find_real_roots(polynomial.get_full_coefficient()) is None
+                        for polynomial in polynomials)
+        agree = sum([round(root, n_digits) for root in solve_equation(polynomial, EPSILON)] ==
+                    [round(root, n_digits) for root in solve_equation(polynomial, EPSILON, "bisection")]
+                    for polynomial in polynomials)
+        print("{:>6}  {:>8.1f} us  {:>7.1f} us  {:>6.1f}x  {:>9}  {:>3}/{}".format(
+            degree, closed_form_time * 1e6, bisection_time * 1e6, bisection_time / closed_form_time,
+            fallbacks, agree, len(polynomials)))
+
+    print()
+    print("{:<20}  closed form   bisection  speedup".format("expression"))
+    for expression in EXPRESSIONS:
+        if "=" in expression:
+            left, right = expression.split("=")
+            polynomial = parse_to_polynomial(left).minus(parse_to_polynomial(right))
+        else:
+            polynomial = parse_to_polynomial(expression)
+        closed_form_time = time_solve([polynomial] * REPEAT, None)
+        bisection_time = time_solve([polynomial] * REPEAT, "bisection")
+        print("{:<20}  {:>8.1f} us  {:>7.1f} us  {:>6.1f}x".format(
+            expression, closed_form_time * 1e6, bisection_time * 1e6, bisection_time / closed_form_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Time of the detection post-processing, remove_negatives and decode_detection,
+with the NumPy views over the DETECTION array against the ctypes loop over
+every detection and class it replaces, on synthetic frames of increasing
+density with the 29 classes of yolo.names.
+
+Run from the api directory: DARKNET_PATH=<dir of libdarknet.so> python -m benchmark.detection_benchmark
+"""
+import random
+import time
+from ctypes import POINTER, c_float, cast
+
+from processor import darknet
+
+CLASS_COUNT = 29
+DETECTION_COUNTS = [10, 100, 1000, 5000]
+REPEAT = 20
+
+
+def make_detections(num: int, rng: random.Random):
+    """
+    `num` detections with one or two classes above zero each, the way NMS leaves them.
+    Returns the pointer and the buffers that have to stay alive with it.
+    """
+    detections = (darknet.DETECTION * num)()
+    probs = []
+    for detection in detections:
+        prob = (c_float * CLASS_COUNT)()
+        for _ in range(rng.randint(1, 2)):
+            prob[rng.randrange(CLASS_COUNT)] = rng.random()
+        probs.append(prob)
+        detection.bbox = darknet.BOX(rng.uniform(0, 608), rng.uniform(0, 608), rng.uniform(5, 50), rng.uniform(5, 50))
+        detection.prob = cast(prob, POINTER(c_float))
+    return cast(detections, POINTER(darknet.DETECTION)), (detections, probs)
+
+
+def remove_negatives_loop(detections, class_names, num):
+    predictions = []
+    for j in range(num):
+        for idx, name in enumerate(class_names):
+            if detections[j].prob[idx] > 0:
+                bbox = detections[j].bbox
+                bbox = (bbox.x, bbox.y, bbox.w, bbox.h)
+                predictions.append((name, detections[j].prob[idx], (bbox)))
+    return predictions
+
+
+def decode_detection_strings(detections):
+    decoded = []
+    for label, confidence, bbox in detections:
+        confidence = str(round(confidence * 100, 2))
+        decoded.append((str(label), confidence, bbox))
+    return decoded
+
+
+def time_call(function, *args) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        function(*args)
+    return (time.perf_counter() - start) / REPEAT
+
+
+def main():
+    rng = random.Random(0)
+    class_names = [str(index) for index in range(CLASS_COUNT)]
+    print("detections   ctypes loop    NumPy views  speedup  same")
+    for num in DETECTION_COUNTS:
+        detections, _buffers = make_detections(num, rng)
+        loop_time = time_call(lambda: decode_detection_strings(remove_negatives_loop(detections, class_names, num)))
+        numpy_time = time_call(lambda: darknet.decode_detection(darknet.remove_negatives(detections, class_names, num)))
+        same = remove_negatives_loop(detections, class_names, num) == \
+            darknet.remove_negatives(detections, class_names, num)
+        print("{:>10}  {:>9.2f} ms  {:>10.2f} ms  {:>6.1f}x  {}".format(
+            num, loop_time * 1e3, numpy_time * 1e3, loop_time / numpy_time, same))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Per-image time of detect_image against detect_image_rows with
+decode_detection_rows, and of the post-processing alone (boxes, NMS and
+export, without the forward pass), plus the batch path batch_detection had
+before (network_predict_batch over every slot, then do_nms_sort and
+remove_negatives per image) against network_detection_rows per image.
+
+The network is a randomly initialized stand-in with the heads of yolo.cfg,
+three yolo layers of 76x76, 38x38 and 19x19 cells over 30 classes, behind
+strided convolutions so the forward pass stays small next to the
+post-processing. Lower thresholds let more of its boxes through as
+candidates: remove_negatives copies the probabilities of every candidate,
+while the rows only carry the classes left after NMS.
+
+Run from the api directory: DARKNET_PATH=<dir of libdarknet.so> python -m benchmark.detection_rows_benchmark
+"""
+import tempfile
+import time
+
+import numpy as np
+
+from processor import darknet
+
+SIZE = 608
+CLASS_COUNT = 30
+BATCH_SIZE = 4
+THRESHOLDS = [.6, .55, .5, .45, .4]
+REPEAT = 20
+HEAD = ["[convolutional]", "filters={}".format(3 * (5 + CLASS_COUNT)), "size={size}", "stride={size}",
+        "activation=linear",
+        "[yolo]", "mask={mask}", "anchors=12,16,19,36,40,28,36,75,76,55,72,146,142,110,192,243,459,401",
+        "classes={}".format(CLASS_COUNT), "num=9"]
+CFG = "\n".join(["[net]", "batch={batch}", "width={}".format(SIZE), "height={}".format(SIZE), "channels=3",
+                 "[convolutional]", "filters=8", "size=8", "stride=8", "activation=leaky"]
+                + [line.format(size=1, mask="0,1,2") for line in HEAD] + ["[route]", "layers=0"]
+                + [line.format(size=2, mask="3,4,5") for line in HEAD] + ["[route]", "layers=0"]
+                + [line.format(size=4, mask="6,7,8") for line in HEAD])
+
+
+def load_stand_in(batch_size: int):
+    with tempfile.NamedTemporaryFile("w", suffix=".cfg") as cfg_file:
+        cfg_file.write(CFG.format(batch=batch_size))
+        cfg_file.flush()
+        return darknet.load_net_custom(cfg_file.name.encode("ascii"), b"", 0, batch_size)
+
+
+def post_process_structs(network, class_names, thresh):
+    # detect_image after predict_image
+    pnum = darknet.pointer(darknet.c_int(0))
+    detections = darknet.get_network_boxes(network, SIZE, SIZE, thresh, .5, None, 0, pnum, 0)
+    num = pnum[0]
+    darknet.do_nms_sort(detections, num, len(class_names), .45)
+    predictions = darknet.decode_detection(darknet.remove_negatives(detections, class_names, num))
+    darknet.free_detections(detections, num)
+    return sorted(predictions, key=lambda x: x[1])
+
+
+def post_process_rows(network, class_names, thresh):
+    rows = darknet.network_detection_rows(network, len(class_names), SIZE, SIZE, thresh)
+    return darknet.decode_detection_rows(rows, class_names)
+
+
+def batch_structs(network, image, class_names, count, thresh):
+    batch_detections = darknet.network_predict_batch(network, image, BATCH_SIZE, SIZE, SIZE, thresh, .5, None, 0, 0)
+    batch_predictions = []
+    for index in range(count):
+        num = batch_detections[index].num
+        detections = batch_detections[index].dets
+        darknet.do_nms_sort(detections, num, len(class_names), .45)
+        predictions = darknet.decode_detection(darknet.remove_negatives(detections, class_names, num))
+        batch_predictions.append(sorted(predictions, key=lambda x: x[1]))
+    darknet.free_batch_detections(batch_detections, BATCH_SIZE)
+    return batch_predictions
+
+
+def batch_rows(network, image, class_names, count, thresh):
+    darknet.network_predict(network, image.data)
+    return [darknet.decode_detection_rows(darknet.network_detection_rows(
+        network, len(class_names), SIZE, SIZE, thresh, batch=index), class_names) for index in range(count)]
+
+
+def time_call(function, *args) -> float:
+    function(*args)
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        function(*args)
+    return (time.perf_counter() - start) / REPEAT
+
+
+def main():
+    class_names = ["class {}".format(index) for index in range(CLASS_COUNT)]
+    rng = np.random.default_rng(0)
+    data = rng.random((BATCH_SIZE, 3, SIZE, SIZE), dtype=np.float32)
+    image = darknet.IMAGE(SIZE, SIZE, 3, data.ctypes.data_as(darknet.POINTER(darknet.c_float)))
+
+    network = load_stand_in(1)
+    print("thresh  candidates  detections  post-process ms  rows ms  speedup  detect_image ms  rows ms")
+    for thresh in THRESHOLDS:
+        predictions = darknet.detect_image(network, class_names, image, thresh=thresh)
+        rows = darknet.detect_image_rows(network, class_names, image, thresh=thresh)
+        assert darknet.decode_detection_rows(rows, class_names) == predictions
+        pnum = darknet.pointer(darknet.c_int(0))
+        darknet.free_detections(darknet.get_network_boxes(network, SIZE, SIZE, thresh, .5, None, 0, pnum, 0), pnum[0])
+        post_structs_time = time_call(post_process_structs, network, class_names, thresh)
+        post_rows_time = time_call(post_process_rows, network, class_names, thresh)
+        structs_time = time_call(lambda: darknet.detect_image(network, class_names, image, thresh=thresh))
+        rows_time = time_call(lambda: darknet.decode_detection_rows(
+            darknet.detect_image_rows(network, class_names, image, thresh=thresh), class_names))
+        print("{:>6}  {:>10}  {:>10}  {:>15.2f}  {:>7.2f}  {:>6.1f}x  {:>15.2f}  {:>7.2f}".format(
+            thresh, pnum[0], len(predictions), post_structs_time * 1e3, post_rows_time * 1e3,
+            post_structs_time / post_rows_time, structs_time * 1e3, rows_time * 1e3))
+    darknet.free_network_ptr(network)
+
+    network = load_stand_in(BATCH_SIZE)
+    print("\nbatch of {}, images  network_predict_batch ms  rows ms  speedup".format(BATCH_SIZE))
+    for count in [1, BATCH_SIZE]:
+        assert batch_rows(network, image, class_names, count, .5) == batch_structs(network, image, class_names,
+                                                                                   count, .5)
+        structs_time = time_call(batch_structs, network, image, class_names, count, .5)
+        rows_time = time_call(batch_rows, network, image, class_names, count, .5)
+        print("{:>18}  {:>24.2f}  {:>7.2f}  {:>6.1f}x".format(count, structs_time * 1e3, rows_time * 1e3,
+                                                             structs_time / rows_time))
+    darknet.free_network_ptr(network)
+
+
+if __name__ == '__main__':
+    main()
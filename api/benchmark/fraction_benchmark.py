@@ -0,0 +1,98 @@
+"""
+Time convert_detections_to_expression on synthetic worksheets made of a row of
+fractions, nested fractions and powers, and on deeply nested continued fractions.
+
+Run from the api directory: python -m benchmark.fraction_benchmark
+"""
+import random
+import time
+
+from processor.object_to_string import convert_detections_to_expression, ExpressionMemo
+
+SYMBOL_COUNTS = [50, 100, 200, 400]
+NESTING_DEPTHS = [2, 4, 6, 8]
+REPEAT = 3
+
+
+def make_fraction(x: float, nested: bool) -> list:
+    """
+    One fraction "1/2" drawn at x, or "(x+1)/(3/4)" when nested.
+    Coordinates are relative to a 1x1 image like the darknet detections.
+    """
+    if not nested:
+        return [
+            ("1", 0.9, (x + 0.004, 0.44, 0.004, 0.06)),
+            ("-", 0.9, (x + 0.004, 0.5, 0.008, 0.005)),
+            ("2", 0.9, (x + 0.004, 0.56, 0.004, 0.06)),
+        ], x + 0.01
+    return [
+        ("x", 0.9, (x + 0.004, 0.44, 0.004, 0.04)),
+        ("+", 0.9, (x + 0.01, 0.44, 0.004, 0.03)),
+        ("1", 0.9, (x + 0.016, 0.44, 0.004, 0.06)),
+        ("-", 0.9, (x + 0.01, 0.5, 0.02, 0.005)),
+        ("3", 0.9, (x + 0.01, 0.54, 0.003, 0.03)),
+        ("-", 0.9, (x + 0.01, 0.575, 0.006, 0.003)),
+        ("4", 0.9, (x + 0.01, 0.61, 0.003, 0.03)),
+    ], x + 0.022
+
+
+def make_worksheet(symbol_count: int) -> list:
+    rng = random.Random(symbol_count)
+    detections = []
+    x = 0.0
+    while len(detections) < symbol_count:
+        fraction, x = make_fraction(x, rng.random() < 0.3)
+        detections += fraction
+        if rng.random() < 0.3:
+            detections += [("x", 0.9, (x + 0.004, 0.5, 0.004, 0.04)), ("2", 0.9, (x + 0.009, 0.465, 0.003, 0.025))]
+            x += 0.012
+        detections.append(("+", 0.9, (x + 0.004, 0.5, 0.004, 0.03)))
+        x += 0.01
+    # scale the row back into the image
+    return [(label, confidence, (cx / x, cy, w / x, h)) for label, confidence, (cx, cy, w, h) in detections[:-1]]
+
+
+def make_continued_fraction(depth: int, left=0.0, right=1.0, center_y=0.5, height=0.4) -> list:
+    """
+    1/(1+1/(1+...1/2)) nested `depth` times, each level drawn at half the size below the previous bar
+    """
+    center_x = (left + right) / 2
+    width = right - left
+    detections = [
+        ("1", 0.9, (center_x, center_y - height / 4, 0.01 * height, height / 4)),
+        ("-", 0.9, (center_x, center_y, width * 0.98, height / 60)),
+    ]
+    if depth == 0:
+        detections.append(("2", 0.9, (center_x, center_y + height / 4, 0.01 * height, height / 4)))
+        return detections
+    detections.append(("1", 0.9, (left + width * 0.05, center_y + height / 4, 0.01 * height, height / 4)))
+    detections.append(("+", 0.9, (left + width * 0.12, center_y + height / 4, 0.01 * height, height / 8)))
+    return detections + make_continued_fraction(depth - 1, left + width * 0.2, right,
+                                                center_y + height / 4, height / 2)
+
+
+def measure(detections: list):
+    best = float("inf")
+    for _ in range(REPEAT):
+        memo = ExpressionMemo()
+        start = time.perf_counter()
+        expression = convert_detections_to_expression(list(detections), memo)
+        best = min(best, time.perf_counter() - start)
+    return best, expression, memo
+
+
+def main():
+    for symbol_count in SYMBOL_COUNTS:
+        detections = make_worksheet(symbol_count)
+        best, expression, memo = measure(detections)
+        print("{} symbols: {:.1f} ms ({} chars, {} sub-lists reused)".format(
+            len(detections), best * 1000, len(expression), memo.hits))
+
+    for depth in NESTING_DEPTHS:
+        detections = make_continued_fraction(depth)
+        best, expression, memo = measure(detections)
+        print("nesting depth {}: {:.1f} ms ({} sub-lists reused)".format(depth, best * 1000, memo.hits))
+
+
+if __name__ == '__main__':
+    main()
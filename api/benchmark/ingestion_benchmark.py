@@ -0,0 +1,95 @@
+"""
+Decode time and peak RSS of turning an uploaded 12 megapixel phone photo
+into the 608x608 network input: the path the upload handlers and
+image_detection took before (full PIL decode, asarray, RGB to BGR, BGR to RGB
+again, resize) against processor.ingestion.decode_image. Peak RSS is measured
+in a fresh process per path, over the RSS the process had before decoding
+(Linux only).
+
+Run from the api directory: python -m benchmark.ingestion_benchmark
+"""
+import io
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+import PIL.Image
+
+from processor.ingestion import EXIF_ORIENTATION, decode_image
+
+WIDTH = 608
+HEIGHT = 608
+PHOTO_SIZE = (4032, 3024)
+REPEAT = 10
+
+
+def make_photo() -> bytes:
+    rng = np.random.default_rng(0)
+    width, height = PHOTO_SIZE
+    # paper-like background with dark strokes and some sensor noise
+    pixels = np.full((height, width, 3), 225, dtype=np.uint8)
+    for _ in range(300):
+        x, y = rng.integers(0, width - 200), rng.integers(0, height - 40)
+        cv2.line(pixels, (int(x), int(y)), (int(x) + 200, int(y) + 40), (30, 30, 40), 12)
+    pixels = cv2.add(pixels, rng.integers(0, 12, size=pixels.shape, dtype=np.uint8))
+    exif = PIL.Image.Exif()
+    exif[EXIF_ORIENTATION] = 6
+    output = io.BytesIO()
+    PIL.Image.fromarray(pixels).save(output, "JPEG", quality=90, exif=exif.tobytes())
+    return output.getvalue()
+
+
+def decode_full(data: bytes) -> np.ndarray:
+    image = PIL.Image.open(io.BytesIO(data))
+    parsed_array = cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2BGR)
+    image_rgb = cv2.cvtColor(parsed_array, cv2.COLOR_BGR2RGB)
+    return cv2.resize(image_rgb, (WIDTH, HEIGHT), interpolation=cv2.INTER_LINEAR)
+
+
+def decode_to_network_size(data: bytes) -> np.ndarray:
+    return decode_image(data, WIDTH, HEIGHT)
+
+
+PATHS = {"before": decode_full, "after": decode_to_network_size}
+
+
+def read_rss_kib(field: str) -> int:
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+
+def measure_peak_rss(path: str, data: bytes) -> float:
+    # importing cv2 peaks above what a decode adds, so the high water mark is reset first (Linux only)
+    with open("/proc/self/clear_refs", "w") as clear_refs:
+        clear_refs.write("5")
+    baseline = read_rss_kib("VmRSS")
+    PATHS[path](data)
+    return (read_rss_kib("VmHWM") - baseline) / 1024
+
+
+def main():
+    if len(sys.argv) == 2:
+        print(measure_peak_rss(sys.argv[1], sys.stdin.buffer.read()))
+        return
+
+    data = make_photo()
+    print("{}x{} JPEG, {:.1f} MB, EXIF orientation 6".format(*PHOTO_SIZE, len(data) / 1e6))
+    print("path    decode ms  peak RSS MB")
+    for path, function in PATHS.items():
+        function(data)
+        start = time.perf_counter()
+        for _ in range(REPEAT):
+            function(data)
+        decode_time = (time.perf_counter() - start) / REPEAT
+        peak_rss = float(subprocess.run([sys.executable, "-m", "benchmark.ingestion_benchmark", path], input=data,
+                                        stdout=subprocess.PIPE, check=True).stdout)
+        print("{:<6}  {:>9.1f}  {:>11.1f}".format(path, decode_time * 1e3, peak_rss))
+
+
+if __name__ == '__main__':
+    main()
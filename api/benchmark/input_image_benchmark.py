@@ -0,0 +1,60 @@
+"""
+Time to load one BGR frame into the 608x608 darknet input of the network,
+with the per-call path image_detection used (make_image, cvtColor of the
+full frame, resize, tobytes, copy_image_from_bytes, free_image) against the
+InputImage buffer kept per pooled network, plus the bytes each path
+allocates and writes per frame besides the input IMAGE itself.
+
+Run from the api directory: DARKNET_PATH=<dir of libdarknet.so> python -m benchmark.input_image_benchmark
+"""
+import time
+
+import cv2
+import numpy as np
+
+from processor import darknet
+from processor.input_image import InputImage
+
+WIDTH = 608
+HEIGHT = 608
+FRAME_SIZES = [(608, 608), (1280, 720), (1920, 1080), (4032, 3024)]
+REPEAT = 50
+
+
+def load_with_copies(frame: np.ndarray):
+    darknet_image = darknet.make_image(WIDTH, HEIGHT, 3)
+    image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    image_resized = cv2.resize(image_rgb, (WIDTH, HEIGHT), interpolation=cv2.INTER_LINEAR)
+    darknet.copy_image_from_bytes(darknet_image, image_resized.tobytes())
+    darknet.free_image(darknet_image)
+
+
+def time_per_frame(function, frame: np.ndarray) -> float:
+    function(frame)
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        function(frame)
+    return (time.perf_counter() - start) / REPEAT
+
+
+def main():
+    rng = np.random.default_rng(0)
+    input_image = InputImage(WIDTH, HEIGHT)
+    resized_bytes = WIDTH * HEIGHT * 3
+    print("frame        copies ms  buffer ms  speedup  copies MB  buffer MB")
+    for width, height in FRAME_SIZES:
+        frame = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+        copies_time = time_per_frame(load_with_copies, frame)
+        buffer_time = time_per_frame(input_image.write, frame)
+        same_size = (width, height) == (WIDTH, HEIGHT)
+        # cvtColor output, resize output, its tobytes copy and the float IMAGE made for the call
+        copies_bytes = frame.nbytes + resized_bytes * 2 + resized_bytes * 4
+        buffer_bytes = 0 if same_size else resized_bytes
+        print("{:>4}x{:<4}  {:>10.2f}  {:>9.2f}  {:>6.1f}x  {:>9.1f}  {:>9.1f}".format(
+            width, height, copies_time * 1e3, buffer_time * 1e3, copies_time / buffer_time,
+            copies_bytes / 1e6, buffer_bytes / 1e6))
+    input_image.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Per-call latency of convert_infix_to_latex, which now renders the solver's
+expression tree, against the pytexit.py2tex conversion it replaces, and the
+time the first import of pytexit took. pytexit is no longer imported by the
+api, it has to be installed for this comparison. Besides byte for byte, the
+renderings are compared without the spaces and the braces around a number
+base, which pytexit writes and LaTeX does not display.
+
+Run from the api directory: python -m benchmark.latex_benchmark
+"""
+import re
+import time
+
+from benchmark.parser_benchmark import RECORDED_EXPRESSIONS, make_corpus
+from processor.object_to_string import convert_infix_to_latex, normalize_expression
+from solver.expression_tree import parse_equation, convert_equation_to_latex
+
+REPEAT = 3
+
+
+def convert_with_pytexit(polynomial: str) -> str:
+    import pytexit
+    polynomial = polynomial.replace("^", "**")
+    result = ""
+    list_polynomial = polynomial.split("=")
+    for i in range(0, len(list_polynomial)):
+        polynomial = pytexit.py2tex(list_polynomial[i], print_latex=False, print_formula=False)
+        end = len(polynomial) - 2
+        if i == 0:
+            result = f"{polynomial[2:end]}"
+        else:
+            result = f"{result}={polynomial[2:end]}"
+    return f'$${result}$$'
+
+
+def strip_layout(latex: str) -> str:
+    return re.sub(r"\{([\d.]+)\}\^", r"\1^", latex.replace(" ", ""))
+
+
+def time_per_expression(function, corpus: list) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        for expression in corpus:
+            function(expression)
+    return (time.perf_counter() - start) / REPEAT / len(corpus)
+
+
+def main():
+    start = time.perf_counter()
+    import pytexit  # noqa: F401
+    print("import pytexit        {:>8.1f} ms".format((time.perf_counter() - start) * 1e3))
+
+    corpus = [normalize_expression(expression) for expression in RECORDED_EXPRESSIONS] + make_corpus()
+    renderings = [(convert_infix_to_latex(expression), convert_with_pytexit(expression)) for expression in corpus]
+    same = sum(tree_latex == pytexit_latex for tree_latex, pytexit_latex in renderings)
+    same_layout = sum(strip_layout(tree_latex) == strip_layout(pytexit_latex)
+                      for tree_latex, pytexit_latex in renderings)
+    print("{} expressions, {} rendered byte for byte like pytexit, {} up to spaces and braces".format(
+        len(corpus), same, same_layout))
+
+    pytexit_time = time_per_expression(convert_with_pytexit, corpus)
+    tree_time = time_per_expression(convert_infix_to_latex, corpus)
+    parsed = [parse_equation(expression) for expression in corpus]
+    render_time = time_per_expression(convert_equation_to_latex, parsed)
+    print("pytexit.py2tex        {:>8.1f} us".format(pytexit_time * 1e6))
+    print("parse + render        {:>8.1f} us  {:.0f}x".format(tree_time * 1e6, pytexit_time / tree_time))
+    print("render a parsed tree  {:>8.1f} us  {:.0f}x".format(render_time * 1e6, pytexit_time / render_time))
+
+
+if __name__ == '__main__':
+    main()
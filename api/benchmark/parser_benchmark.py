@@ -0,0 +1,93 @@
+"""
+Parse time per expression of the single-pass scanner and Pratt parser of
+solver.expression_tree against the three passes it replaces
+(convert_to_token_list, the sign rewrite inside it, convert_infix_to_postfix),
+and of parse_to_polynomial as a whole. The corpus is the expressions read
+from the test images, normalized the way algorithm.process does, and random
+expressions in the same style.
+
+Run from the api directory: python -m benchmark.parser_benchmark
+"""
+import random
+import time
+
+from processor.object_to_string import normalize_expression
+from solver.convert_to_postfix import convert_infix_to_postfix
+from solver.convert_to_token_list import convert_to_token_list
+from solver.error import EvaluationError
+from solver.expression_tree import parse_expression, convert_tree_to_postfix
+from solver.polynomial import parse_to_polynomial
+
+RECORDED_EXPRESSIONS = [
+    "x+(1/2)x^2=5", "(1/2)x^2-1+(x^2)/3", "x^2+(1/2)x-(x^2+(1/x)x)/((3/2)x^3-1)", "(3+x^2-(1/2)x)/(3/(x^3)+2x-3+5x)",
+    "3x/3-1+(3+2x^2+3/5)/(1/6-5)+1/6", "(1/2)^2", "x^(x+(1/2)x)-1", "3+(1/2)^(x^(x+(1/2)x)-1)", "4=x^2",
+    "2x^2-3(x+1)=0", "3x-2=0", "x^11+2x^(x+1)", "x^((1/2)x^2-3/2)", "(x^(3-x/2))/(x^2+1)", "3^2.(x^3-1)",
+    "(1-3x^2)(x+1)=0", "(2x^10-3x^2)(5x+1)=0", "(x+1)*(x-2)*2.5-3*(x^2-1)*2=0",
+]
+GENERATED_EXPRESSIONS = 5000
+REPEAT = 5
+
+
+def make_expression(rng: random.Random, depth: int = 0) -> str:
+    if depth > 2 or rng.random() < 0.3:
+        return rng.choice(["x", str(rng.randint(1, 12)), "{}.{}".format(rng.randint(0, 9), rng.randint(1, 99))])
+    left, right = make_expression(rng, depth + 1), make_expression(rng, depth + 1)
+    choice = rng.random()
+    if choice < 0.35:
+        return "{}{}{}".format(left, rng.choice("+-"), right)
+    if choice < 0.6:
+        return "{}*{}".format(left, right)
+    if choice < 0.7:
+        return "({})/({})".format(left, right)
+    if choice < 0.85:
+        return "({})^{}".format(left, rng.randint(2, 4))
+    if choice < 0.95:
+        return "({})".format(left)
+    return "-{}".format(left)
+
+
+def make_corpus() -> list:
+    rng = random.Random(0)
+    corpus = []
+    for expression in RECORDED_EXPRESSIONS:
+        corpus.extend(normalize_expression(expression).split("="))
+    corpus.extend(make_expression(rng) for _ in range(GENERATED_EXPRESSIONS))
+    return corpus
+
+
+def time_per_expression(function, corpus: list) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        for expression in corpus:
+            function(expression)
+    return (time.perf_counter() - start) / REPEAT / len(corpus)
+
+
+def parse_in_passes(expression: str):
+    return convert_infix_to_postfix(convert_to_token_list(expression))
+
+
+def expand(expression: str):
+    # x in a denominator or an exponent is rejected after parsing, which is part of the cost
+    try:
+        return parse_to_polynomial(expression)
+    except EvaluationError:
+        return None
+
+
+def main():
+    corpus = make_corpus()
+    agree = sum(convert_tree_to_postfix(parse_expression(expression)) == parse_in_passes(expression)
+                for expression in corpus)
+    print("{} expressions, {:.1f} characters on average, {} parsed alike".format(
+        len(corpus), sum(map(len, corpus)) / len(corpus), agree))
+
+    passes_time = time_per_expression(parse_in_passes, corpus)
+    tree_time = time_per_expression(parse_expression, corpus)
+    print("token list + postfix  {:>7.2f} us".format(passes_time * 1e6))
+    print("scanner + Pratt tree  {:>7.2f} us  {:.1f}x".format(tree_time * 1e6, passes_time / tree_time))
+    print("parse_to_polynomial   {:>7.2f} us".format(time_per_expression(expand, corpus) * 1e6))
+
+
+if __name__ == '__main__':
+    main()
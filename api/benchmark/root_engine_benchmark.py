@@ -0,0 +1,98 @@
+"""
+Compare the root engines of solver.solve on random polynomials of degree 2 to 30
+built from known real roots and quadratic factors without real roots, and on a
+corpus of clustered and repeated roots.
+
+Run from the api directory: python -m benchmark.root_engine_benchmark
+"""
+import random
+import time
+
+from solver.polynomial import Polynomial, select_backend, parse_to_polynomial
+from solver.solve import solve_equation, ROOT_ENGINES, convert_from_epsilon_to_n_digit
+
+DEGREES = [2, 3, 5, 8, 12, 16, 20, 25, 30]
+POLYNOMIALS_PER_DEGREE = 20
+EPSILON = 0.00001
+REPEAT = 5
+
+# (expression, distinct real roots)
+CLUSTERED_AND_REPEATED_ROOTS = [
+    ("(x-1)^2*(x+2)", [-2, 1]),
+    ("(x^2-1)^2", [-1, 1]),
+    ("(x-3)^2*(x^2+1)", [3]),
+    ("(x-1)^3*(x-2)^2", [1, 2]),
+    ("(x-0.5)^4*(x+0.5)^2", [-0.5, 0.5]),
+    ("(x-2)^6", [2]),
+    ("x^3*(x-1)^4*(x+1)^2", [-1, 0, 1]),
+    ("(x-1)*(x-1.01)*(x-1.02)", [1, 1.01, 1.02]),
+    ("(x-1)*(x-1.001)*(x-1.002)*(x-1.003)", [1, 1.001, 1.002, 1.003]),
+    ("(x-1)^2*(x-1.01)^2*(x-1.02)", [1, 1.01, 1.02]),
+    ("(x+1)^5*(x-1)^5", [-1, 1]),
+    ("(x-0.25)^3*(x-0.2501)", [0.25, 0.2501]),
+]
+
+
+def make_polynomial(degree: int, rng: random.Random):
+    """
+    Random polynomial of `degree` with real roots at least 0.2 apart in [-5, 5],
+    padded with irreducible quadratic factors.
+    """
+    real_root_count = rng.randint(1, degree)
+    if (degree - real_root_count) % 2:
+        real_root_count -= 1
+    roots = sorted(rng.sample(range(-25, 26), real_root_count))
+    polynomial = Polynomial({0: rng.choice([-3, -2, -1, 1, 2, 3])})
+    for root in roots:
+        polynomial = polynomial.multiply(Polynomial({1: 1, 0: -root / 5}))
+    for _ in range((degree - real_root_count) // 2):
+        center = rng.uniform(-3, 3)
+        spread = rng.uniform(0.5, 2)
+        polynomial = polynomial.multiply(Polynomial({2: 1, 1: -2 * center, 0: center * center + spread * spread}))
+    return select_backend(polynomial), [root / 5 for root in roots]
+
+
+def main():
+    n_digits = convert_from_epsilon_to_n_digit(EPSILON)
+    rng = random.Random(0)
+    print("degree  " + "  ".join("{:>14}".format(engine) for engine in ROOT_ENGINES) + "  agree  exact")
+    for degree in DEGREES:
+        cases = [make_polynomial(degree, rng) for _ in range(POLYNOMIALS_PER_DEGREE)]
+        times = {}
+        results = {}
+        for engine in ROOT_ENGINES:
+            start = time.perf_counter()
+            results[engine] = [solve_equation(polynomial, EPSILON, engine) for polynomial, roots in cases]
+            times[engine] = (time.perf_counter() - start) / len(cases)
+
+        rounded = {engine: [[round(root, n_digits) for root in roots] for roots in engine_results]
+                   for engine, engine_results in results.items()}
+        engines = list(ROOT_ENGINES)
+        agree = sum(all(rounded[engine][index] == rounded[engines[0]][index] for engine in engines)
+                    for index in range(len(cases)))
+        exact = {engine: sum(rounded[engine][index] == [round(root, n_digits) for root in cases[index][1]]
+                             for index in range(len(cases)))
+                 for engine in engines}
+        print("{:>6}  ".format(degree) +
+              "  ".join("{:>11.2f} ms".format(times[engine] * 1000) for engine in engines) +
+              "  {:>2}/{}  ".format(agree, len(cases)) +
+              " ".join("{}={}".format(engine[0], exact[engine]) for engine in engines))
+
+    print()
+    print("{:<36}".format("clustered and repeated roots") + "  ".join("{:>10}".format(engine) for engine in ROOT_ENGINES))
+    for expression, expected_roots in CLUSTERED_AND_REPEATED_ROOTS:
+        polynomial = parse_to_polynomial(expression)
+        cells = []
+        for engine in ROOT_ENGINES:
+            start = time.perf_counter()
+            for _ in range(REPEAT):
+                roots = solve_equation(polynomial, EPSILON, engine)
+            elapsed = (time.perf_counter() - start) / REPEAT
+            found = [round(root, n_digits) for root in roots] == expected_roots
+            cells.append("{:>7.2f} ms{}".format(elapsed * 1000, " " if found else "*"))
+        print("{:<36}".format(expression) + " ".join(cells))
+    print("* roots differ from the expected distinct roots")
+
+
+if __name__ == '__main__':
+    main()
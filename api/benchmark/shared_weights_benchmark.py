@@ -0,0 +1,69 @@
+"""
+Resident memory and load time of the handles of a network pool over
+yolo.cfg, each loaded with load_network as before against one loaded network
+and clone_network for the others. Randomly initialized, no weights file is
+read. Each pool is built in a fresh process; the memory is the RSS over the
+process before loading, once loaded and at its peak while loading (Linux
+only).
+
+Run from the api directory: DARKNET_PATH=<dir of libdarknet.so> python -m benchmark.shared_weights_benchmark
+"""
+import subprocess
+import sys
+import time
+
+from processor import darknet
+
+CONFIG_FILE = "yolo.cfg"
+DATA_FILE = "yolo.data"
+POOL_SIZES = [1, 2, 4]
+
+
+def read_rss_kib(field: str) -> int:
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+
+def load_pool(path: str, size: int) -> list:
+    network, _, _ = darknet.load_network(CONFIG_FILE, DATA_FILE, "")
+    networks = [network]
+    for _ in range(size - 1):
+        if path == "clone":
+            networks.append(darknet.clone_network(network, CONFIG_FILE))
+        else:
+            networks.append(darknet.load_network(CONFIG_FILE, DATA_FILE, "")[0])
+    return networks
+
+
+def measure(path: str, size: int) -> str:
+    # importing numpy and loading the library peak above nothing, the high water mark is reset first
+    with open("/proc/self/clear_refs", "w") as clear_refs:
+        clear_refs.write("5")
+    baseline = read_rss_kib("VmRSS")
+    start = time.perf_counter()
+    load_pool(path, size)
+    load_time = time.perf_counter() - start
+    return "{} {} {}".format(load_time, (read_rss_kib("VmRSS") - baseline) / 1024,
+                             (read_rss_kib("VmHWM") - baseline) / 1024)
+
+
+def main():
+    if len(sys.argv) == 3:
+        # darknet prints while parsing, the result is the last line
+        print("\n" + measure(sys.argv[1], int(sys.argv[2])))
+        return
+
+    print("handles  path   load s  RSS MB  peak RSS MB")
+    for size in POOL_SIZES:
+        for path in ["load", "clone"]:
+            output = subprocess.run([sys.executable, "-m", "benchmark.shared_weights_benchmark", path, str(size)],
+                                    stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True).stdout
+            load_time, rss, peak_rss = map(float, output.decode().split("\n")[-2].split())
+            print("{:>7}  {:<5}  {:>6.1f}  {:>6.0f}  {:>11.0f}".format(size, path, load_time, rss, peak_rss))
+
+
+if __name__ == '__main__':
+    main()
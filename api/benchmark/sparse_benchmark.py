@@ -0,0 +1,56 @@
+"""
+Latency of solve_equation on sparse high-degree polynomials with the sparse
+path (few terms kept in a dictionary, roots found from the derivative's
+roots term by term) against the dense path every polynomial of degree 16 and
+up took before: a NumPy coefficient array solved by the bisection engine.
+
+Run from the api directory: python -m benchmark.sparse_benchmark
+"""
+import time
+
+from solver.polynomial import DensePolynomial, parse_to_polynomial
+from solver.solve import solve_equation, convert_from_epsilon_to_n_digit
+
+EPSILON = 0.00001
+REPEAT = 5
+
+EXPRESSIONS = [
+    "x^50-3*x^20+x^3-0.5",
+    "x^60-x^59-1",
+    "x^100-2*x^37+1/2",
+    "x^101-x^53+x^7-1",
+    "x^200-1",
+    "(x^3+1)^20",
+    "x^500-7*x^250+x-3",
+    "x^999-3*x^500+x",
+]
+
+
+def time_solve(polynomial, engine) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        roots = solve_equation(polynomial, EPSILON, engine)
+    return (time.perf_counter() - start) / REPEAT, roots
+
+
+def main():
+    n_digits = convert_from_epsilon_to_n_digit(EPSILON)
+    print("{:<22}  {:>6}  {:>5}      sparse        dense  speedup  agree".format("expression", "degree", "terms"))
+    for expression in EXPRESSIONS:
+        polynomial = parse_to_polynomial(expression)
+        sparse_time, sparse_roots = time_solve(polynomial, None)
+        try:
+            dense_time, dense_roots = time_solve(DensePolynomial.from_polynomial(polynomial), "bisection")
+        except Exception as e:
+            print("{:<22}  {:>6}  {:>5}  {:>8.2f} ms  {}".format(
+                expression, polynomial.get_highest_degree(), len(polynomial.dictionary), sparse_time * 1e3,
+                type(e).__name__))
+            continue
+        agree = [round(root, n_digits) for root in sparse_roots] == [round(root, n_digits) for root in dense_roots]
+        print("{:<22}  {:>6}  {:>5}  {:>8.2f} ms  {:>8.2f} ms  {:>6.1f}x  {}".format(
+            expression, polynomial.get_highest_degree(), len(polynomial.dictionary), sparse_time * 1e3,
+            dense_time * 1e3, dense_time / sparse_time, agree))
+
+
+if __name__ == '__main__':
+    main()
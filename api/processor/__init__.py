@@ -1 +1 @@
-__all__ = ["algorithm", "darknet", "object_to_string"]
+__all__ = ["algorithm", "batch_scheduler", "darknet", "network_pool", "object_to_string"]
@@ -3,26 +3,30 @@ import unittest
 import cv2
 
 from processor import darknet
-from processor.object_to_string import convert_detections_to_expression, normalize_expression, convert_infix_to_latex
-from solver import solve
+from processor.batch_scheduler import get_batch_scheduler
+from processor.detection_cache import get_detection_cache, get_image_digest
+from processor.ingestion import decode_image
+from processor.network_pool import get_network_pool
+from processor.object_to_string import convert_detections_to_expression, normalize_expression
 from solver.error import ExpressionSyntaxError, EvaluationError
-from solver.solve import INFINITE_NUMBER_OF_ROOTS
+from solver.expression_tree import convert_equation_to_latex, parse_equation
+from solver.result_cache import get_result_cache
+from solver.solve import INFINITE_NUMBER_OF_ROOTS, solve_parsed_equation
 
 
-def image_detection(image, network, class_names, class_colors, thresh):
-    width = darknet.network_width(network)
-    height = darknet.network_height(network)
-    darknet_image = darknet.make_image(width, height, 3)
+def image_detection(image, pooled_network, thresh):
+    # the frame goes straight into the input buffer the leased network owns
+    darknet_image = pooled_network.get_input_image().write(image)
+    rows = darknet.detect_image_rows(pooled_network.network, pooled_network.class_names, darknet_image, thresh=thresh)
+    return darknet.decode_detection_rows(rows, pooled_network.class_names)
 
-    image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-    image_resized = cv2.resize(image_rgb, (width, height),
-                               interpolation=cv2.INTER_LINEAR)
 
-    darknet.copy_image_from_bytes(darknet_image, image_resized.tobytes())
-    detections = darknet.detect_image(network, class_names, darknet_image, thresh=thresh)
-    darknet.free_image(darknet_image)
-    image = darknet.draw_boxes(detections, image_resized, class_colors)
-    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB), detections
+def load_upload(source):
+    """
+    Decode uploaded image bytes or a file object straight to the network input size, as BGR.
+    """
+    width, height = get_network_pool().get_input_size()
+    return decode_image(source, width, height)
 
 
 def normalize_before_solve(expression: str):
@@ -37,17 +41,28 @@ def normalize_before_solve(expression: str):
     return expression, first_char
 
 
+def detect(image):
+    # the same photo is often submitted again, e.g. to save it after a first try
+    cache = get_detection_cache()
+    digest = get_image_digest(image)
+    detections = cache.get(digest, get_network_pool().weights_version)
+    if detections is not None:
+        return detections
+
+    # the weights may be swapped meanwhile, the detections are cached under the version that made them
+    scheduler = get_batch_scheduler()
+    if scheduler is not None:
+        detections, weights_version = scheduler.detect(image)
+    else:
+        with get_network_pool().lease() as pooled_network:
+            detections = image_detection(image, pooled_network, .5)
+            weights_version = pooled_network.weights_version
+    cache.put(digest, weights_version, detections)
+    return detections
+
+
 def process(image):
-    network, class_names, class_colors = darknet.load_network(
-        "yolo.cfg",
-        "yolo.data",
-        "./weights/latest.weights",
-        1
-    )
-    processed_image, detections = image_detection(
-        image, network, class_names, class_colors, .5
-    )
-    darknet.free_network_ptr(network)
+    detections = detect(image)
     expression = convert_detections_to_expression(detections)
     expression = normalize_expression(expression)
     print(expression)
@@ -56,10 +71,16 @@ def process(image):
     latex = ""
     message = ""
     try:
-        latex = convert_infix_to_latex(expression)
+        # the same trees are rendered and solved
+        sides = parse_equation(expression)
+        latex = convert_equation_to_latex(sides)
         try:
             expression_to_solve, variable = normalize_before_solve(expression)
-            roots = solve.parse_and_solve_and_round(expression_to_solve, 0.00001)
+            cache = get_result_cache()
+            roots = cache.get(expression_to_solve, 0.00001)
+            if roots is None:
+                roots = solve_parsed_equation(sides, 0.00001, variable=variable or "x")
+                cache.put(expression_to_solve, 0.00001, roots)
             if roots:
                 if roots != [INFINITE_NUMBER_OF_ROOTS]:
                     roots = list(map(lambda x: variable + " = " + str(x), roots))
@@ -0,0 +1,232 @@
+import logging
+import os
+import threading
+import time
+import unittest
+from concurrent.futures import Future
+from queue import Queue, Empty
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from processor import darknet
+from processor.network_pool import NetworkPool, PooledNetwork, get_network_pool
+
+logger = logging.getLogger(__name__)
+
+BATCH_WINDOW_MS = float(os.environ.get("BATCH_WINDOW_MS", "10"))
+
+
+def prepare_batch(images: list, width: int, height: int, batch_size: int) -> np.ndarray:
+    """
+    Resize BGR images to the network size and pack them into one planar float
+    array of `batch_size` images, padding the unused slots with zeros.
+    """
+    batch_array = np.zeros((batch_size, 3, height, width), dtype=np.float32)
+    for index, image in enumerate(images):
+        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        image_resized = cv2.resize(image_rgb, (width, height), interpolation=cv2.INTER_LINEAR)
+        batch_array[index] = image_resized.transpose(2, 0, 1)
+    batch_array /= 255.0
+    return batch_array
+
+
+def batch_detection(pooled_network: PooledNetwork, images: list, thresh=.5, hier_thresh=.5, nms=.45) -> list:
+    """
+    Run one forward pass over `images` and return the detections of each image
+    in the same format as darknet.detect_image. The padding slots of the batch
+    are never thresholded.
+    """
+    network = pooled_network.network
+    class_names = pooled_network.class_names
+    width = darknet.network_width(network)
+    height = darknet.network_height(network)
+    batch_size = pooled_network.batch_size
+    batch_array = prepare_batch(images, width, height, batch_size)
+    darknet.network_predict(network, batch_array.ctypes.data_as(darknet.POINTER(darknet.c_float)))
+    batch_predictions = []
+    for index in range(len(images)):
+        rows = darknet.network_detection_rows(network, len(class_names), width, height, thresh, hier_thresh, nms,
+                                              batch=index)
+        batch_predictions.append(darknet.decode_detection_rows(rows, class_names))
+    return batch_predictions
+
+
+class BatchRequest:
+    def __init__(self, image):
+        self.image = image
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class BatchScheduler:
+    """
+    Coalesces detection requests that arrive within `window` seconds of each other
+    into one batched forward pass of up to the network batch size, then hands the
+    detections back to each waiting request, with the weights version of the
+    network that produced them.
+    """
+
+    def __init__(self, pool: NetworkPool, window: float, runner=batch_detection):
+        self.pool = pool
+        self.window = window
+        self.max_batch_size = pool.batch_size
+        self._runner = runner
+        self._queue = Queue()
+        self._collect_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.batch_count = 0
+        self.image_count = 0
+        self.total_queue_delay = 0.0
+        self.max_queue_delay = 0.0
+        self._workers = []
+        for _ in range(pool.size):
+            worker = threading.Thread(target=self._work, daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, image) -> Future:
+        request = BatchRequest(image)
+        self._queue.put(request)
+        return request.future
+
+    def detect(self, image, timeout: float = None) -> tuple:
+        """
+        Detections of `image` and the weights version they were made with.
+        """
+        return self.submit(image).result(timeout)
+
+    def _collect(self) -> list:
+        with self._collect_lock:
+            batch = [self._queue.get()]
+            deadline = batch[0].enqueued_at + self.window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except Empty:
+                    break
+            return batch
+
+    def _record(self, batch: list, started_at: float):
+        with self._stats_lock:
+            self.batch_count += 1
+            self.image_count += len(batch)
+            for request in batch:
+                queue_delay = started_at - request.enqueued_at
+                self.total_queue_delay += queue_delay
+                if queue_delay > self.max_queue_delay:
+                    self.max_queue_delay = queue_delay
+
+    def _work(self):
+        while True:
+            batch = self._collect()
+            try:
+                with self.pool.lease() as pooled_network:
+                    self._record(batch, time.perf_counter())
+                    results = self._runner(pooled_network, [request.image for request in batch])
+                    weights_version = pooled_network.weights_version
+            except Exception as e:
+                logger.exception("Batched detection failed")
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            if len(results) != len(batch):
+                logger.error("Batched detection returned %d results for %d images", len(results), len(batch))
+            for request, detections in zip(batch, results):
+                request.future.set_result((detections, weights_version))
+            for request in batch[len(results):]:
+                request.future.set_exception(
+                    RuntimeError("Batched detection returned no result for this image"))
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "batch_count": self.batch_count,
+                "image_count": self.image_count,
+                "fill_ratio": self.image_count / (self.batch_count * self.max_batch_size) if self.batch_count else 0.0,
+                "average_queue_delay_ms": self.total_queue_delay / self.image_count * 1000 if self.image_count else 0.0,
+                "max_queue_delay_ms": self.max_queue_delay * 1000,
+            }
+
+
+_scheduler = None
+_scheduler_pid = None
+_scheduler_lock = threading.Lock()
+
+
+def get_batch_scheduler() -> Optional[BatchScheduler]:
+    """
+    Return the batch scheduler of the current process, or None when the pool
+    networks are loaded with batch size 1 and there is nothing to coalesce.
+    """
+    global _scheduler, _scheduler_pid
+    pool = get_network_pool()
+    if pool.batch_size <= 1:
+        return None
+    if _scheduler is None or _scheduler_pid != os.getpid():
+        with _scheduler_lock:
+            if _scheduler is None or _scheduler_pid != os.getpid():
+                _scheduler = BatchScheduler(pool, BATCH_WINDOW_MS / 1000)
+                _scheduler_pid = os.getpid()
+    return _scheduler
+
+
+class Tests(unittest.TestCase):
+
+    @staticmethod
+    def create_pool(batch_size):
+        def loader(config_file, data_file, weights_file, batch_size):
+            return object(), ["x"], {}
+
+        return NetworkPool(1, "yolo.cfg", "yolo.data", "latest.weights", batch_size=batch_size, weights_version=1,
+                           loader=loader, releaser=lambda network: None, sizer=lambda network: (608, 608))
+
+    def test_coalesce(self):
+        batches = []
+
+        def runner(pooled_network, images):
+            batches.append(list(images))
+            return [[("x", "99.0", (image, 0, 0, 0))] for image in images]
+
+        scheduler = BatchScheduler(self.create_pool(4), 0.2, runner=runner)
+        futures = [scheduler.submit(i) for i in range(6)]
+        results = [future.result(5) for future in futures]
+
+        self.assertEqual(results, [([("x", "99.0", (i, 0, 0, 0))], 1) for i in range(6)])
+        self.assertEqual(batches, [[0, 1, 2, 3], [4, 5]])
+        stats = scheduler.get_stats()
+        self.assertEqual(stats["batch_count"], 2)
+        self.assertEqual(stats["fill_ratio"], 6 / 8)
+        self.assertGreater(stats["max_queue_delay_ms"], 0)
+
+    def test_failure_reaches_every_request(self):
+        def runner(pooled_network, images):
+            raise RuntimeError("forward pass failed")
+
+        scheduler = BatchScheduler(self.create_pool(2), 0.05, runner=runner)
+        futures = [scheduler.submit(i) for i in range(2)]
+        for future in futures:
+            self.assertRaises(RuntimeError, future.result, 5)
+
+    def test_missing_result_reaches_request(self):
+        def runner(pooled_network, images):
+            return [[("x", "99.0", (image, 0, 0, 0))] for image in images[:1]]
+
+        scheduler = BatchScheduler(self.create_pool(2), 0.2, runner=runner)
+        futures = [scheduler.submit(i) for i in range(2)]
+        self.assertEqual(futures[0].result(5), ([("x", "99.0", (0, 0, 0, 0))], 1))
+        self.assertRaises(RuntimeError, futures[1].result, 5)
+
+    def test_prepare_batch(self):
+        image = np.zeros((20, 10, 3), dtype=np.uint8)
+        image[:, :, 0] = 255
+        batch_array = prepare_batch([image], 5, 4, 2)
+        self.assertEqual(batch_array.shape, (2, 3, 4, 5))
+        # blue channel of the BGR input ends up last in the RGB planes
+        self.assertTrue(np.all(batch_array[0, 2] == 1))
+        self.assertTrue(np.all(batch_array[0, :2] == 0))
+        self.assertTrue(np.all(batch_array[1] == 0))
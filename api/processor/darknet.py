@@ -25,6 +25,9 @@ from ctypes import *
 import math
 import random
 import os
+import unittest
+
+import numpy as np
 
 
 class BOX(Structure):
@@ -48,6 +51,19 @@ class DETECTION(Structure):
                 ("sim", c_float),
                 ("track_id", c_int)]
 
+# the DETECTION fields remove_negatives reads, at their ctypes offsets, to view an array of detections from NumPy
+DETECTION_DTYPE = np.dtype({
+    "names": ["x", "y", "w", "h", "prob"],
+    "formats": [np.float32, np.float32, np.float32, np.float32, np.uintp],
+    "offsets": [DETECTION.bbox.offset + BOX.x.offset, DETECTION.bbox.offset + BOX.y.offset,
+                DETECTION.bbox.offset + BOX.w.offset, DETECTION.bbox.offset + BOX.h.offset, DETECTION.prob.offset],
+    "itemsize": sizeof(DETECTION)})
+# (class_id, prob, x, y, w, h), as written by get_network_detection_rows
+DETECTION_ROW_SIZE = 6
+# rows allocated before knowing how many detections there are, enough for a dense worksheet
+DETECTION_ROW_CAPACITY = 512
+
+
 class DETNUMPAIR(Structure):
     _fields_ = [("num", c_int),
                 ("dets", POINTER(DETECTION))]
@@ -118,6 +134,19 @@ def load_network(config_file, data_file, weights, batch_size=1):
     return network, class_names, colors
 
 
+def clone_network(network, config_file):
+    """
+    Load another network from `config_file`, the cfg `network` was loaded
+    from, that runs on the weights of `network`, with only its own
+    activations and workspace allocated, so concurrent inferences do not
+    multiply the weight memory. Clones have to be freed before `network`.
+    """
+    clone = load_net_shared(config_file.encode("ascii"), network)
+    if not clone:
+        raise ValueError("Cannot share the weights of " + config_file)
+    return clone
+
+
 def print_detections(detections, coordinates=False):
     print("\nObjects:")
     for label, confidence, bbox in detections:
@@ -140,25 +169,41 @@ def draw_boxes(detections, image, colors):
 
 
 def decode_detection(detections):
-    decoded = []
-    for label, confidence, bbox in detections:
-        confidence = str(round(confidence * 100, 2))
-        decoded.append((str(label), confidence, bbox))
-    return decoded
+    """
+    Confidences as percentages rounded to 2 decimals
+    """
+    return [(label, round(confidence * 100, 2), bbox) for label, confidence, bbox in detections]
+
+
+def detection_arrays(detections, num, classes):
+    """
+    NumPy arrays of the class probabilities (num x classes) and the boxes
+    (num x 4, as x, y, w, h) of `num` detections, read without a ctypes
+    access per element
+    """
+    if num == 0:
+        return np.zeros((0, classes), dtype=np.float32), np.zeros((0, 4), dtype=np.float32)
+    records = np.frombuffer((c_char * (num * sizeof(DETECTION))).from_address(addressof(detections.contents)),
+                            dtype=DETECTION_DTYPE)
+    # each detection has its own prob allocation, copied row by row with one call each
+    probs = np.empty((num, classes), dtype=np.float32)
+    row_size = classes * sizeof(c_float)
+    for row_address, prob_address in zip(range(probs.ctypes.data, probs.ctypes.data + num * row_size, row_size),
+                                         records["prob"].tolist()):
+        memmove(row_address, prob_address, row_size)
+    boxes = np.stack([records["x"], records["y"], records["w"], records["h"]], axis=1)
+    return probs, boxes
 
 
 def remove_negatives(detections, class_names, num):
     """
     Remove all classes with 0% confidence within the detection
     """
-    predictions = []
-    for j in range(num):
-        for idx, name in enumerate(class_names):
-            if detections[j].prob[idx] > 0:
-                bbox = detections[j].bbox
-                bbox = (bbox.x, bbox.y, bbox.w, bbox.h)
-                predictions.append((name, detections[j].prob[idx], (bbox)))
-    return predictions
+    probs, boxes = detection_arrays(detections, num, len(class_names))
+    detection_indexes, class_indexes = np.nonzero(probs > 0)
+    labels = map(class_names.__getitem__, class_indexes.tolist())
+    return list(zip(labels, probs[detection_indexes, class_indexes].tolist(),
+                    map(tuple, boxes[detection_indexes].tolist())))
 
 
 def detect_image(network, class_names, image, thresh=.5, hier_thresh=.5, nms=.45):
@@ -178,6 +223,37 @@ def detect_image(network, class_names, image, thresh=.5, hier_thresh=.5, nms=.45
     return sorted(predictions, key=lambda x: x[1])
 
 
+def network_detection_rows(network, classes, width, height, thresh=.5, hier_thresh=.5, nms=.45, batch=0):
+    """
+    Detections of image `batch` of the last forward pass as one float32 array
+    of (class_id, prob, x, y, w, h) rows, thresholded and NMS-sorted in C
+    """
+    rows = np.empty((DETECTION_ROW_CAPACITY, DETECTION_ROW_SIZE), dtype=np.float32)
+    while True:
+        count = get_network_detection_rows(network, batch, width, height, thresh, hier_thresh, None, 0, 0,
+                                           classes, nms, rows.ctypes.data_as(POINTER(c_float)), len(rows))
+        if count <= len(rows):
+            return rows[:count]
+        rows = np.empty((count, DETECTION_ROW_SIZE), dtype=np.float32)
+
+
+def decode_detection_rows(rows, class_names):
+    """
+    Detection rows in the format of detect_image
+    """
+    labels = map(class_names.__getitem__, rows[:, 0].astype(np.intp).tolist())
+    predictions = zip(labels, rows[:, 1].tolist(), map(tuple, rows[:, 2:].tolist()))
+    return sorted(decode_detection(predictions), key=lambda x: x[1])
+
+
+def detect_image_rows(network, class_names, image, thresh=.5, hier_thresh=.5, nms=.45):
+    """
+    detect_image returning the float32 detection rows of network_detection_rows
+    """
+    predict_image(network, image)
+    return network_detection_rows(network, len(class_names), image.w, image.h, thresh, hier_thresh, nms)
+
+
 #  lib = CDLL("/home/pjreddie/documents/darknet/libdarknet.so", RTLD_GLOBAL)
 #  lib = CDLL("libdarknet.so", RTLD_GLOBAL)
 hasGPU = True
@@ -259,6 +335,11 @@ free_detections.argtypes = [POINTER(DETECTION), c_int]
 free_batch_detections = lib.free_batch_detections
 free_batch_detections.argtypes = [POINTER(DETNUMPAIR), c_int]
 
+get_network_detection_rows = lib.get_network_detection_rows
+get_network_detection_rows.argtypes = [c_void_p, c_int, c_int, c_int, c_float, c_float, POINTER(c_int), c_int, c_int,
+                                       c_int, c_float, POINTER(c_float), c_int]
+get_network_detection_rows.restype = c_int
+
 free_ptrs = lib.free_ptrs
 free_ptrs.argtypes = [POINTER(c_void_p), c_int]
 
@@ -276,6 +357,10 @@ load_net_custom = lib.load_network_custom
 load_net_custom.argtypes = [c_char_p, c_char_p, c_int, c_int]
 load_net_custom.restype = c_void_p
 
+load_net_shared = lib.load_network_shared
+load_net_shared.argtypes = [c_char_p, c_void_p]
+load_net_shared.restype = c_void_p
+
 free_network_ptr = lib.free_network_ptr
 free_network_ptr.argtypes = [c_void_p]
 free_network_ptr.restype = c_void_p
@@ -316,3 +401,88 @@ network_predict_batch = lib.network_predict_batch
 network_predict_batch.argtypes = [c_void_p, IMAGE, c_int, c_int, c_int,
                                    c_float, c_float, POINTER(c_int), c_int, c_int]
 network_predict_batch.restype = POINTER(DETNUMPAIR)
+
+
+class Tests(unittest.TestCase):
+
+    def test_remove_negatives(self):
+        class_names = ["x", "1", "2"]
+        rows = [[0, 0.9, 0], [0, 0, 0], [0.25, 0, 0.6]]
+        detections = (DETECTION * len(rows))()
+        probs = [(c_float * len(class_names))(*row) for row in rows]
+        for detection, prob, offset in zip(detections, probs, range(len(rows))):
+            detection.bbox = BOX(10 + offset, 20, 4.5, 8)
+            detection.prob = cast(prob, POINTER(c_float))
+        detections = cast(detections, POINTER(DETECTION))
+        predictions = remove_negatives(detections, class_names, len(rows))
+        self.assertEqual(predictions, [("1", c_float(0.9).value, (10, 20, 4.5, 8)),
+                                       ("x", 0.25, (12, 20, 4.5, 8)),
+                                       ("2", c_float(0.6).value, (12, 20, 4.5, 8))])
+        self.assertEqual(decode_detection(predictions)[0], ("1", 90.0, (10, 20, 4.5, 8)))
+        self.assertEqual(remove_negatives(detections, class_names, 0), [])
+
+    def test_detection_rows(self):
+        import tempfile
+        # a 1x1 convolution straight into a yolo layer, randomly initialized: hundreds of boxes per image
+        cfg = "\n".join(["[net]", "batch=2", "width=32", "height=32", "channels=3",
+                         "[convolutional]", "filters=21", "size=1", "stride=1", "activation=linear",
+                         "[yolo]", "mask=0,1,2", "anchors=10,13,16,30,33,23", "classes=2", "num=3"])
+        with tempfile.NamedTemporaryFile("w", suffix=".cfg") as cfg_file:
+            cfg_file.write(cfg)
+            cfg_file.flush()
+            network = load_net_custom(cfg_file.name.encode("ascii"), b"", 0, 2)
+        class_names = ["x", "1"]
+        data = np.random.default_rng(0).random((2, 3, 32, 32), dtype=np.float32)
+        network_predict(network, data.ctypes.data_as(POINTER(c_float)))
+        batch_detections = network_predict_batch(network, IMAGE(32, 32, 3, data.ctypes.data_as(POINTER(c_float))),
+                                                 2, 32, 32, .1, .5, None, 0, 0)
+        # do_nms_sort works in place, so image 1 is compared without NMS first
+        for index, nms in [(0, .45), (1, 0), (1, .45)]:
+            detections, num = batch_detections[index].dets, batch_detections[index].num
+            if nms:
+                do_nms_sort(detections, num, len(class_names), nms)
+            predictions = sorted(decode_detection(remove_negatives(detections, class_names, num)), key=lambda x: x[1])
+            rows = network_detection_rows(network, len(class_names), 32, 32, .1, .5, nms, batch=index)
+            self.assertEqual(rows.shape, (len(predictions), DETECTION_ROW_SIZE))
+            self.assertEqual(decode_detection_rows(rows, class_names), predictions)
+            # without NMS there are more rows than the initial buffer holds
+            self.assertTrue(nms or len(rows) > DETECTION_ROW_CAPACITY)
+        free_batch_detections(batch_detections, 2)
+        free_network_ptr(network)
+
+    def test_clone_network(self):
+        import os
+        import tempfile
+        # batchnorm, fused into the weights on load, and a shortcut ahead of a yolo layer
+        cfg = "\n".join(["[net]", "batch=1", "width=32", "height=32", "channels=3",
+                         "[convolutional]", "batch_normalize=1", "filters=8", "size=3", "stride=2", "pad=1",
+                         "activation=leaky",
+                         "[convolutional]", "batch_normalize=1", "filters=8", "size=1", "stride=1", "activation=leaky",
+                         "[shortcut]", "from=-2", "activation=linear",
+                         "[convolutional]", "filters=21", "size=1", "stride=1", "activation=linear",
+                         "[yolo]", "mask=0,1,2", "anchors=10,13,16,30,33,23", "classes=2", "num=3"])
+        with tempfile.TemporaryDirectory() as directory:
+            paths = {name: os.path.join(directory, name) for name in ["net.cfg", "net.names", "net.data"]}
+            contents = {"net.cfg": cfg, "net.names": "x\n1\n",
+                        "net.data": "classes=2\nnames={}\n".format(paths["net.names"])}
+            for name, path in paths.items():
+                with open(path, "w") as file:
+                    file.write(contents[name])
+            network, class_names, _ = load_network(paths["net.cfg"], paths["net.data"], "")
+            data = np.random.default_rng(0).random((3, 32, 32), dtype=np.float32)
+
+            def forward(handle):
+                output = predict(handle, data.ctypes.data_as(POINTER(c_float)))
+                return np.ctypeslib.as_array(output, shape=(16 * 16 * 21,)).copy()
+
+            expected = forward(network)
+            clone = clone_network(network, paths["net.cfg"])
+            clone_of_clone = clone_network(clone, paths["net.cfg"])
+
+        # random weights: equal outputs mean the clones run on the weights of the network, which are left as they were
+        for handle in [clone, clone_of_clone, network]:
+            np.testing.assert_array_equal(forward(handle), expected)
+        free_network_ptr(clone_of_clone)
+        free_network_ptr(clone)
+        np.testing.assert_array_equal(forward(network), expected)
+        free_network_ptr(network)
@@ -0,0 +1,89 @@
+import io
+import unittest
+
+import cv2
+import numpy as np
+import PIL.Image
+from PIL import ImageOps
+
+# EXIF orientations that turn the picture a quarter, so its stored width is the displayed height
+TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+EXIF_ORIENTATION = 0x0112
+# transparent pixels are shown as the paper they were written on
+BACKGROUND_COLOR = (255, 255, 255)
+
+
+def decode_image(source, width: int, height: int) -> np.ndarray:
+    """
+    Decode an uploaded image, given as bytes or a file object, into the BGR
+    uint8 array of `height` x `width` the networks take. JPEG files are
+    decoded at the smallest DCT scale that still covers the network size, so a
+    12 megapixel photo is never expanded at full resolution. The EXIF
+    orientation is applied, and palette, grayscale and transparent images are
+    flattened to RGB over a white background. Raises PIL.UnidentifiedImageError
+    when the data is not an image.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    image = PIL.Image.open(source)
+    orientation = image.getexif().get(EXIF_ORIENTATION)
+    draft_size = (height, width) if orientation in TRANSPOSED_ORIENTATIONS else (width, height)
+    # only JPEG supports it, other formats ignore the request
+    image.draft("RGB", draft_size)
+    image = ImageOps.exif_transpose(image)
+
+    if image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = PIL.Image.new("RGB", image.size, BACKGROUND_COLOR)
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    elif image.mode != "RGB":
+        image = image.convert("RGB")
+
+    pixels = np.asarray(image)
+    if pixels.shape[:2] != (height, width):
+        pixels = cv2.resize(pixels, (width, height), interpolation=cv2.INTER_LINEAR)
+    return cv2.cvtColor(pixels, cv2.COLOR_RGB2BGR)
+
+
+class Tests(unittest.TestCase):
+
+    @staticmethod
+    def encode(image: PIL.Image.Image, image_format: str, **params) -> bytes:
+        output = io.BytesIO()
+        image.save(output, image_format, **params)
+        return output.getvalue()
+
+    def test_jpeg(self):
+        image = PIL.Image.new("RGB", (400, 200), (200, 100, 50))
+        image.paste((0, 0, 255), (0, 0, 200, 200))
+        pixels = decode_image(self.encode(image, "JPEG", quality=95), 64, 48)
+        self.assertEqual(pixels.shape, (48, 64, 3))
+        self.assertEqual(pixels.dtype, np.uint8)
+        # blue on the left, BGR order
+        np.testing.assert_allclose(pixels[24, 8], (255, 0, 0), atol=8)
+        np.testing.assert_allclose(pixels[24, 56], (50, 100, 200), atol=8)
+
+    def test_exif_orientation(self):
+        image = PIL.Image.new("RGB", (400, 200), (255, 255, 255))
+        image.paste((0, 0, 0), (0, 0, 200, 200))
+        exif = PIL.Image.Exif()
+        # stored with the black half on the left, displayed turned 90 degrees clockwise: black on top
+        exif[EXIF_ORIENTATION] = 6
+        pixels = decode_image(self.encode(image, "JPEG", exif=exif.tobytes()), 40, 40)
+        self.assertLess(pixels[5, 20].max(), 20)
+        self.assertGreater(pixels[35, 20].min(), 235)
+
+    def test_modes(self):
+        transparent = PIL.Image.new("RGBA", (30, 20), (0, 0, 0, 0))
+        transparent.paste((0, 0, 0, 255), (0, 0, 10, 20))
+        pixels = decode_image(self.encode(transparent, "PNG"), 30, 20)
+        np.testing.assert_array_equal(pixels[10, 5], (0, 0, 0))
+        np.testing.assert_array_equal(pixels[10, 25], (255, 255, 255))
+
+        gray = PIL.Image.new("L", (30, 20), 128)
+        np.testing.assert_array_equal(decode_image(self.encode(gray, "PNG"), 30, 20), np.full((20, 30, 3), 128))
+        palette = gray.convert("P")
+        self.assertEqual(decode_image(io.BytesIO(self.encode(palette, "GIF")), 15, 10).shape, (10, 15, 3))
+
+        self.assertRaises(PIL.UnidentifiedImageError, decode_image, b"not an image", 30, 20)
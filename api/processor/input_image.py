@@ -0,0 +1,70 @@
+import unittest
+
+import cv2
+import numpy as np
+
+from processor import darknet
+
+
+class InputImage:
+    """
+    The darknet IMAGE a network reads its input from, allocated once and reused
+    for every frame. A frame is resized into a preallocated uint8 buffer and
+    written straight into the planar float data of the IMAGE through a NumPy
+    view, reversing BGR to RGB and scaling to [0, 1] in the same pass, so no
+    intermediate image, bytes object or per-frame allocation is made.
+    """
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.image = darknet.make_image(width, height, 3)
+        self.planes = np.ctypeslib.as_array(self.image.data, shape=(3, height, width))
+        self.resized = np.empty((height, width, 3), dtype=np.uint8)
+
+    def write(self, frame: np.ndarray):
+        """
+        Load a BGR uint8 frame of any size and return the IMAGE holding it.
+        """
+        if frame.shape[:2] == (self.height, self.width):
+            resized = frame
+        else:
+            resized = cv2.resize(frame, (self.width, self.height), dst=self.resized, interpolation=cv2.INTER_LINEAR)
+        # copy_image_from_bytes divides in double and rounds to float, which gives the same floats
+        np.divide(resized.transpose(2, 0, 1)[::-1], np.float32(255), out=self.planes)
+        return self.image
+
+    def close(self):
+        if self.image is not None:
+            self.planes = None
+            darknet.free_image(self.image)
+            self.image = None
+
+
+class Tests(unittest.TestCase):
+
+    @staticmethod
+    def load_with_copies(frame: np.ndarray, width: int, height: int) -> np.ndarray:
+        # what image_detection did before the buffer was kept
+        image = darknet.make_image(width, height, 3)
+        image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        image_resized = cv2.resize(image_rgb, (width, height), interpolation=cv2.INTER_LINEAR)
+        darknet.copy_image_from_bytes(image, image_resized.tobytes())
+        data = np.ctypeslib.as_array(image.data, shape=(3, height, width)).copy()
+        darknet.free_image(image)
+        return data
+
+    def test_write(self):
+        rng = np.random.default_rng(0)
+        input_image = InputImage(32, 24)
+        for shape in [(24, 32, 3), (100, 70, 3), (7, 9, 3)]:
+            frame = rng.integers(0, 256, size=shape, dtype=np.uint8)
+            image = input_image.write(frame)
+            self.assertEqual((image.w, image.h, image.c), (32, 24, 3))
+            np.testing.assert_array_equal(np.ctypeslib.as_array(image.data, shape=(3, 24, 32)),
+                                          self.load_with_copies(frame, 32, 24))
+        # a strided frame, e.g. a crop, is read in place
+        frame = rng.integers(0, 256, size=(48, 64, 3), dtype=np.uint8)[::2, ::2]
+        np.testing.assert_array_equal(input_image.write(frame).data[0], frame[0, 0, 2] / np.float32(255))
+        input_image.close()
+        input_image.close()
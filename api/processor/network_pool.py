@@ -0,0 +1,389 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+import unittest
+from contextlib import contextmanager
+from queue import Queue
+
+from processor import darknet
+from processor.input_image import InputImage
+
+logger = logging.getLogger(__name__)
+
+CONFIG_FILE = "yolo.cfg"
+DATA_FILE = "yolo.data"
+WEIGHTS_FILE = "./weights/latest.weights"
+POOL_SIZE = int(os.environ.get("NETWORK_POOL_SIZE", "1"))
+BATCH_SIZE = int(os.environ.get("NETWORK_BATCH_SIZE", "1"))
+# the handles of a generation run on the weights of its first network instead of each loading a copy
+SHARE_WEIGHTS = int(os.environ.get("NETWORK_SHARE_WEIGHTS", "1"))
+
+
+def is_readable_file(path: str) -> bool:
+    # darknet exits the process on a weights file it cannot open instead of returning an error
+    return os.path.isfile(path) and os.access(path, os.R_OK)
+
+
+def get_network_input_size(network) -> tuple:
+    return darknet.network_width(network), darknet.network_height(network)
+
+
+class PooledNetwork:
+    def __init__(self, network, class_names, class_colors, weights_version=None, batch_size=1):
+        self.network = network
+        self.class_names = class_names
+        self.class_colors = class_colors
+        self.weights_version = weights_version
+        self.batch_size = batch_size
+        self.input_image = None
+
+    def get_input_image(self) -> InputImage:
+        # allocated on first use; only the lease holder touches it
+        if self.input_image is None:
+            self.input_image = InputImage(darknet.network_width(self.network), darknet.network_height(self.network))
+        return self.input_image
+
+
+class NetworkGeneration:
+    """
+    The set of handles loaded from one weights file. A generation is retired when
+    newer weights are activated and freed once its last lease is returned.
+    """
+
+    def __init__(self, weights_file: str, weights_version, handles: list):
+        self.weights_file = weights_file
+        self.weights_version = weights_version
+        self.handles = handles
+        self.available = Queue()
+        for handle in handles:
+            self.available.put(handle)
+        self.leased = 0
+        self.retired = False
+
+
+class NetworkPool:
+    """
+    Keeps `size` loaded networks resident for the lifetime of the process and
+    leases them to requests, so the cfg parse and weight read happen once per
+    worker instead of once per image. With a `cloner`, only the first network
+    of a generation is loaded and the others are cloned from it, sharing its
+    weights.
+    """
+
+    def __init__(self, size: int, config_file: str, data_file: str, weights_file: str, batch_size: int = 1,
+                 weights_version=None, loader=darknet.load_network, releaser=darknet.free_network_ptr, cloner=None,
+                 sizer=get_network_input_size):
+        if size < 1:
+            raise ValueError("Network pool size must be at least 1")
+        self.size = size
+        self.config_file = config_file
+        self.data_file = data_file
+        self.batch_size = batch_size
+        self._loader = loader
+        self._releaser = releaser
+        self._cloner = cloner
+        self._lock = threading.Lock()
+        self._pending_version = None
+        self._preload_thread = None
+        self.lease_count = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+        self._generation = self._load_generation(weights_file, weights_version)
+        # every generation is loaded from the same cfg
+        self._input_size = sizer(self._generation.handles[0].network)
+
+    @property
+    def weights_file(self) -> str:
+        return self._generation.weights_file
+
+    @property
+    def weights_version(self):
+        return self._generation.weights_version
+
+    def get_input_size(self) -> tuple:
+        """
+        Width and height of the network input, which uploads are decoded to.
+        """
+        return self._input_size
+
+    def _load_generation(self, weights_file: str, weights_version) -> NetworkGeneration:
+        handles = []
+        try:
+            for _ in range(self.size):
+                if handles and self._cloner is not None:
+                    network = self._cloner(handles[0].network, self.config_file)
+                    class_names, class_colors = handles[0].class_names, handles[0].class_colors
+                else:
+                    network, class_names, class_colors = self._loader(
+                        self.config_file,
+                        self.data_file,
+                        weights_file,
+                        self.batch_size
+                    )
+                handles.append(PooledNetwork(network, class_names, class_colors, weights_version, self.batch_size))
+        except Exception:
+            for handle in reversed(handles):
+                self._releaser(handle.network)
+            raise
+        return NetworkGeneration(weights_file, weights_version, handles)
+
+    def _free_generation(self, generation: NetworkGeneration):
+        # clones before the network whose weights they run on
+        for handle in reversed(generation.handles):
+            if handle.input_image is not None:
+                handle.input_image.close()
+            self._releaser(handle.network)
+        generation.handles = []
+        logger.info("Freed networks of weights version %s", generation.weights_version)
+
+    def _record_wait(self, wait_time: float):
+        self.lease_count += 1
+        self.total_wait_time += wait_time
+        if wait_time > self.max_wait_time:
+            self.max_wait_time = wait_time
+        logger.debug("Leased network after waiting %.2f ms", wait_time * 1000)
+
+    def _release(self, generation: NetworkGeneration, handle: PooledNetwork = None):
+        if handle is not None:
+            generation.available.put(handle)
+        with self._lock:
+            generation.leased -= 1
+            drained = generation.retired and generation.leased == 0
+        if drained:
+            self._free_generation(generation)
+
+    @contextmanager
+    def lease(self, timeout: float = None):
+        """
+        Borrow a loaded network until the block exits. Blocks while every handle
+        is in use; raises queue.Empty if `timeout` seconds pass first.
+        """
+        with self._lock:
+            generation = self._generation
+            generation.leased += 1
+        start = time.perf_counter()
+        try:
+            handle = generation.available.get(timeout=timeout)
+        except BaseException:
+            self._release(generation)
+            raise
+        with self._lock:
+            self._record_wait(time.perf_counter() - start)
+        try:
+            yield handle
+        finally:
+            self._release(generation, handle)
+
+    def activate_weights(self, weights_file: str, weights_version) -> bool:
+        """
+        Preload `weights_file` into a shadow generation on a background thread and
+        switch to it once loaded. Requests keep leasing the current generation in
+        the meantime. Returns False if the version is already active or loading.
+        """
+        with self._lock:
+            if weights_version in (self._generation.weights_version, self._pending_version):
+                return False
+            self._pending_version = weights_version
+            self._preload_thread = threading.Thread(target=self._preload, args=(weights_file, weights_version),
+                                                    daemon=True)
+            self._preload_thread.start()
+        return True
+
+    def _preload(self, weights_file: str, weights_version):
+        try:
+            if not is_readable_file(weights_file):
+                raise OSError("Cannot read weights file " + weights_file)
+            generation = self._load_generation(weights_file, weights_version)
+        except Exception:
+            logger.exception("Cannot load weights version %s from %s", weights_version, weights_file)
+            with self._lock:
+                if self._pending_version == weights_version:
+                    self._pending_version = None
+            return
+
+        with self._lock:
+            if self._pending_version != weights_version:
+                # a newer activation superseded this one while it was loading
+                superseded, drained = generation, True
+            else:
+                superseded = self._generation
+                self._generation = generation
+                self._pending_version = None
+                superseded.retired = True
+                drained = superseded.leased == 0
+                logger.info("Activated weights version %s", weights_version)
+        if drained:
+            self._free_generation(superseded)
+
+    def wait_for_preload(self, timeout: float = None):
+        thread = self._preload_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            average_wait_time = self.total_wait_time / self.lease_count if self.lease_count else 0.0
+            return {
+                "size": self.size,
+                "weights_version": self._generation.weights_version,
+                "pending_weights_version": self._pending_version,
+                "available": self._generation.available.qsize(),
+                "lease_count": self.lease_count,
+                "average_wait_ms": average_wait_time * 1000,
+                "max_wait_ms": self.max_wait_time * 1000,
+            }
+
+    def close(self):
+        self.wait_for_preload()
+        with self._lock:
+            generation = self._generation
+            generation.retired = True
+            drained = generation.leased == 0
+        if drained:
+            self._free_generation(generation)
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_network_pool(weights_file: str = WEIGHTS_FILE, weights_version=None) -> NetworkPool:
+    """
+    Return the network pool of the current process, loading it with the given
+    weights on first use. Darknet handles cannot be shared across fork, so a
+    forked worker builds its own.
+    """
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = NetworkPool(POOL_SIZE, CONFIG_FILE, DATA_FILE, weights_file, batch_size=BATCH_SIZE,
+                                    weights_version=weights_version,
+                                    cloner=darknet.clone_network if SHARE_WEIGHTS else None)
+                _pool_pid = os.getpid()
+    return _pool
+
+
+def activate_weights(weights_file: str, weights_version) -> bool:
+    """
+    Make `weights_file` the active weights of this process. The first call in a
+    worker loads the pool directly; later calls hot-swap in the background.
+    """
+    if _pool is None or _pool_pid != os.getpid():
+        if not is_readable_file(weights_file):
+            logger.error("Cannot read weights file %s of version %s", weights_file, weights_version)
+            return False
+        get_network_pool(weights_file, weights_version)
+        return True
+    return _pool.activate_weights(weights_file, weights_version)
+
+
+class Tests(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.v2_weights = os.path.join(directory.name, "v2.weights")
+        open(self.v2_weights, "wb").close()
+
+    @staticmethod
+    def create_pool(size, loaded, freed, weights_version=None, cloner=None):
+        def loader(config_file, data_file, weights_file, batch_size):
+            network = (weights_file, len(loaded))
+            loaded.append(network)
+            return network, ["x"], {"x": (0, 0, 0)}
+
+        return NetworkPool(size, "yolo.cfg", "yolo.data", "latest.weights", weights_version=weights_version,
+                           loader=loader, releaser=freed.append, cloner=cloner, sizer=lambda network: (608, 608))
+
+    def test_load_once(self):
+        loaded = []
+        freed = []
+        pool = self.create_pool(2, loaded, freed)
+        for _ in range(5):
+            with pool.lease() as handle:
+                self.assertIn(handle.network, loaded)
+        self.assertEqual(len(loaded), 2)
+        self.assertEqual(pool.get_stats()["lease_count"], 5)
+        self.assertEqual(pool.get_stats()["available"], 2)
+
+        pool.close()
+        self.assertEqual(freed, loaded[::-1])
+
+    def test_clone(self):
+        loaded = []
+        freed = []
+
+        def cloner(network, config_file):
+            clone = network + ("clone",)
+            loaded.append(clone)
+            return clone
+
+        pool = self.create_pool(3, loaded, freed, weights_version=1, cloner=cloner)
+        pool.activate_weights(self.v2_weights, 2)
+        pool.wait_for_preload()
+        # one load per generation, the other handles are clones of it
+        self.assertEqual(loaded, [network + suffix for network in [("latest.weights", 0), (self.v2_weights, 3)]
+                                  for suffix in [(), ("clone",), ("clone",)]])
+        with pool.lease() as handle:
+            self.assertEqual(handle.class_names, ["x"])
+        pool.close()
+        # clones go before the network they share the weights of
+        self.assertEqual(freed, loaded[2::-1] + loaded[:2:-1])
+
+    def test_lease_blocks_when_exhausted(self):
+        pool = self.create_pool(1, [], [])
+        with pool.lease():
+            released = threading.Event()
+
+            def borrow():
+                with pool.lease():
+                    released.set()
+
+            thread = threading.Thread(target=borrow)
+            thread.start()
+            self.assertFalse(released.wait(0.05))
+        thread.join()
+        self.assertTrue(released.is_set())
+        self.assertGreater(pool.get_stats()["max_wait_ms"], 0)
+
+    def test_activate_weights(self):
+        loaded = []
+        freed = []
+        pool = self.create_pool(2, loaded, freed, weights_version=1)
+        self.assertFalse(pool.activate_weights("latest.weights", 1))
+
+        with pool.lease() as old_handle:
+            self.assertTrue(pool.activate_weights(self.v2_weights, 2))
+            self.assertFalse(pool.activate_weights(self.v2_weights, 2))
+            pool.wait_for_preload()
+            self.assertEqual(pool.weights_version, 2)
+            # the old generation drains before it is freed
+            self.assertEqual(freed, [])
+            with pool.lease() as new_handle:
+                self.assertEqual(new_handle.weights_version, 2)
+                self.assertEqual(new_handle.network[0], self.v2_weights)
+        self.assertEqual(old_handle.weights_version, 1)
+        self.assertEqual(freed, loaded[1::-1])
+
+        pool.close()
+        self.assertEqual(freed, loaded[1::-1] + loaded[:1:-1])
+        # known without a network, even once every handle is freed
+        self.assertEqual(pool.get_input_size(), (608, 608))
+
+    def test_activate_weights_failure_keeps_current(self):
+        loaded = []
+        freed = []
+        pool = self.create_pool(1, loaded, freed, weights_version=1)
+        missing_file = os.path.join(os.path.dirname(self.v2_weights), "missing.weights")
+        self.assertTrue(pool.activate_weights(missing_file, 2))
+        pool.wait_for_preload()
+        # the missing file never reaches darknet
+        self.assertEqual(loaded, [("latest.weights", 0)])
+        self.assertEqual(pool.weights_version, 1)
+        self.assertIsNone(pool.get_stats()["pending_weights_version"])
+        self.assertEqual(freed, [])
@@ -1,12 +1,14 @@
 import unittest
 import re
-import pytexit
 import math
-from pathlib import Path
-from matplotlib.afm import AFM
+import numpy as np
+from bisect import bisect_left, bisect_right
+from contextvars import ContextVar
 from typing import List
 import os
 
+from solver.expression_tree import convert_equation_to_latex, parse_equation
+
 superscript_threshold = 1 / 2
 quarter_superscript_threshold = 1 / 4
 subscript_threshold = 0.6
@@ -14,6 +16,40 @@ exponent_angle_threshold = 20
 label_with_sub_threshold = 0.7
 exponent_base_size_ratio_threshold = 0.6
 inline_operator_threshold = 0.3
+# lists shorter than this are not worth building the relation matrices for
+vectorized_relation_min_elements = 8
+
+
+def load_glyph_areas(afm_path: str) -> dict:
+    """
+    Read the glyph bounding boxes of an AFM font file and return the area of each
+    encoded character, normalized to a 1x1 em square: {character: area}
+    """
+    glyph_areas = {}
+    with open(afm_path, "r", encoding="latin-1") as fh:
+        in_char_metrics = False
+        for line in fh:
+            if line.startswith("StartCharMetrics"):
+                in_char_metrics = True
+            elif line.startswith("EndCharMetrics"):
+                break
+            elif in_char_metrics:
+                # C 120 ; WX 500 ; N x ; B 17 0 479 450 ;
+                values = {}
+                for item in line.split(";"):
+                    item = item.split()
+                    if item:
+                        values[item[0]] = item[1:]
+                code = int(values["C"][0])
+                if code < 0:
+                    continue
+                left, bottom, right, top = map(float, values["B"])
+                glyph_areas[chr(code)] = (right - left) / 1000 * ((top - bottom) / 1000)
+    return glyph_areas
+
+
+# Times-Roman glyph areas, looked up for every base/exponent pair in is_small_exponent
+GLYPH_AREAS = load_glyph_areas(os.path.join(os.path.dirname(__file__), "Times-Roman.afm"))
 
 
 class Box:
@@ -93,6 +129,34 @@ class Power(Element):
             return False
 
 
+class ExpressionMemo:
+    """
+    Results of get_expression for the sub-lists met while converting one set of
+    detections. Nested fractions and powers parse the same numerator, denominator
+    and exponent sub-lists again from every enclosing level; a sub-list is keyed
+    by the identities of its elements, which are kept alive with the result.
+    """
+
+    def __init__(self):
+        self.results = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, list_element: List[Element]) -> str or None:
+        entry = self.results.get(tuple(map(id, list_element)))
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def put(self, list_element: List[Element], expression: str):
+        self.results[tuple(map(id, list_element))] = (list(list_element), expression)
+
+
+_expression_memo = ContextVar("expression_memo", default=None)
+
+
 def convert_list_detection_to_list_element(detections: list) -> List[Element]:
     length = len(detections)
     result = []
@@ -103,12 +167,23 @@ def convert_list_detection_to_list_element(detections: list) -> List[Element]:
 
 
 def get_expression(list_element: List[Element]) -> str:
+    memo = _expression_memo.get()
+    if memo is not None:
+        result = memo.get(list_element)
+        if result is None:
+            result = parse_expression(list_element)
+            memo.put(list_element, result)
+        return result
+    return parse_expression(list_element)
+
+
+def parse_expression(list_element: List[Element]) -> str:
     result = ""
 
     list_all_fraction = get_all_fractions(list_element)
     list_element = merge_list_element_with_list_fraction(list_element, list_all_fraction)
     list_element = normalize_all_mixed_number(list_element)
-    list_all_exponent = get_all_power(list_element)
+    list_all_exponent = get_all_power(list_element, ElementArrays(list_element))
     list_element = merge_list_element_with_list_power(list_element, list_all_exponent)
     length = len(list_element)
     for i in range(0, length):
@@ -181,13 +256,17 @@ def simplify_mixed_number(fraction: Fraction, number: str) -> str:
 
 def merge_list_element_with_list_fraction(list_element: List[Element], list_fraction: List[Fraction]) -> List[Element]:
     result = []
-    remove_list = []
+    removed_keys = set()
+    fraction_by_first_key = {}
+    for fraction in reversed(list_fraction):
+        fraction_by_first_key[get_element_key(fraction.list_element[0])] = fraction
     for element in list_element:
-        if element not in remove_list:
-            current_fraction = next((x for x in list_fraction if x.list_element[0] == element), None)
+        key = get_element_key(element)
+        if key not in removed_keys:
+            current_fraction = fraction_by_first_key.get(key)
             if current_fraction:
                 result.append(current_fraction)
-                remove_list = remove_list + current_fraction.list_element
+                removed_keys.update(map(get_element_key, current_fraction.list_element))
             else:
                 result.append(element)
     return result
@@ -208,14 +287,21 @@ def merge_list_element_with_list_power(list_element: List[Element], list_exponen
     return result
 
 
-def convert_detections_to_expression(detections: list) -> str:
+def convert_detections_to_expression(detections: list, memo: ExpressionMemo = None) -> str:
     """
        detections : list of detection = [(label, confidence, bbox)]
        bbox = (center_x,center_y,w,h)
+       memo : shared by the recursive get_expression calls, its hits count the sub-lists not parsed again
        """
     detections.sort(key=lambda x: x[2][0] - x[2][2] / 2)
     list_element = convert_list_detection_to_list_element(detections)
-    result = get_expression(list_element)
+    if memo is None:
+        memo = ExpressionMemo()
+    token = _expression_memo.set(memo)
+    try:
+        result = get_expression(list_element)
+    finally:
+        _expression_memo.reset(token)
     return result
 
 
@@ -254,6 +340,94 @@ def get_all_index_fraction(list_fraction: list):
     return result
 
 
+class ElementArrays:
+    """
+    Structure-of-arrays form of a list of elements: the box coordinates as NumPy arrays
+    and a code per distinct label. The pairwise script relations are computed for all
+    elements in one vectorized pass; relation[i, j] tells how element j is placed
+    relative to element i. Short lists, elements outside the list and elements
+    without a box fall back to the scalar predicates.
+    """
+
+    def __init__(self, list_element: List[Element]):
+        self.position = {}
+        if len(list_element) < vectorized_relation_min_elements:
+            return
+
+        boxes = [element for element in list_element if element.box is not None]
+        for i, element in enumerate(boxes):
+            self.position[id(element)] = i
+
+        box_values = np.array([[element.box.center_x, element.box.center_y, element.box.width, element.box.height,
+                                element.box.top, element.box.bottom, element.box.left, element.box.right]
+                               for element in boxes], dtype=np.float64).reshape(-1, 8)
+        self.center_x, self.center_y, self.width, self.height, \
+            self.top, self.bottom, self.left, self.right = box_values.T
+        label_codes = {}
+        for element in boxes:
+            label_codes.setdefault(element.expression, len(label_codes))
+        self.label_codes = np.array([label_codes[element.expression] for element in boxes], dtype=np.int64)
+        is_base = np.array([is_base_label(label) for label in label_codes], dtype=bool)[self.label_codes]
+        is_exponent_of_label = np.array([is_exponent_label(label) for label in label_codes],
+                                        dtype=bool)[self.label_codes]
+
+        top = self.top[:, None]
+        bottom = self.bottom[:, None]
+        height = self.height[:, None]
+        self.super_script = self.bottom[None, :] <= top + height * superscript_threshold
+        self.quarter_upper_script = self.bottom[None, :] < bottom - height * quarter_superscript_threshold
+        self.sub_script = self.top[None, :] >= top + height * subscript_threshold
+        self.operator_inline = (top <= self.top[None, :] + self.height[None, :] * inline_operator_threshold) \
+            & (self.bottom[None, :] - self.height[None, :] * inline_operator_threshold <= bottom)
+        dx = self.center_x[None, :] - self.center_x[:, None]
+        # is_exponent divides by zero on these pairs, they are left to it
+        self.vertical = dx == 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slope = np.where(self.vertical, np.nan, (self.center_y[:, None] - self.center_y[None, :]) / dx)
+        self.exponent = self.super_script & (slope >= math.tan(math.radians(exponent_angle_threshold))) \
+            & is_base[:, None] & is_exponent_of_label[None, :]
+
+    def get_positions(self, first_element: Element, second_element: Element):
+        i = self.position.get(id(first_element))
+        j = self.position.get(id(second_element))
+        if i is None or j is None:
+            return None
+        return i, j
+
+    def is_super_script(self, previous_element: Element, current_element: Element) -> bool:
+        positions = self.get_positions(previous_element, current_element)
+        if positions is None:
+            return is_super_script(previous_element.box, current_element.box)
+        return self.super_script.item(positions)
+
+    def is_sub_script(self, previous_element: Element, current_element: Element) -> bool:
+        positions = self.get_positions(previous_element, current_element)
+        if positions is None:
+            return is_sub_script(previous_element.box, current_element.box)
+        return self.sub_script.item(positions)
+
+    def is_operator_inline(self, base_element: Element, operator_element: Element) -> bool:
+        positions = self.get_positions(base_element, operator_element)
+        if positions is None:
+            return is_operator_inline(base_element, operator_element)
+        return self.operator_inline.item(positions)
+
+    def is_exponent(self, base_element: Element, exponent_element: Element) -> bool:
+        positions = self.get_positions(base_element, exponent_element)
+        if positions is None or self.vertical.item(positions):
+            return is_exponent(base_element, exponent_element)
+        return self.exponent.item(positions)
+
+    def is_small_exponent(self, base_element: Element, exponent_element: Element) -> bool:
+        positions = self.get_positions(base_element, exponent_element)
+        if positions is not None and not self.quarter_upper_script.item(positions):
+            return False
+        return is_small_exponent(base_element, exponent_element)
+
+    def operator_is_exponent(self, base_element: Element, next_element: Element) -> bool:
+        return self.is_super_script(base_element, next_element) or self.is_small_exponent(base_element, next_element)
+
+
 def is_exponent(base_element: Element, exponent_element: Element):
     if not is_super_script(base_element.box, exponent_element.box):
         return False
@@ -294,22 +468,8 @@ def is_small_exponent(base_element: Element, exponent_element: Element):
 
     if (base_label.isdigit() or base_label.isalpha()) \
             and (exponent_label.isalpha() or exponent_label.isdigit()):
-        script_dir = os.path.dirname(__file__)
-        rel_path = "Times-Roman.afm"
-        abs_file_path = os.path.join(script_dir, rel_path)
-        afm_path = Path(abs_file_path)
-        with afm_path.open('rb') as fh:
-            afm = AFM(fh)
-
-        base_box_basic = afm.get_bbox_char(base_label)
-        exponent_box_basic = afm.get_bbox_char(exponent_label)
-        base_w_basic = (base_box_basic[2] - base_box_basic[0]) / 1000
-        base_h_basic = (base_box_basic[3] - base_box_basic[1]) / 1000
-        exponent_w_basic = (exponent_box_basic[2] - exponent_box_basic[0]) / 1000
-        exponent_h_basic = (exponent_box_basic[3] - exponent_box_basic[1]) / 1000
-
-        base_area_basic = base_w_basic * base_h_basic
-        exponent_area_basic = exponent_w_basic * exponent_h_basic
+        base_area_basic = GLYPH_AREAS[base_label]
+        exponent_area_basic = GLYPH_AREAS[exponent_label]
         base_area = base_box.width * base_box.height
         exponent_area = exponent_box.width * exponent_box.height
         base_ratio = base_area / base_area_basic
@@ -426,7 +586,10 @@ def operator_is_exponent(base_element: Element, next_element: Element):
     return True
 
 
-def get_end_index_of_exponent(list_element: List[Element], base_element: Element, index: int) -> int:
+def get_end_index_of_exponent(list_element: List[Element], base_element: Element, index: int,
+                              element_arrays: ElementArrays = None) -> int:
+    if element_arrays is None:
+        element_arrays = ElementArrays(list_element)
     end_of_script = index_to_compare = index
     length = len(list_element)
     # get subscript or superscript
@@ -445,35 +608,37 @@ def get_end_index_of_exponent(list_element: List[Element], base_element: Element
 
         #  check current operator is exponent or not
         if is_operators(current_label):
-            if is_operator_inline(previous_element, current_element):
+            if element_arrays.is_operator_inline(previous_element, current_element):
 
                 next_operator_element = list_element[
                     end_of_script_temp + 1] if end_of_script_temp + 1 != length else None
 
                 if next_operator_element is not None:
-                    if not operator_is_exponent(base_element, next_operator_element):
+                    if not element_arrays.operator_is_exponent(base_element, next_operator_element):
                         break
             else:
                 break
         else:
             #  if current char is sub_script this is end of exponent
-            if is_sub_script(previous_element.box, current_element.box) \
-                    or not (is_super_script(base_element.box, current_element.box)
-                            or is_small_exponent(base_element, current_element)):
+            if element_arrays.is_sub_script(previous_element, current_element) \
+                    or not (element_arrays.is_super_script(base_element, current_element)
+                            or element_arrays.is_small_exponent(base_element, current_element)):
                 # comma can be sub_script so check the next char with previous char
                 if is_comma(current_label) and end_of_script + 2 <= length - 1:
-                    next_box = list_element[end_of_script + 2].box
-                    if is_sub_script(previous_element.box, next_box):
+                    next_element = list_element[end_of_script + 2]
+                    if element_arrays.is_sub_script(previous_element, next_element):
                         break
                 else:
                     break
 
         # get index to compare, and end_of_script if current label is exponent
-        if is_exponent(previous_element, current_element):
-            end_of_script = get_end_index_of_exponent(list_element, previous_element, end_of_script_temp)
+        if element_arrays.is_exponent(previous_element, current_element):
+            end_of_script = get_end_index_of_exponent(list_element, previous_element, end_of_script_temp,
+                                                      element_arrays)
         else:
-            if is_small_exponent(previous_element, current_element):
-                end_of_script = get_end_index_of_exponent(list_element, previous_element, end_of_script_temp)
+            if element_arrays.is_small_exponent(previous_element, current_element):
+                end_of_script = get_end_index_of_exponent(list_element, previous_element, end_of_script_temp,
+                                                          element_arrays)
             else:
                 end_of_script = end_of_script_temp
                 index_to_compare = end_of_script
@@ -481,7 +646,9 @@ def get_end_index_of_exponent(list_element: List[Element], base_element: Element
     return end_of_script
 
 
-def get_all_power(list_element: List[Element]) -> List[Power]:
+def get_all_power(list_element: List[Element], element_arrays: ElementArrays = None) -> List[Power]:
+    if element_arrays is None:
+        element_arrays = ElementArrays(list_element)
     length = len(list_element)
     remove_list = []
     result = []
@@ -490,25 +657,27 @@ def get_all_power(list_element: List[Element]) -> List[Power]:
             next_element = list_element[i + 1]
             current_element = list_element[i]
 
-            if is_exponent(current_element, next_element) or is_small_exponent(current_element, next_element):
+            if element_arrays.is_exponent(current_element, next_element) \
+                    or element_arrays.is_small_exponent(current_element, next_element):
 
                 if is_operators(next_element.expression) and i + 2 <= length - 1:
                     next_operator_element = list_element[i + 2] if i + 2 != length - 1 else None
 
                     if next_operator_element is not None:
-                        if not operator_is_exponent(next_element, next_operator_element):
+                        if not element_arrays.operator_is_exponent(next_element, next_operator_element):
                             continue
 
                 # get exponent
-                power = get_power_expression(list_element, current_element, i + 1)
+                power = get_power_expression(list_element, current_element, i + 1, element_arrays)
                 result.append(power)
                 remove_list = remove_list + power.list_element
 
     return result
 
 
-def get_power_expression(list_element: List[Element], base_element: Element, index: int) -> Power:
-    end_of_script = get_end_index_of_exponent(list_element, base_element, index)
+def get_power_expression(list_element: List[Element], base_element: Element, index: int,
+                         element_arrays: ElementArrays = None) -> Power:
+    end_of_script = get_end_index_of_exponent(list_element, base_element, index, element_arrays)
     list_exponent = []
     for i in range(index, end_of_script + 1):
         list_exponent.append(list_element[i])
@@ -641,47 +810,70 @@ def is_opening_bracket(token: str) -> bool:
     return token in ["{", "[", "("]
 
 
-def is_sub_fraction(super_fraction_element: List[Element], sub_fraction_element: List[Element]):
-    count = 0
-    for element in sub_fraction_element:
-        if element in super_fraction_element:
-            count += 1
+class ElementIndex:
+    """
+    Indexes of the elements sorted by the x coordinate of their center, so the elements
+    lying horizontally inside a fraction bar are found by two binary searches
+    instead of a scan over the whole list.
+    """
 
-    return count == len(sub_fraction_element)
+    def __init__(self, list_element: List[Element]):
+        self.indexes = sorted(range(len(list_element)), key=lambda i: list_element[i].box.center_x)
+        self.centers_x = [list_element[i].box.center_x for i in self.indexes]
+
+    def get_indexes_between(self, left: float, right: float) -> List[int]:
+        start = bisect_left(self.centers_x, left)
+        end = bisect_right(self.centers_x, right)
+        return sorted(self.indexes[start:end])
+
+
+def get_element_key(element: Element) -> tuple:
+    # hashable form of __eq__: fractions and powers compare by expression, elements by expression and box
+    if isinstance(element, (Fraction, Power)):
+        return type(element), element.expression
+    box = element.box
+    if box is None:
+        return element.expression, None
+    return element.expression, box.center_x, box.center_y, box.width, box.height
 
 
 def get_all_fractions(list_element: List[Element]) -> List[Fraction]:
     length = len(list_element)
     list_fractions = []
     list_unique_min_index = []
-    removed_list = []
+    # Fraction.__eq__ compares expressions, so removed fractions are tracked by expression
+    removed_expressions = set()
+    element_index = ElementIndex(list_element)
     # get all fraction by '-' token
     for i in range(0, length):
         label = list_element[i].expression
         if label == '-':
-            fraction = get_fraction_expression(list_element, i)
+            fraction = get_fraction_expression(list_element, i, element_index)
             if fraction is not None:
                 list_fractions.append(fraction)
 
     # add the sub fraction in supper fraction to removed_list
-    for item in list_fractions:
-        if item not in removed_list:
+    list_element_keys = [set(map(get_element_key, item.list_element)) for item in list_fractions]
+    for item, item_keys in zip(list_fractions, list_element_keys):
+        if item.expression not in removed_expressions:
             between_item = []
-            for x in list_fractions:
-                if is_sub_fraction(item.list_element, x.list_element) and x not in removed_list and x != item:
-                    between_item.append(x)
-            removed_list = removed_list + between_item
+            for x, x_keys in zip(list_fractions, list_element_keys):
+                if x_keys <= item_keys and x.expression not in removed_expressions and x.expression != item.expression:
+                    between_item.append(x.expression)
+            removed_expressions.update(between_item)
 
     # remove fraction in removed_list
     for item in list_fractions:
-        if item not in removed_list:
+        if item.expression not in removed_expressions:
             list_unique_min_index.append(item)
 
     return list_unique_min_index
 
 
-def get_fraction_expression(list_element: List[Element], index_of_fraction_sign: int) -> Fraction or None:
-    length = len(list_element)
+def get_fraction_expression(list_element: List[Element], index_of_fraction_sign: int,
+                            element_index: ElementIndex = None) -> Fraction or None:
+    if element_index is None:
+        element_index = ElementIndex(list_element)
 
     fraction_sign_box = list_element[index_of_fraction_sign].box
     numerator = ""
@@ -690,21 +882,19 @@ def get_fraction_expression(list_element: List[Element], index_of_fraction_sign:
     denominator_detections = []
     min_index = index_of_fraction_sign
     max_index = index_of_fraction_sign
-    for i in range(0, length):
+    for i in element_index.get_indexes_between(fraction_sign_box.left, fraction_sign_box.right):
         if i != index_of_fraction_sign:
 
             current_box = list_element[i].box
 
-            if current_box.center_y < fraction_sign_box.center_y \
-                    and fraction_sign_box.left <= current_box.center_x <= fraction_sign_box.right:
+            if current_box.center_y < fraction_sign_box.center_y:
                 if i < min_index:
                     min_index = i
                 if i > max_index:
                     max_index = i
                 numerator_detections.append(list_element[i])
 
-            if current_box.center_y > fraction_sign_box.center_y \
-                    and fraction_sign_box.left <= current_box.center_x <= fraction_sign_box.right:
+            if current_box.center_y > fraction_sign_box.center_y:
                 if i < min_index:
                     min_index = i
                 if i > max_index:
@@ -735,23 +925,7 @@ def get_fraction_expression(list_element: List[Element], index_of_fraction_sign:
 
 
 def convert_infix_to_latex(polynomial: str) -> str:
-    polynomial = polynomial.replace("^", "**")
-    result = ""
-    list_polynomial = polynomial.split("=")
-    length = len(list_polynomial)
-    for i in range(0, length):
-        polynomial = pytexit.py2tex(list_polynomial[i], print_latex=False, print_formula=False)
-        end = len(polynomial) - 2
-        if i == 0:
-            result = f"{polynomial[2:end]}"
-        else:
-            result = f"{result}={polynomial[2:end]}"
-
-    return f'$${result}$$'
-
-
-# print(pytexit.py2tex("2*x**2-3*(x+1)"))
-# print(convert_infix_to_latex("2*x**2-3*(x+1)"))
+    return convert_equation_to_latex(parse_equation(polynomial))
 
 
 class Tests(unittest.TestCase):
@@ -864,6 +1038,9 @@ class Tests(unittest.TestCase):
         ]
 
         self.assertEqual(convert_detections_to_expression(detections), "(1+a/b)/(1+1/(1+1/a))")
+        memo = ExpressionMemo()
+        self.assertEqual(convert_detections_to_expression(detections, memo), "(1+a/b)/(1+1/(1+1/a))")
+        self.assertGreater(memo.hits, 0)
 
         # frac5
         detections = [
@@ -1670,6 +1847,66 @@ class Tests(unittest.TestCase):
         self.assertEqual(get_all_fractions(list_element),
                          [Fraction("3x/3"), Fraction("(3+2x^2+3/5)/(1/6-5)"), Fraction("1/6")])
 
+    def test_element_index(self):
+        list_element = [
+            Element("1", Box(0.30, 0.1, 0.02, 0.1)),
+            Element("x", Box(0.10, 0.2, 0.05, 0.1)),
+            Element("-", Box(0.31, 0.2, 0.10, 0.01)),
+            Element("2", Box(0.32, 0.3, 0.02, 0.1)),
+        ]
+        element_index = ElementIndex(list_element)
+        self.assertEqual(element_index.get_indexes_between(0.26, 0.36), [0, 2, 3])
+        self.assertEqual(element_index.get_indexes_between(0.0, 0.30), [0, 1])
+        self.assertEqual(element_index.get_indexes_between(0.5, 0.6), [])
+        self.assertEqual(get_fraction_expression(list_element, 2, element_index), Fraction("1/2"))
+
+    def test_element_arrays(self):
+        detections = [
+            ("x", 0.4, (0.022205, 0.132465, 0.031870, 0.056460)),
+            ("2", 0.4, (0.042059, 0.095548, 0.013062, 0.043431)),
+            ("+", 0.4, (0.052508, 0.141694, 0.014107, 0.038002)),
+            ("2", 0.4, (0.084117, 0.207926, 0.032393, 0.079262)),
+            ("-", 0.4, (0.090125, 0.146580, 0.046499, 0.017372)),
+            ("1", 0.4, (0.093783, 0.090662, 0.020376, 0.077090)),
+            ("x", 0.4, (0.146813, 0.135722, 0.040752, 0.060803)),
+            ("y", 0.4, (0.217346, 0.137351, 0.033438, 0.042801)),
+            ("x", 0.4, (0.307732, 0.080347, 0.031348, 0.049946)),
+            ("2", 0.4, (0.330460, 0.046688, 0.014107, 0.039088)),
+        ]
+        list_element = convert_list_detection_to_list_element(detections)
+        element_arrays = ElementArrays(list_element)
+        self.assertEqual(len(element_arrays.position), len(list_element))
+        for previous_element in list_element:
+            for current_element in list_element:
+                if previous_element.box.center_x == current_element.box.center_x:
+                    continue
+                self.assertEqual(element_arrays.is_super_script(previous_element, current_element),
+                                 is_super_script(previous_element.box, current_element.box))
+                self.assertEqual(element_arrays.is_sub_script(previous_element, current_element),
+                                 is_sub_script(previous_element.box, current_element.box))
+                self.assertEqual(element_arrays.is_operator_inline(previous_element, current_element),
+                                 is_operator_inline(previous_element, current_element))
+                self.assertEqual(element_arrays.is_exponent(previous_element, current_element),
+                                 is_exponent(previous_element, current_element))
+                self.assertEqual(element_arrays.is_small_exponent(previous_element, current_element),
+                                 is_small_exponent(previous_element, current_element))
+
+    def test_element_arrays_same_center_x(self):
+        detections = [("x", 0.4, (0.1 * i, 0.5, 0.05, 0.05)) for i in range(1, vectorized_relation_min_elements)]
+        # a digit right above the first x
+        detections.append(("2", 0.4, (0.1, 0.4, 0.02, 0.02)))
+        list_element = convert_list_detection_to_list_element(detections)
+        element_arrays = ElementArrays(list_element)
+        self.assertEqual(len(element_arrays.position), len(list_element))
+        base_element, exponent_element = list_element[0], list_element[-1]
+        self.assertEqual(base_element.box.center_x, exponent_element.box.center_x)
+        self.assertTrue(is_super_script(base_element.box, exponent_element.box))
+        # the same ZeroDivisionError as the scalar predicate, not a quiet inf slope
+        self.assertRaises(ZeroDivisionError, is_exponent, base_element, exponent_element)
+        self.assertRaises(ZeroDivisionError, element_arrays.is_exponent, base_element, exponent_element)
+        self.assertEqual(element_arrays.is_exponent(exponent_element, base_element),
+                         is_exponent(exponent_element, base_element))
+
     def test_convert_infix_to_latex(self):
         polynomial = "4=x^2"
         self.assertEqual(convert_infix_to_latex(polynomial), "$$4=x^2$$")
@@ -1735,6 +1972,12 @@ class Tests(unittest.TestCase):
                 Element(box=Box(0.435885, 0.202519, 0.098565, 0.187984), expression="2")),
             True)
 
+    def test_glyph_areas(self):
+        # C 120 ; WX 500 ; N x ; B 17 0 479 450 ;
+        self.assertEqual(GLYPH_AREAS["x"], (479 - 17) / 1000 * (450 / 1000))
+        # C 50 ; WX 500 ; N two ; B 30 0 475 676 ;
+        self.assertEqual(GLYPH_AREAS["2"], (475 - 30) / 1000 * (676 / 1000))
+
     def test_small_expression(self):
         # exponent_size
         detections = [
@@ -1,5 +1,8 @@
+import json
+import zipfile
+
+from django.http import StreamingHttpResponse
 from django.utils.datastructures import MultiValueDictKeyError
-from numpy import asarray
 from processor import algorithm
 from rest_framework.decorators import api_view
 from rest_framework.parsers import *
@@ -9,6 +12,7 @@ from slqe.service.class_version_service import *
 from slqe.service.image_service import *
 from slqe.service.image_service import ImageService
 from slqe.service.user_service import *
+from slqe.service.weight_version_service import WeightVersionService
 from slqe.utils.jwt_utils import *
 
 logger = logging.getLogger(__name__)
@@ -23,10 +27,8 @@ class ImageController(APIView):
     def process_image(self):
         print(os.getcwd())
         file_obj = self.FILES.get('file')
-        image = PIL.Image.open(file_obj)
-
-        parsed_array = asarray(image)
-        parsed_array = cv2.cvtColor(parsed_array, cv2.COLOR_RGB2BGR)
+        WeightVersionService().sync_active_weight()
+        parsed_array = algorithm.load_upload(file_obj)
 
         valid, message, expression, latex, roots = algorithm.process(parsed_array)
 
@@ -118,4 +120,61 @@ class ImageController(APIView):
                 return JsonResponse(image_serializer.data, status=status.HTTP_201_CREATED)
             except (MultiValueDictKeyError, UnidentifiedImageError):
                 return JsonResponse({"message": "An application require a image to recognize"},
-                                    status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+                                    status=status.HTTP_400_BAD_REQUEST)
+
+    @api_view(['POST'])
+    def user_images_bulk(self, user_id):
+        try:
+            # get token from header
+            token = self.META.get('HTTP_AUTHORIZATION')
+            # check authentication
+            flag_verify = is_verified(token=token)
+            if not flag_verify:
+                return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+
+            # check authorization
+            role = ("CUSTOMER")
+            flag_permission = is_permitted(token, role)
+            if not flag_permission:
+                return HttpResponse(status=status.HTTP_403_FORBIDDEN)
+
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms='HS256')
+            user_access = User.objects.get(id=payload['id'], is_active=True)
+            service = UserService()
+            user = service.get_user_active(user_id)
+            if user_access.id != user.id:
+                return HttpResponse(status=status.HTTP_403_FORBIDDEN)
+        except User.DoesNotExist:
+            return JsonResponse({'message': 'The user does not exist'}, status=status.HTTP_404_NOT_FOUND)
+        except DecodeError:
+            return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+
+        image_service = ImageService()
+        files = self.FILES.getlist('files')
+        archive_obj = self.FILES.get('archive')
+        if archive_obj:
+            try:
+                files = files + image_service.extract_archive(archive_obj)
+            except zipfile.BadZipFile:
+                return JsonResponse({"message": "The archive must be a zip file"}, status=status.HTTP_400_BAD_REQUEST)
+            except ArchiveTooLargeError as e:
+                return JsonResponse({"message": str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        if not files:
+            return JsonResponse({"message": "An application require a image to recognize"},
+                                status=status.HTTP_400_BAD_REQUEST)
+        save = "0"
+        if self.POST and self.POST.get('save') and self.POST.get('save') == '1':
+            save = "1"
+
+        # one JSON document per line, in the order the images finish
+        def stream_results():
+            for index, image_model, message in image_service.solve_equations(save, files, user):
+                result = {"index": index, "name": files[index].name}
+                if image_model is None:
+                    result["message"] = message
+                else:
+                    result.update(ImageSerializer(image_model).data)
+                yield json.dumps(result) + "\n"
+
+        return StreamingHttpResponse(stream_results(), content_type="application/x-ndjson",
+                                     status=status.HTTP_201_CREATED)
@@ -1,19 +1,31 @@
 import logging
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
-import PIL.Image
 import boto3
-import cv2
+from PIL import UnidentifiedImageError
+from django.core.files.base import ContentFile
 from django.http.response import *
-from numpy import asarray
 from processor import algorithm
 from rest_framework.views import *
 from slqe.serializer.serializers import *
 from slqe.utils.jwt_utils import *
+from slqe.service.weight_version_service import WeightVersionService
 from slqe.utils.utils import parse_offset_limit
 
 logger = logging.getLogger(__name__)
 
+BULK_SOLVE_WORKERS = 4
+# bounds on what one uploaded zip may expand to
+MAX_ARCHIVE_ENTRIES = 100
+MAX_ARCHIVE_SIZE = 100 * 1024 * 1024
+
+
+class ArchiveTooLargeError(Exception):
+    pass
+
 
 class ImageService:
 
@@ -40,11 +52,16 @@ class ImageService:
         return total_image, images
 
     def solve_equation(self, save, file_obj, user):
-        image = PIL.Image.open(file_obj)
+        WeightVersionService().sync_active_weight()
+        image_model = self.create_image_model(save, file_obj, user)
+        if save == '1':
+            image_model.save()
+        return image_model
+
+    def create_image_model(self, save, file_obj, user):
+        parsed_array = algorithm.load_upload(file_obj)
         now = datetime.now()
         url = ""
-        parsed_array = asarray(image)
-        parsed_array = cv2.cvtColor(parsed_array, cv2.COLOR_RGB2BGR)
         valid, message, expression, latex, roots = algorithm.process(parsed_array)
 
         if save == '1':
@@ -56,11 +73,53 @@ class ImageService:
             bucket.put_object(Key=filename + "_" + str(now), Body=file_obj)
             url = "https://s3-%s.amazonaws.com/%s/%s" % (
                 settings.AWS_LOCATION, settings.AWS_STORAGE_BUCKET_NAME, filename)
-            image_model = Image.create(user=user, url=url, date_time=now, expression=expression, latex=latex,
-                                       roots=roots, success=valid, message=message)
-            image_model.save()
-        else:
-            image_model = Image.create(user=user, url=url, date_time=now, expression=expression, latex=latex,
-                                       roots=roots, success=valid, message=message)
 
-        return image_model
+        return Image.create(user=user, url=url, date_time=now, expression=expression, latex=latex,
+                            roots=roots, success=valid, message=message)
+
+    def extract_archive(self, archive_obj):
+        """
+        Read the files of a zip upload, raising ArchiveTooLargeError past MAX_ARCHIVE_ENTRIES
+        files or MAX_ARCHIVE_SIZE decompressed bytes.
+        """
+        files = []
+        remaining_size = MAX_ARCHIVE_SIZE
+        with zipfile.ZipFile(archive_obj) as archive:
+            entries = [entry for entry in archive.infolist() if not entry.is_dir()]
+            if len(entries) > MAX_ARCHIVE_ENTRIES:
+                raise ArchiveTooLargeError("The archive must contain at most %d files" % MAX_ARCHIVE_ENTRIES)
+            for entry in entries:
+                # the sizes in the headers are not trusted, the read stops one byte past the limit
+                with archive.open(entry) as source:
+                    content = source.read(remaining_size + 1)
+                remaining_size -= len(content)
+                if remaining_size < 0:
+                    raise ArchiveTooLargeError(
+                        "The archive must expand to at most %d MB" % (MAX_ARCHIVE_SIZE // (1024 * 1024)))
+                files.append(ContentFile(content, name=os.path.basename(entry.filename)))
+        return files
+
+    def solve_equations(self, save, files, user):
+        """
+        Solve every uploaded file on a worker pool and yield (index, image_model, message)
+        in completion order. image_model is None when the file could not be solved.
+        Saved images are written before they are yielded, so they carry their id.
+        """
+        WeightVersionService().sync_active_weight()
+        with ThreadPoolExecutor(max_workers=BULK_SOLVE_WORKERS) as executor:
+            futures = {executor.submit(self.create_image_model, save, file_obj, user): index
+                       for index, file_obj in enumerate(files)}
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    image_model = future.result()
+                    if save == '1':
+                        image_model.save()
+                except UnidentifiedImageError:
+                    yield index, None, "An application require a image to recognize"
+                    continue
+                except Exception:
+                    logger.exception("Cannot solve file %s", files[index].name)
+                    yield index, None, "Cannot process the image"
+                    continue
+                yield index, image_model, ""
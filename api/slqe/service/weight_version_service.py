@@ -2,6 +2,7 @@ import logging
 from datetime import datetime
 
 from django.http.response import *
+from processor import network_pool
 from slqe.utils.jwt_utils import *
 from slqe.serializer.serializers import *
 from slqe.utils.utils import parse_offset_limit
@@ -9,6 +10,10 @@ from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# seconds between two lookups of the active weight version on the inference path
+ACTIVE_WEIGHT_CHECK_INTERVAL = 5
+_last_active_weight_check = 0
+
 
 class WeightVersionService:
     pass
@@ -82,6 +87,24 @@ class WeightVersionService:
 
         if is_save:
             version.save()
+            # let the next request of this worker pick the new weights up immediately
+            global _last_active_weight_check
+            _last_active_weight_check = 0
+
+    def get_active_weight(self):
+        return WeightVersion.objects.filter(is_active=True).first()
+
+    def sync_active_weight(self):
+        # other workers notice the change within ACTIVE_WEIGHT_CHECK_INTERVAL seconds,
+        # the new weights are loaded in the background while requests keep using the old ones
+        global _last_active_weight_check
+        now = time.monotonic()
+        if now - _last_active_weight_check < ACTIVE_WEIGHT_CHECK_INTERVAL:
+            return
+        _last_active_weight_check = now
+        version = self.get_active_weight()
+        if version:
+            network_pool.activate_weights(version.url, version.id)
 
     def weight_get_last_version(self, class_id):
         version = WeightVersion.objects.filter(class_version=class_id).order_by('-created_date').first()
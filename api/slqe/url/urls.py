@@ -10,6 +10,7 @@ urlpatterns = [
     url(r'^users/(\w+)$', UserController.user_detail),
     url(r'^images$', ImageController.process_image),
     url(r'^users/(\w+)/images$', ImageController.user_images),
+    url(r'^users/(\w+)/images/bulk$', ImageController.user_images_bulk),
     url(r'^users/(\w+)/images/(\w+)$', ImageController.images_detail),
     url(r'^versions$', ClassVersionController.class_list),
     url(r'^versions/(\w+)$', ClassVersionController.class_detail),
@@ -1 +1,2 @@
-__all__ = ["polynomial", "convert_to_token_list", "util", "error", "solve", "convert_to_postfix"]
+__all__ = ["polynomial", "convert_to_token_list", "util", "error", "solve", "convert_to_postfix", "eigenvalue", "sturm",
+           "closed_form", "result_cache", "expression_tree"]
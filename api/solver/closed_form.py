@@ -0,0 +1,181 @@
+import unittest
+from math import acos, copysign, cos, pi, sqrt
+
+# a discriminant within this fraction of the size of its terms is too close to
+# zero to trust its sign: the roots are (nearly) repeated and lose half their digits
+DISCRIMINANT_TOLERANCE = 1e-9
+NEWTON_ITERATIONS = 2
+
+
+def evaluate(coefficients: list, x: float) -> float:
+    result = 0.0
+    for coefficient in coefficients:
+        result = result * x + coefficient
+    return result
+
+
+def polish_root(coefficients: list, root: float) -> float:
+    """
+    A couple of Newton steps on the original coefficients, to win back the digits
+    lost to cancellation in the formulas. A step is only taken when it lowers the residual.
+    """
+    derivative = [coefficient * (len(coefficients) - 1 - index) for index, coefficient in enumerate(coefficients[:-1])]
+    residual = abs(evaluate(coefficients, root))
+    for _ in range(NEWTON_ITERATIONS):
+        slope = evaluate(derivative, root)
+        if residual == 0 or slope == 0:
+            break
+        candidate = root - evaluate(coefficients, root) / slope
+        candidate_residual = abs(evaluate(coefficients, candidate))
+        if candidate_residual >= residual:
+            break
+        root, residual = candidate, candidate_residual
+    return root
+
+
+def solve_quadratic(a: float, b: float, c: float):
+    """
+    Real roots of a x^2 + b x + c with a != 0, sorted, or None when the
+    discriminant is too close to zero. The root of larger magnitude comes from
+    the usual formula with the sign that avoids cancellation, the other from
+    the product of the roots c / a.
+    """
+    discriminant = b * b - 4 * a * c
+    if abs(discriminant) <= DISCRIMINANT_TOLERANCE * (b * b + abs(4 * a * c)):
+        return None
+    if discriminant < 0:
+        return []
+    q = -(b + copysign(sqrt(discriminant), b)) / 2
+    return sorted([q / a, c / q])
+
+
+def solve_cubic(a: float, b: float, c: float, d: float):
+    """
+    Real roots of a x^3 + b x^2 + c x + d with a != 0, sorted, or None when the
+    discriminant is too close to zero. The depressed cubic t^3 + p t + q is
+    solved with the trigonometric form when it has three real roots and with
+    Cardano's formula when it has one.
+    """
+    b, c, d = b / a, c / a, d / a
+    shift = b / 3
+    p = c - b * b / 3
+    q = 2 * b * b * b / 27 - b * c / 3 + d
+    # the discriminant of the depressed cubic is -(4 p^3 + 27 q^2)
+    cube, square = 4 * p * p * p, 27 * q * q
+    if abs(cube + square) <= DISCRIMINANT_TOLERANCE * (abs(cube) + square):
+        return None
+    if cube + square < 0:
+        radius = 2 * sqrt(-p / 3)
+        angle = acos(max(-1.0, min(1.0, 3 * q / (p * radius)))) / 3
+        roots = [radius * cos(angle - 2 * pi * k / 3) - shift for k in range(3)]
+    else:
+        # the cube root with the sign of -q avoids cancellation, the other term is -p / 3u
+        u = -copysign(abs(q / 2 + copysign(sqrt(q * q / 4 + p * p * p / 27), q)) ** (1 / 3), q)
+        roots = [u - p / (3 * u) - shift]
+    return sorted(polish_root([1, b, c, d], root) for root in roots)
+
+
+def solve_quartic(a: float, b: float, c: float, d: float, e: float):
+    """
+    Real roots of a x^4 + b x^3 + c x^2 + d x + e with a != 0, sorted, or None
+    when one of the steps is too close to a repeated root. Ferrari's method:
+    the depressed quartic y^4 + p y^2 + q y + r is written as a difference of
+    squares with a positive root m of the resolvent cubic
+    8 m^3 + 8 p m^2 + (2 p^2 - 8 r) m - q^2, and splits into two quadratics.
+    """
+    b, c, d, e = b / a, c / a, d / a, e / a
+    shift = b / 4
+    p = c - 3 * b * b / 8
+    q = b * b * b / 8 - b * c / 2 + d
+    r = -3 * b * b * b * b / 256 + b * b * c / 16 - b * d / 4 + e
+    if abs(q) <= DISCRIMINANT_TOLERANCE * max(abs(p), sqrt(abs(r))) ** 1.5:
+        # biquadratic: y^2 is a root of z^2 + p z + r
+        squares = solve_quadratic(1, p, r)
+        if squares is None or any(square == 0 for square in squares):
+            return None
+        roots = [sign * sqrt(square) for square in squares if square > 0 for sign in (-1, 1)]
+    else:
+        resolvent_roots = solve_cubic(8, 8 * p, 2 * p * p - 8 * r, -q * q)
+        if not resolvent_roots or resolvent_roots[-1] <= 0:
+            return None
+        m = resolvent_roots[-1]
+        slope = sqrt(2 * m)
+        roots = []
+        for sign in (-1, 1):
+            quadratic_roots = solve_quadratic(1, sign * slope, p / 2 + m - sign * q / (2 * slope))
+            if quadratic_roots is None:
+                return None
+            roots.extend(quadratic_roots)
+    return sorted(polish_root([1, b, c, d, e], root - shift) for root in roots)
+
+
+def find_real_roots(coefficients: list):
+    """
+    Real roots of the polynomial with `coefficients` (highest degree first) of
+    degree 2 to 4, sorted, or None when the closed form is not stable enough
+    and an iterative engine should be used instead. A root at zero is split
+    off first so that it comes back exact.
+    """
+    coefficients = [float(coefficient) for coefficient in coefficients]
+    zero_root = False
+    while len(coefficients) > 1 and coefficients[-1] == 0:
+        coefficients.pop()
+        if zero_root:
+            return None
+        zero_root = True
+
+    degree = len(coefficients) - 1
+    if degree == 0:
+        roots = []
+    elif degree == 1:
+        roots = [-coefficients[1] / coefficients[0]]
+    elif degree == 2:
+        roots = solve_quadratic(*coefficients)
+    elif degree == 3:
+        roots = solve_cubic(*coefficients)
+    else:
+        roots = solve_quartic(*coefficients)
+    if roots is None:
+        return None
+    if zero_root:
+        roots = sorted(roots + [0.0])
+    return roots
+
+
+class Tests(unittest.TestCase):
+
+    def assertRootsAlmostEqual(self, roots, expected_roots):
+        self.assertIsNotNone(roots)
+        self.assertEqual(len(roots), len(expected_roots))
+        for root, expected_root in zip(roots, expected_roots):
+            self.assertAlmostEqual(root, expected_root, 9)
+
+    def test_solve_quadratic(self):
+        self.assertEqual(solve_quadratic(1, 0, -1), [-1, 1])
+        self.assertEqual(solve_quadratic(1, 0, 1), [])
+        self.assertIsNone(solve_quadratic(1, -2, 1))
+        # both roots keep their digits when b^2 dwarfs 4ac
+        self.assertRootsAlmostEqual(solve_quadratic(1, -1e8, 1), [1e-8, 1e8])
+        self.assertAlmostEqual(solve_quadratic(1, -1e8, 1)[0] / 1e-8, 1, 12)
+
+    def test_solve_cubic(self):
+        self.assertRootsAlmostEqual(solve_cubic(1, 6, 11, 6), [-3, -2, -1])
+        self.assertRootsAlmostEqual(solve_cubic(1, 0, 1, -100), [4.569780162932651])
+        self.assertRootsAlmostEqual(solve_cubic(2, 0, 0, -16), [2])
+        self.assertRootsAlmostEqual(solve_cubic(1, -1, 0, 0.0001), [-0.009950615177038496, 0.0100506351840415,
+                                                                   0.9998999799929967])
+        self.assertIsNone(solve_cubic(1, -3, 3, -1))
+        self.assertIsNone(solve_cubic(1, 0, -3, 2))
+
+    def test_solve_quartic(self):
+        self.assertRootsAlmostEqual(solve_quartic(1, 0, -5, 0, 4), [-2, -1, 1, 2])
+        self.assertRootsAlmostEqual(solve_quartic(1, 0, -4, 20, -7), [-3.2788446831784674, 0.377483540133691])
+        self.assertRootsAlmostEqual(solve_quartic(1, -10, 35, -50, 24), [1, 2, 3, 4])
+        self.assertRootsAlmostEqual(solve_quartic(1, 0, 0, 0, 1), [])
+        self.assertIsNone(solve_quartic(1, 0, -2, 0, 1))
+
+    def test_find_real_roots(self):
+        self.assertRootsAlmostEqual(find_real_roots([0.25, 0, -0.5, 0]), [-sqrt(2), 0, sqrt(2)])
+        self.assertEqual(find_real_roots([1, -1, 0]), [0, 1])
+        self.assertIsNone(find_real_roots([3, 0, 0]))
+        self.assertEqual(find_real_roots([1, 0, 1, 0]), [0])
@@ -0,0 +1,91 @@
+import unittest
+
+import numpy as np
+
+NEWTON_ITERATIONS = 50
+# eigenvalues whose imaginary part is within this fraction of their magnitude count as real
+IMAGINARY_TOLERANCE = 1e-9
+
+
+def get_companion_matrix(coefficients: np.ndarray) -> np.ndarray:
+    """
+    Companion matrix of the monic polynomial with `coefficients` (highest degree
+    first, leading coefficient 1). Its eigenvalues are the polynomial roots.
+    """
+    degree = len(coefficients) - 1
+    matrix = np.diag(np.ones(degree - 1), -1)
+    matrix[0, :] = -coefficients[1:]
+    return matrix
+
+
+def polish_roots(coefficients: np.ndarray, roots: np.ndarray) -> np.ndarray:
+    """
+    Refine every root at once with Newton steps on the original coefficients.
+    A step is only taken where it lowers the residual, so roots of even
+    multiplicity, where the derivative vanishes too, stay put instead of diverging.
+    """
+    derivative = np.polyder(coefficients)
+    with np.errstate(all="ignore"):
+        residuals = np.abs(np.polyval(coefficients, roots))
+        for _ in range(NEWTON_ITERATIONS):
+            slopes = np.polyval(derivative, roots)
+            steps = np.where(slopes != 0, np.polyval(coefficients, roots) / np.where(slopes != 0, slopes, 1), 0)
+            candidates = roots - steps
+            candidate_residuals = np.abs(np.polyval(coefficients, candidates))
+            improved = candidate_residuals < residuals
+            if not np.any(improved):
+                break
+            roots = np.where(improved, candidates, roots)
+            residuals = np.where(improved, candidate_residuals, residuals)
+    return roots
+
+
+def find_real_roots(coefficients: list, epsilon: float) -> list:
+    """
+    Real roots of the polynomial with `coefficients` (highest degree first),
+    from the eigenvalues of its companion matrix, sorted and without duplicates.
+    A root is kept when its eigenvalue is real or when the polished real part
+    evaluates within `epsilon` of zero, which is how bisection accepts a root too.
+    """
+    coefficients = np.trim_zeros(np.asarray(coefficients, dtype=np.float64), "f")
+    trimmed = np.trim_zeros(coefficients, "b")
+    zero_root_count = len(coefficients) - len(trimmed)
+    coefficients = coefficients / coefficients[0]
+    trimmed = trimmed / trimmed[0]
+
+    if len(trimmed) > 1:
+        eigenvalues = np.linalg.eigvals(get_companion_matrix(trimmed))
+    else:
+        eigenvalues = np.zeros(0, dtype=np.complex128)
+    real_parts = polish_roots(coefficients, eigenvalues.real)
+    with np.errstate(all="ignore"):
+        is_real = (np.abs(eigenvalues.imag) <= IMAGINARY_TOLERANCE * np.maximum(np.abs(eigenvalues), 1)) | \
+                  (np.abs(np.polyval(coefficients, real_parts)) <= epsilon)
+
+    roots = sorted(real_parts[is_real].tolist() + [0.0] * zero_root_count)
+    unique_roots = []
+    for root in roots:
+        if not unique_roots or root - unique_roots[-1] > epsilon:
+            unique_roots.append(root)
+    return unique_roots
+
+
+class Tests(unittest.TestCase):
+
+    def test_companion_matrix(self):
+        matrix = get_companion_matrix(np.array([1., -3., 2.]))
+        self.assertEqual(matrix.tolist(), [[3, -2], [1, 0]])
+        self.assertEqual(sorted(np.linalg.eigvals(matrix).tolist()), [1, 2])
+
+    def test_find_real_roots(self):
+        epsilon = 0.00001
+        self.assertEqual(find_real_roots([1, 0, -1], epsilon), [-1, 1])
+        self.assertEqual(find_real_roots([1, 0, 1], epsilon), [])
+        self.assertEqual(find_real_roots([3, 0, 0], epsilon), [0])
+        self.assertEqual(find_real_roots([2, -6], epsilon), [3])
+        # a double root splits into a complex pair in the eigenvalues
+        roots = find_real_roots([1, -2, 1], epsilon)
+        self.assertEqual(len(roots), 1)
+        self.assertAlmostEqual(roots[0], 1, 4)
+        roots = find_real_roots([1, 6, 11, 6], epsilon)
+        self.assertEqual([round(root, 6) for root in roots], [-3, -2, -1])
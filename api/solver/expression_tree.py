@@ -0,0 +1,293 @@
+import re
+import unittest
+
+from solver.convert_to_postfix import convert_infix_to_postfix
+from solver.convert_to_token_list import convert_to_token_list
+from solver.error import ExpressionSyntaxError
+
+# one alternative per token kind, the group name tells the kind of the match;
+# anything else is a single unsupported character
+TOKEN_PATTERN = re.compile(r"\s*(?:(?P<number>\d+\.?\d*|\.\d+)|(?P<variable>[a-zA-Z])|(?P<operator>[-+*/^])"
+                           r"|(?P<opening>[(\[{])|(?P<closing>[)\]}])|(?P<end>$)|(?P<error>.))")
+
+# same binding powers as convert_to_postfix.get_precedence
+BINARY_PRECEDENCE = {"+": 0, "-": 0, "*": 2, "/": 2, "^": 3}
+UNARY_PRECEDENCE = 3
+UNARY_OPERATORS = {"-": "neg", "+": "pos"}
+RIGHT_ASSOCIATIVE = {"^"}
+CLOSING_BRACKETS = {"(": ")", "[": "]", "{": "}"}
+# what convert_to_token_list accepts; an error names the first other character, as it did
+TOKENIZER_CHARACTERS = set("0123456789.x+-*/^()[]{}")
+
+
+class Number:
+    __slots__ = ("value", "text")
+
+    def __init__(self, value: float, text: str):
+        self.value = value
+        # as written in the expression, for rendering
+        self.text = text
+
+    def __eq__(self, other):
+        return isinstance(other, Number) and self.value == other.value
+
+    def __repr__(self):
+        return self.text
+
+
+class Variable:
+    __slots__ = ("name",)
+
+    def __init__(self, name: str = "x"):
+        self.name = name
+
+    def __eq__(self, other):
+        return isinstance(other, Variable) and self.name == other.name
+
+    def __repr__(self):
+        return self.name
+
+
+class UnaryOperation:
+    __slots__ = ("operator", "operand")
+
+    def __init__(self, operator: str, operand):
+        # "neg" or "pos", as in the token lists
+        self.operator = operator
+        self.operand = operand
+
+    def __eq__(self, other):
+        return isinstance(other, UnaryOperation) and self.operator == other.operator and \
+            self.operand == other.operand
+
+    def __repr__(self):
+        return "{}({!r})".format(self.operator, self.operand)
+
+
+class BinaryOperation:
+    __slots__ = ("operator", "left", "right")
+
+    def __init__(self, operator: str, left, right):
+        self.operator = operator
+        self.left = left
+        self.right = right
+
+    def __eq__(self, other):
+        return isinstance(other, BinaryOperation) and self.operator == other.operator and \
+            self.left == other.left and self.right == other.right
+
+    def __repr__(self):
+        return "({!r} {} {!r})".format(self.left, self.operator, self.right)
+
+
+class Parser:
+    """
+    Pratt parser that pulls the tokens from the scanner as it goes, so the
+    expression is read once, left to right, straight into the tree.
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        self.next_match = TOKEN_PATTERN.scanner(expression).match
+        self.kind = None
+        self.text = None
+        self.advance()
+
+    def advance(self):
+        self.match = match = self.next_match()
+        self.kind = match.lastgroup
+        self.text = match.group(match.lastindex)
+
+    def raise_not_supported(self):
+        # the token with the whitespace before it, after the variable it follows, variables being one letter
+        start, end = self.match.span()
+        if start > 0 and self.expression[start - 1].isalpha():
+            start -= 1
+        text = next((character for character in self.expression[start:end] if character not in TOKENIZER_CHARACTERS),
+                    self.text)
+        raise ExpressionSyntaxError("Token is not supported: " + text)
+
+    def parse(self):
+        node = self.parse_operation(0)
+        if self.kind == "closing":
+            raise ExpressionSyntaxError("Cannot find corresponding opening bracket of: " + self.text)
+        if self.kind != "end":
+            raise ExpressionSyntaxError("Invalid expression")
+        return node
+
+    def parse_operation(self, min_precedence: int):
+        left = self.parse_operand()
+        while self.kind == "operator":
+            operator = self.text
+            precedence = BINARY_PRECEDENCE[operator]
+            if precedence < min_precedence:
+                break
+            self.advance()
+            right = self.parse_operation(precedence if operator in RIGHT_ASSOCIATIVE else precedence + 1)
+            left = BinaryOperation(operator, left, right)
+        # an operand right after another one, or a character no token matches
+        if self.kind in ("number", "variable", "error"):
+            self.raise_not_supported()
+        return left
+
+    def parse_operand(self):
+        kind, text = self.kind, self.text
+        if kind == "number":
+            self.advance()
+            return Number(float(text), text)
+        if kind == "variable":
+            self.advance()
+            return Variable(text)
+        if kind == "operator" and text in UNARY_OPERATORS:
+            self.advance()
+            return UnaryOperation(UNARY_OPERATORS[text], self.parse_operation(UNARY_PRECEDENCE))
+        if kind == "opening":
+            self.advance()
+            node = self.parse_operation(0)
+            if self.kind != "closing" or self.text != CLOSING_BRACKETS[text]:
+                raise ExpressionSyntaxError("Invalid expression")
+            self.advance()
+            return node
+        if kind == "error":
+            raise ExpressionSyntaxError("Token is not supported: " + text)
+        raise ExpressionSyntaxError("Invalid expression")
+
+
+def parse_expression(expression: str):
+    """
+    Parse one side of an equation into a tree of Number, Variable,
+    UnaryOperation and BinaryOperation nodes, with the precedences and
+    associativities of convert_infix_to_postfix.
+    """
+    try:
+        return Parser(expression).parse()
+    except RecursionError:
+        raise ExpressionSyntaxError("Expression is nested too deeply")
+
+
+def convert_tree_to_postfix(node) -> list:
+    if isinstance(node, Number):
+        return [node.text]
+    if isinstance(node, Variable):
+        return [node.name]
+    if isinstance(node, UnaryOperation):
+        return convert_tree_to_postfix(node.operand) + [node.operator]
+    return convert_tree_to_postfix(node.left) + convert_tree_to_postfix(node.right) + [node.operator]
+
+
+def parse_equation(expression: str) -> list:
+    """
+    The trees of the sides of an equation, or a single tree without "=".
+    """
+    return [parse_expression(side) for side in expression.split("=")]
+
+
+def is_sum(node) -> bool:
+    return isinstance(node, BinaryOperation) and node.operator in ("+", "-")
+
+
+def wrap(latex: str) -> str:
+    return "\\left(" + latex + "\\right)"
+
+
+def format_number(text: str) -> str:
+    # as pytexit printed numbers: 9.30 as 9.3, 2.0 as 2, .5 as 0.5
+    if "." in text:
+        text = text.rstrip("0").rstrip(".")
+    if text.startswith("."):
+        text = "0" + text
+    return text or "0"
+
+
+def convert_tree_to_latex(node) -> str:
+    """
+    LaTeX of an expression tree: divisions become fractions, brackets are only
+    written where the precedences need them, and a product is written as
+    juxtaposition unless its right factor starts with a number or a fraction.
+    A number multiplying from the right is written first, x*3 as 3x.
+    """
+    if isinstance(node, Number):
+        return format_number(node.text)
+    if isinstance(node, Variable):
+        return node.name
+    if isinstance(node, UnaryOperation):
+        operand = convert_tree_to_latex(node.operand)
+        if is_sum(node.operand) or operand[0] in "+-":
+            operand = wrap(operand)
+        return ("-" if node.operator == "neg" else "+") + operand
+
+    left = convert_tree_to_latex(node.left)
+    right = convert_tree_to_latex(node.right)
+    operator = node.operator
+    if operator == "/":
+        return "\\frac{" + left + "}{" + right + "}"
+    if operator == "^":
+        if not isinstance(node.left, (Number, Variable)):
+            left = wrap(left)
+        return left + "^" + (right if len(right) == 1 else "{" + right + "}")
+    # a sign right after another operator reads badly
+    if right[0] in "+-" or operator != "+" and is_sum(node.right):
+        right = wrap(right)
+    if operator != "*":
+        return left + operator + right
+    if is_sum(node.left):
+        left = wrap(left)
+    if isinstance(node.right, Number) and left[0] not in "0123456789.+-" and not left.startswith("\\frac"):
+        return right + left
+    if right[0] in "0123456789." or right.startswith("\\frac"):
+        return left + "\\times" + right
+    return left + right
+
+
+def convert_equation_to_latex(sides: list) -> str:
+    return "$$" + "=".join(convert_tree_to_latex(side) for side in sides) + "$$"
+
+
+class Tests(unittest.TestCase):
+
+    def test_parse_expression(self):
+        x = Variable()
+        self.assertEqual(parse_expression("x"), x)
+        self.assertEqual(parse_expression("2.5"), Number(2.5, "2.5"))
+        self.assertEqual(parse_expression("1+2*x"), BinaryOperation("+", Number(1, "1"),
+                                                                   BinaryOperation("*", Number(2, "2"), x)))
+        self.assertEqual(parse_expression("x-1-2"), BinaryOperation("-", BinaryOperation("-", x, Number(1, "1")),
+                                                                    Number(2, "2")))
+        self.assertEqual(parse_expression("2^x^3"), BinaryOperation("^", Number(2, "2"),
+                                                                   BinaryOperation("^", x, Number(3, "3"))))
+        self.assertEqual(parse_expression("-x^2"), UnaryOperation("neg", BinaryOperation("^", x, Number(2, "2"))))
+        self.assertEqual(parse_expression("[x]*{ 2 }"), BinaryOperation("*", x, Number(2, "2")))
+        self.assertEqual(parse_expression("y*2"), BinaryOperation("*", Variable("y"), Number(2, "2")))
+        self.assertEqual(parse_equation("x=2"), [x, Number(2, "2")])
+
+    def test_same_as_postfix(self):
+        expressions = ["4", "x", "4+5", "3+4*5", "1+2^2^3", "3+4*5-2*6", "3+2*(x+1)-7", "3+2*x^2-1", "(x+1)^2-3",
+                       "x-(x+1)*(x+2)-10", "(2.5*x+10)^2-3", "-x^2+1", "+x^2+1", "x^-2^2", "2*-x/-3", "--x",
+                       "-(x+1)*x", "x/2/3*4", "x^2^-1", "(x^(3-x/2))/(x^2+1)", "3*x/3-1+(3+2*x^2+3/5)/(1/6-5)+1/6"]
+        for expression in expressions:
+            self.assertEqual(convert_tree_to_postfix(parse_expression(expression)),
+                             convert_infix_to_postfix(convert_to_token_list(expression)), expression)
+
+    def test_syntax_errors(self):
+        for expression in ["", "x+", "*x", "2x", "(x+1", "x+1)", "(x+1]", "()", "x**2", "xy", "1.2.3", "x=1",
+                           "(" * 2000 + "x" + ")" * 2000]:
+            self.assertRaises(ExpressionSyntaxError, parse_expression, expression)
+        # the messages of the character tokenizer
+        for expression, token in [("1e3", "e"), ("pi", "p"), ("3,5*x", ","), ("x y", " "), ("xy", "y"),
+                                  ("x+1$", "$"), ("(x 2)", " ")]:
+            with self.assertRaises(ExpressionSyntaxError) as context:
+                parse_expression(expression)
+            self.assertEqual(str(context.exception), "Token is not supported: " + token, expression)
+
+    def test_convert_tree_to_latex(self):
+        cases = [("x-(x+1)", "x-\\left(x+1\\right)"), ("x+(x+1)", "x+x+1"), ("x-(-1)", "x-\\left(-1\\right)"),
+                 ("2*(-x)", "2\\left(-x\\right)"), ("x*3", "3x"), ("x^2*3*4", "3x^2\\times4"), ("-x*3", "-x\\times3"),
+                 ("(x+1)*2", "2\\left(x+1\\right)"), ("(x/2)*3", "\\frac{x}{2}\\times3"),
+                 ("(x+1)*(x-2)", "\\left(x+1\\right)\\left(x-2\\right)"),
+                 ("-(x+1)^2", "-\\left(x+1\\right)^2"), ("(-x)^2", "\\left(-x\\right)^2"), ("x^2^3", "x^{2^3}"),
+                 ("(x^2)^3", "\\left(x^2\\right)^3"), ("3*(1/3)", "3\\times\\frac{1}{3}"), ("x^-1", "x^{-1}"),
+                 ("--y", "-\\left(-y\\right)"), ("x/3/4", "\\frac{\\frac{x}{3}}{4}"), ("2.50*x", "2.5x"),
+                 ("9.0", "9"), (".50", "0.5"), ("10", "10")]
+        for expression, latex in cases:
+            self.assertEqual(convert_tree_to_latex(parse_expression(expression)), latex, expression)
+        self.assertEqual(convert_equation_to_latex(parse_equation("y^2=4")), "$$y^2=4$$")
@@ -1,64 +1,169 @@
 import copy
+import math
+import operator
 import unittest
-from typing import List
-
-from solver.error import EvaluationError, ExpressionSyntaxError
-from solver.convert_to_postfix import convert_infix_to_postfix
-from solver.convert_to_token_list import convert_to_token_list
-from solver.util import check_is_a_number, is_unary_operator, is_operand, is_binary_operator
-
-
-def parse_operand(operand: str):
-    if operand == 'x':
-        dictionary = {1: 1}
-    else:
-        dictionary = {0: float(operand)}
-    return Polynomial(dictionary)
+from fractions import Fraction
 
+import numpy as np
 
-def evaluate_postfix(token_list: List[str]):
-    operand_stack = []
-    for token in token_list:
-        if is_operand(token):
-            operand_stack.append(parse_operand(token))
-        else:
-            if is_unary_operator(token) and len(operand_stack) >= 1:
-                op1 = operand_stack.pop()
-                if token == "neg":
-                    result = op1.neg()
-                elif token == "pos":
-                    result = op1
-                else:
-                    raise ExpressionSyntaxError("Not supported operator: " + token)
-            elif is_binary_operator(token) and len(operand_stack) >= 2:
-                op2 = operand_stack.pop()
-                op1 = operand_stack.pop()
-                if token == "+":
-                    result = op1.plus(op2)
-                elif token == "-":
-                    result = op1.minus(op2)
-                elif token == "*":
-                    result = op1.multiply(op2)
-                elif token == "/":
-                    result = op1.divide(op2)
-                elif token == "^":
-                    result = op1.power(op2)
-                else:
-                    raise ExpressionSyntaxError("Not supported operator: " + token)
-            else:
-                raise ExpressionSyntaxError("Invalid expression")
-
-            operand_stack.append(result)
-    if len(operand_stack) == 1:
-        return operand_stack.pop()
+from solver.error import EvaluationError, ExpressionSyntaxError
+from solver.expression_tree import Number, Variable, UnaryOperation, parse_expression
+from solver.util import check_is_a_number
+
+
+BINARY_OPERATIONS = {"+": operator.add, "-": operator.sub, "*": operator.mul, "/": operator.truediv,
+                     "^": operator.pow}
+
+
+def estimate_tree(node, max_degree: int = None, variable: str = "x"):
+    """
+    Upper bounds on the degree and the number of terms of the polynomial that
+    the expression tree expands to, from a walk that only tracks those two
+    numbers, plus the value of constant subexpressions for the exponents.
+    Raises EvaluationError as soon as an intermediate degree exceeds `max_degree`,
+    before any expansion work is spent on it, and ExpressionSyntaxError on
+    another variable than `variable`.
+    """
+    degree, terms, _ = estimate_node(node, max_degree, variable)
+    return degree, terms
+
+
+def estimate_node(node, max_degree, variable):
+    # (degree, terms, value), value being None unless the node is a constant
+    if isinstance(node, Number):
+        return 0, 1, node.value
+    if isinstance(node, Variable):
+        if node.name != variable:
+            raise ExpressionSyntaxError("Token is not supported: " + node.name)
+        return 1, 1, None
+    if isinstance(node, UnaryOperation):
+        degree, terms, value = estimate_node(node.operand, max_degree, variable)
+        if node.operator == "neg" and value is not None:
+            value = -value
+        return degree, terms, value
+
+    operation = node.operator
+    degree1, terms1, value1 = estimate_node(node.left, max_degree, variable)
+    degree2, terms2, value2 = estimate_node(node.right, max_degree, variable)
+    value = None
+    if operation in ("+", "-"):
+        degree, terms = max(degree1, degree2), terms1 + terms2
+    elif operation == "*":
+        degree, terms = degree1 + degree2, terms1 * terms2
+    elif operation == "/":
+        degree, terms = degree1, terms1
+    elif value2 is not None and math.isfinite(value2) and value2 >= 0 and int(value2) == value2:
+        exponent = int(value2)
+        degree = degree1 * exponent
+        # each term of the power is a product of `exponent` terms of the base, chosen with repetition
+        terms = math.comb(exponent + terms1 - 1, terms1 - 1) if terms1 <= MAX_COUNTED_POWER_TERMS else degree + 1
     else:
-        raise ExpressionSyntaxError("Invalid expression")
+        # evaluate_tree rejects the power itself
+        degree, terms = degree1, terms1
+    terms = min(terms, degree + 1)
+
+    if value1 is not None and value2 is not None:
+        try:
+            value = BINARY_OPERATIONS[operation](value1, value2)
+        except OverflowError:
+            value = math.inf
+        except ArithmeticError:
+            value = None
+        if isinstance(value, complex):
+            value = None
+    if max_degree is not None and degree > max_degree:
+        raise EvaluationError("Maximum power exceeded")
+    return degree, terms, value
+
+
+def evaluate_tree(node, sparse: bool = False):
+    """
+    Expand the expression tree into a polynomial. With `sparse`, products
+    stay dictionaries at any degree instead of switching to the dense backend.
+    Every variable is the unknown, estimate_tree checks their names.
+    """
+    if isinstance(node, Number):
+        return Polynomial({0: node.value})
+    if isinstance(node, Variable):
+        return Polynomial({1: 1})
+    if isinstance(node, UnaryOperation):
+        op1 = evaluate_tree(node.operand, sparse)
+        return op1.neg() if node.operator == "neg" else op1
+
+    op1 = evaluate_tree(node.left, sparse)
+    op2 = evaluate_tree(node.right, sparse)
+    operation = node.operator
+    if operation == "+":
+        return op1.plus(op2)
+    elif operation == "-":
+        return op1.minus(op2)
+    elif operation == "*":
+        return op1.multiply(op2, sparse)
+    elif operation == "/":
+        return op1.divide(op2)
+    elif operation == "^":
+        return op1.power(op2, sparse)
+    raise ExpressionSyntaxError("Not supported operator: " + operation)
+
+
+def convert_tree_to_polynomial(node, variable: str = "x"):
+    # bound the expansion before doing it, so a misread exponent fails fast
+    degree, terms = estimate_tree(node, MAX_SPARSE_DEGREE, variable)
+    sparse = terms * SPARSE_TERM_RATIO <= degree + 1
+    if not sparse and degree > MAX_DEGREE:
+        raise EvaluationError("Maximum power exceeded")
+    return select_backend(evaluate_tree(node, sparse).simplify())
 
 
 def parse_to_polynomial(expression):
-    token_list = convert_to_token_list(expression)
-    postfix_token_list = convert_infix_to_postfix(token_list)
-    return evaluate_postfix(postfix_token_list).simplify()
+    return convert_tree_to_polynomial(parse_expression(expression))
+
+
+# polynomials of at least this degree are stored as a dense NumPy coefficient array
+DENSE_DEGREE_THRESHOLD = 16
+# unless at most one in this many of their coefficients can be non-zero
+SPARSE_TERM_RATIO = 4
+# the derivatives of a higher degree overflow floats (171! > 1.8e308), so it could not be solved
+MAX_DEGREE = 170
+# sparse polynomials are solved without the derivative chain, until x^degree overflows just above |x| = 2
+MAX_SPARSE_DEGREE = 1000
+# the term count of a power is only worked out for bases with at most this many terms
+MAX_COUNTED_POWER_TERMS = 32
+# float coefficients are read back as the simplest fraction up to this denominator that matches them
+RATIONAL_MAX_DENOMINATOR = 10 ** 6
+RATIONAL_TOLERANCE = 1e-12
+# gcd(p, p') is first taken modulo this prime, which rules out repeated factors cheaply
+SQUARE_FREE_TEST_PRIME = 2 ** 31 - 1
+
+
+def rationalize_coefficient(coefficient):
+    """
+    Exact fraction for a float coefficient. Textbook inputs like 1.01 or 1/3
+    only reach the solver as rounded floats, so a nearby fraction with a small
+    denominator is preferred: repeated factors are only found in exact arithmetic.
+    """
+    if float(coefficient).is_integer():
+        return int(coefficient)
+    exact = Fraction(coefficient)
+    if exact.denominator <= RATIONAL_MAX_DENOMINATOR:
+        return exact
+    simple = exact.limit_denominator(RATIONAL_MAX_DENOMINATOR)
+    if abs(simple - exact) <= RATIONAL_TOLERANCE * max(1, abs(exact)):
+        return simple
+    return exact
+
+
+def select_backend(polynomial):
+    """
+    Return `polynomial` in the representation that suits its degree: a dense
+    coefficient array from DENSE_DEGREE_THRESHOLD up, a sparse dictionary below
+    or when few of its coefficients are non-zero.
+    """
+    if polynomial.get_highest_degree() >= DENSE_DEGREE_THRESHOLD and not polynomial.is_sparse():
+        return DensePolynomial.from_polynomial(polynomial)
+    if isinstance(polynomial, DensePolynomial):
+        return Polynomial(polynomial.dictionary)
+    return polynomial
 
 
 class Polynomial:
@@ -98,6 +203,8 @@ class Polynomial:
     def plus(self, other):
         if not isinstance(other, Polynomial):
             raise TypeError("Parameter is not a Polynomial")
+        if isinstance(other, DensePolynomial):
+            return DensePolynomial.from_polynomial(self).plus(other)
 
         for degree in other.dictionary:
             self.dictionary[degree] = self.dictionary.get(degree, 0) + other.dictionary[degree]
@@ -107,15 +214,20 @@ class Polynomial:
     def minus(self, other):
         if not isinstance(other, Polynomial):
             raise TypeError("Parameter is not a Polynomial")
+        if isinstance(other, DensePolynomial):
+            return DensePolynomial.from_polynomial(self).minus(other)
 
         for degree in other.dictionary:
             self.dictionary[degree] = self.dictionary.get(degree, 0) - other.dictionary[degree]
 
         return self.simplify()
 
-    def multiply(self, other):
+    def multiply(self, other, sparse=False):
         if not isinstance(other, Polynomial):
             raise TypeError("Parameter is not a Polynomial")
+        if isinstance(other, DensePolynomial) or \
+                (not sparse and self.get_highest_degree() + other.get_highest_degree() >= DENSE_DEGREE_THRESHOLD):
+            return DensePolynomial.from_polynomial(self).multiply(other)
         result = {}
         for d1 in self.dictionary:
             for d2 in other.dictionary:
@@ -171,8 +283,12 @@ class Polynomial:
             return self.get_lim_at_minus_inf()
         
         result = 0
-        for degree, coefficient in self.dictionary.items():
-            result += coefficient * x ** degree
+        try:
+            # x ** degree is computed by repeated squaring, so sparse terms cost no more than dense ones
+            for degree, coefficient in self.dictionary.items():
+                result += coefficient * x ** degree
+        except OverflowError:
+            raise EvaluationError("Maximum power exceeded")
 
         return result
 
@@ -184,12 +300,35 @@ class Polynomial:
 
         return max_degree
 
+    def get_lowest_degree(self):
+        return min(self.dictionary, default=0)
+
+    def get_exponent_gcd(self):
+        """
+        The largest g such that the polynomial divided by x^k, k its lowest degree,
+        only has powers of x^g, or 1 for a monomial.
+        """
+        lowest_degree = self.get_lowest_degree()
+        exponent_gcd = 0
+        for degree in self.dictionary:
+            exponent_gcd = math.gcd(exponent_gcd, degree - lowest_degree)
+        return max(exponent_gcd, 1)
+
+    def is_sparse(self):
+        """
+        True for a dictionary of high degree where at most one in
+        SPARSE_TERM_RATIO coefficients is non-zero.
+        """
+        degree = self.get_highest_degree()
+        return not isinstance(self, DensePolynomial) and degree >= DENSE_DEGREE_THRESHOLD and \
+            len(self.dictionary) * SPARSE_TERM_RATIO <= degree + 1
+
     def get_coefficient(self, degree):
         return self.dictionary.get(degree, 0)
     
     def get_lim_at_inf(self):
         highest_degree = self.get_highest_degree()
-        if self.dictionary[highest_degree] > 0:
+        if self.get_coefficient(highest_degree) > 0:
             return float('inf')
         else:
             return float('-inf')
@@ -197,12 +336,12 @@ class Polynomial:
     def get_lim_at_minus_inf(self):
         highest_degree = self.get_highest_degree()
         if highest_degree % 2 == 0:
-            if self.dictionary[highest_degree] > 0:
+            if self.get_coefficient(highest_degree) > 0:
                 return float('inf')
             else:
                 return float('-inf')
         else:
-            if self.dictionary[highest_degree] > 0:
+            if self.get_coefficient(highest_degree) > 0:
                 return float('-inf')
             else:
                 return float('inf')
@@ -226,7 +365,7 @@ class Polynomial:
     def is_constant(self):
         return self.get_highest_degree() == 0
 
-    def power(self, op2):
+    def power(self, op2, sparse=False):
         if isinstance(op2, Polynomial) and op2.is_constant():
             degree = op2.get_coefficient(0)
         elif check_is_a_number(op2):
@@ -236,15 +375,266 @@ class Polynomial:
         if int(degree) == degree:
             degree = int(degree)
             if degree >= 0:
+                base = self
+                if not sparse and base.get_highest_degree() * degree >= DENSE_DEGREE_THRESHOLD:
+                    base = DensePolynomial.from_polynomial(base)
+                # exponentiation by squaring
                 result = Polynomial({0: 1})
-                for i in range(degree):
-                    result = result.multiply(self)
+                while degree > 0:
+                    if degree % 2 == 1:
+                        result = result.multiply(base, sparse)
+                    degree //= 2
+                    if degree > 0:
+                        base = base.multiply(base, sparse)
                 return result
             else:
                 raise EvaluationError("Negative power is not supported: " + str(degree))
         else:
             raise EvaluationError("Not integer power is not supported: " + str(degree))
 
+    def is_zero(self):
+        return len(self.dictionary) == 0
+
+    def rationalize(self):
+        return Polynomial({degree: rationalize_coefficient(coefficient)
+                           for degree, coefficient in self.dictionary.items()})
+
+    def long_divide(self, other):
+        """
+        Quotient and remainder of the division by the non-zero polynomial `other`.
+        Exact when both have Fraction coefficients.
+        """
+        if other.is_zero():
+            raise EvaluationError("Divided by zero")
+        other_degree = other.get_highest_degree()
+        leading = other.get_coefficient(other_degree)
+        remainder = Polynomial(dict(self.dictionary))
+        quotient = {}
+        while not remainder.is_zero() and remainder.get_highest_degree() >= other_degree:
+            degree = remainder.get_highest_degree()
+            factor = remainder.get_coefficient(degree) / leading
+            quotient[degree - other_degree] = factor
+            for other_degree_term, coefficient in other.dictionary.items():
+                term_degree = other_degree_term + degree - other_degree
+                remainder.dictionary[term_degree] = remainder.get_coefficient(term_degree) - factor * coefficient
+            remainder.dictionary.pop(degree, None)
+            remainder.simplify()
+        return Polynomial(quotient), remainder
+
+    def primitive(self):
+        """
+        The polynomial scaled to integer coefficients without a common factor.
+        """
+        coefficients = {degree: Fraction(coefficient) for degree, coefficient in self.dictionary.items()}
+        multiple = 1
+        for coefficient in coefficients.values():
+            multiple = multiple * coefficient.denominator // math.gcd(multiple, coefficient.denominator)
+        integers = {degree: int(coefficient * multiple) for degree, coefficient in coefficients.items()}
+        content = 0
+        for integer in integers.values():
+            content = math.gcd(content, integer)
+        return Polynomial({degree: integer // content for degree, integer in integers.items()})
+
+    def pseudo_remainder(self, other):
+        """
+        Remainder of lc(other)^(d + 1) * self by `other`, where d is the degree
+        difference, which stays in integers when both are integer polynomials.
+        """
+        other_degree = other.get_highest_degree()
+        leading = other.get_coefficient(other_degree)
+        remainder = dict(self.dictionary)
+        for _ in range(self.get_highest_degree() - other_degree + 1):
+            degree = max(remainder, default=-1)
+            if degree < other_degree:
+                remainder = {term_degree: leading * coefficient for term_degree, coefficient in remainder.items()}
+                continue
+            factor = remainder.pop(degree)
+            remainder = {term_degree: leading * coefficient for term_degree, coefficient in remainder.items()}
+            for other_term_degree, coefficient in other.dictionary.items():
+                term_degree = other_term_degree + degree - other_degree
+                if term_degree != degree:
+                    remainder[term_degree] = remainder.get(term_degree, 0) - factor * coefficient
+            remainder = {term_degree: coefficient for term_degree, coefficient in remainder.items() if coefficient != 0}
+        return Polynomial(remainder)
+
+    def gcd(self, other):
+        """
+        Monic greatest common divisor, by Euclid's algorithm on primitive integer
+        remainders so that the coefficients do not blow up.
+        """
+        a, b = self.rationalize(), other.rationalize()
+        a = a if a.is_zero() else a.primitive()
+        b = b if b.is_zero() else b.primitive()
+        while not b.is_zero():
+            remainder = a.pseudo_remainder(b)
+            a, b = b, remainder if remainder.is_zero() else remainder.primitive()
+        if a.is_zero():
+            return a
+        leading = a.get_coefficient(a.get_highest_degree())
+        return Polynomial({degree: Fraction(coefficient, leading) for degree, coefficient in a.dictionary.items()})
+
+    def is_square_free(self):
+        """
+        True when the polynomial certainly has no repeated factor: gcd(p, p')
+        modulo a large prime is a constant. A repeated factor of p would divide
+        that gcd too, unless the prime divides the leading coefficient, in which
+        case, or when the modular gcd is not constant, the answer is False.
+        """
+        prime = SQUARE_FREE_TEST_PRIME
+        degree = self.get_highest_degree()
+        coefficients = []
+        for term_degree in range(degree, -1, -1):
+            coefficient = Fraction(rationalize_coefficient(self.get_coefficient(term_degree)))
+            # every denominator is a power of two or below the prime, so it is invertible
+            coefficients.append(coefficient.numerator * pow(coefficient.denominator, -1, prime) % prime)
+        if coefficients[0] == 0:
+            return False
+        derivative = [coefficient * (degree - index) % prime for index, coefficient in enumerate(coefficients[:-1])]
+        a, b = coefficients, derivative
+        while b and b[0] == 0:
+            b.pop(0)
+        while b:
+            inverse = pow(b[0], -1, prime)
+            a = list(a)
+            while len(a) >= len(b):
+                factor = a[0] * inverse % prime
+                for index in range(len(b)):
+                    a[index] = (a[index] - factor * b[index]) % prime
+                a.pop(0)
+            while a and a[0] == 0:
+                a.pop(0)
+            a, b = b, a
+        return len(a) == 1
+
+    def square_free_decomposition(self):
+        """
+        Yun's algorithm: the monic square-free factors a_i, pairwise coprime,
+        with self = c * a_1 * a_2^2 * a_3^3 ..., as (factor, multiplicity) pairs
+        with float coefficients, skipping constant factors.
+        """
+        polynomial = self.rationalize()
+        derivative = polynomial.derivative()
+        common = polynomial.gcd(derivative)
+        remaining = polynomial.long_divide(common)[0]
+        difference = derivative.long_divide(common)[0].minus(remaining.derivative())
+        factors = []
+        multiplicity = 1
+        while remaining.get_highest_degree() > 0:
+            factor = remaining.gcd(difference)
+            remaining = remaining.long_divide(factor)[0]
+            difference = difference.long_divide(factor)[0].minus(remaining.derivative())
+            if factor.get_highest_degree() > 0:
+                factors.append((Polynomial({degree: float(coefficient)
+                                            for degree, coefficient in factor.dictionary.items()}), multiplicity))
+            multiplicity += 1
+        return factors
+
+
+class DensePolynomial(Polynomial):
+    """
+    Polynomial backed by a NumPy array of float coefficients in increasing
+    degree order, for high degrees where the dictionary loops get slow.
+    """
+
+    def __init__(self, coefficients):
+        with np.errstate(over="ignore", invalid="ignore"):
+            coefficients = np.trim_zeros(np.asarray(coefficients, dtype=np.float64), "b")
+        if not np.all(np.isfinite(coefficients)):
+            raise EvaluationError("Maximum power exceeded")
+        self.coefficients = coefficients
+        # highest degree first, as plain floats for the scalar Horner loop in eval
+        self.horner_coefficients = coefficients[::-1].tolist()
+
+    @staticmethod
+    def from_polynomial(polynomial):
+        if isinstance(polynomial, DensePolynomial):
+            return polynomial
+        coefficients = np.zeros(polynomial.get_highest_degree() + 1)
+        for degree, coefficient in polynomial.dictionary.items():
+            coefficients[degree] = coefficient
+        return DensePolynomial(coefficients)
+
+    @property
+    def dictionary(self):
+        return {degree: coefficient.item() for degree, coefficient in enumerate(self.coefficients) if coefficient != 0}
+
+    def _pad(self, other):
+        other = DensePolynomial.from_polynomial(other)
+        size = max(len(self.coefficients), len(other.coefficients))
+        return (np.pad(self.coefficients, (0, size - len(self.coefficients))),
+                np.pad(other.coefficients, (0, size - len(other.coefficients))))
+
+    def plus(self, other):
+        if not isinstance(other, Polynomial):
+            raise TypeError("Parameter is not a Polynomial")
+        a, b = self._pad(other)
+        return DensePolynomial(a + b)
+
+    def minus(self, other):
+        if not isinstance(other, Polynomial):
+            raise TypeError("Parameter is not a Polynomial")
+        a, b = self._pad(other)
+        return DensePolynomial(a - b)
+
+    def multiply(self, other, sparse=False):
+        if not isinstance(other, Polynomial):
+            raise TypeError("Parameter is not a Polynomial")
+        other = DensePolynomial.from_polynomial(other)
+        if len(self.coefficients) == 0 or len(other.coefficients) == 0:
+            return DensePolynomial([])
+        return DensePolynomial(np.convolve(self.coefficients, other.coefficients))
+
+    def neg(self):
+        return DensePolynomial(-self.coefficients)
+
+    def simplify(self):
+        return self
+
+    def get_full_coefficient(self):
+        if len(self.coefficients) == 0:
+            return [0]
+        return list(self.horner_coefficients)
+
+    def derivative(self):
+        with np.errstate(over="ignore"):
+            return DensePolynomial(self.coefficients[1:] * np.arange(1, len(self.coefficients)))
+
+    def eval(self, x):
+        if x == float('inf'):
+            return self.get_lim_at_inf()
+        if x == float('-inf'):
+            return self.get_lim_at_minus_inf()
+
+        if isinstance(x, np.ndarray):
+            with np.errstate(over="ignore", invalid="ignore"):
+                return np.polyval(self.horner_coefficients, x)
+
+        # np.polyval loops in Python too, so a plain float Horner loop is faster for one point
+        result = 0.0
+        for coefficient in self.horner_coefficients:
+            result = result * x + coefficient
+        return result
+
+    def get_highest_degree(self):
+        return max(len(self.coefficients) - 1, 0)
+
+    def get_coefficient(self, degree):
+        if degree < len(self.coefficients):
+            return self.coefficients[degree].item()
+        return 0
+
+    def divide(self, op2):
+        if isinstance(op2, Polynomial) and op2.is_constant():
+            denominator = op2.get_coefficient(0)
+        elif check_is_a_number(op2):
+            denominator = op2
+        else:
+            raise EvaluationError("Denominator must be a number")
+
+        if denominator == 0:
+            raise EvaluationError("Divided by zero")
+        return DensePolynomial(self.coefficients / denominator)
+
 
 class Tests(unittest.TestCase):
 
@@ -389,6 +779,86 @@ class Tests(unittest.TestCase):
                          parse_to_polynomial("x^3+3*x^2+3*x+1"))
         self.assertEqual(parse_to_polynomial("x+2").power(Polynomial.from_constant(3)),
                          parse_to_polynomial("x^3+6*x^2+12*x+8"))
+        self.assertEqual(parse_to_polynomial("x+1").power(Polynomial.from_constant(6)),
+                         parse_to_polynomial("x^6+6*x^5+15*x^4+20*x^3+15*x^2+6*x+1"))
+
+    def test_dense(self):
+        polynomial = parse_to_polynomial("(x+1)^60")
+        self.assertIsInstance(polynomial, DensePolynomial)
+        self.assertEqual(polynomial.get_highest_degree(), 60)
+        self.assertEqual(polynomial.get_coefficient(30), 118264581564861424)
+        self.assertEqual(polynomial.eval(0), 1)
+        self.assertAlmostEqual(polynomial.eval(1) / 2 ** 60, 1)
+        self.assertEqual(polynomial.derivative().get_coefficient(59), 60)
+        self.assertEqual(polynomial.get_lim_at_minus_inf(), float('inf'))
+
+        # the backend is picked by degree and both representations compare equal
+        self.assertIsInstance(parse_to_polynomial("(x+1)^60-(x+1)^60+x"), Polynomial)
+        self.assertNotIsInstance(parse_to_polynomial("(x+1)^60-(x+1)^60+x"), DensePolynomial)
+        dense = DensePolynomial.from_polynomial(parse_to_polynomial("x^2-2*x"))
+        self.assertEqual(dense, parse_to_polynomial("x^2-2*x"))
+        self.assertEqual(dense.get_full_coefficient(), [1, -2, 0])
+        self.assertEqual(dense.neg().plus(Polynomial({1: 2})), Polynomial({2: -1, 1: 4}))
+        self.assertEqual(dense.divide(Polynomial.from_constant(2)), Polynomial({2: 0.5, 1: -1}))
+        self.assertEqual(dense.eval(3), 3)
+
+    def test_estimate_tree(self):
+        def estimate(expression):
+            return estimate_tree(parse_expression(expression))
+
+        self.assertEqual(estimate("x^2+2*x+1"), (2, 3))
+        self.assertEqual(estimate("(x+1)^10"), (10, 11))
+        self.assertEqual(estimate("(x^50+1)^3"), (150, 4))
+        self.assertEqual(estimate("(x+x^7+1)^2"), (14, 6))
+        self.assertEqual(estimate("x^(2*3)/4-7"), (6, 2))
+        self.assertEqual(estimate("x^(-1)"), (1, 1))
+        self.assertEqual(estimate("5"), (0, 1))
+        self.assertRaises(ExpressionSyntaxError, parse_to_polynomial, "x+")
+
+        # huge exponents are rejected before anything is expanded
+        for expression in ["(x+1)^171", "x^1001", "(x+1)^99999", "x^(10^9)", "x^2000*0", "(x^2+1)^(2^7)"]:
+            self.assertRaises(EvaluationError, parse_to_polynomial, expression)
+        self.assertEqual(parse_to_polynomial("(x+1)^170").get_highest_degree(), 170)
+        self.assertEqual(parse_to_polynomial("x^1000-1").get_highest_degree(), 1000)
+        self.assertEqual(parse_to_polynomial("x^2^3^0"), Polynomial({2: 1}))
+
+        # few terms at a high degree stay a dictionary, full ones go dense
+        self.assertNotIsInstance(parse_to_polynomial("x^150-2*x^75+1"), DensePolynomial)
+        self.assertEqual(parse_to_polynomial("(x^50-1)^3"), Polynomial({150: 1, 100: -3, 50: 3, 0: -1}))
+        self.assertIsInstance(parse_to_polynomial("(x+1)^40"), DensePolynomial)
+
+    def test_sparse(self):
+        polynomial = parse_to_polynomial("(x^9+1)^5*x^2")
+        self.assertNotIsInstance(polynomial, DensePolynomial)
+        self.assertTrue(polynomial.is_sparse())
+        self.assertEqual(len(polynomial.dictionary), 6)
+        self.assertEqual(polynomial.get_lowest_degree(), 2)
+        self.assertEqual(polynomial.get_exponent_gcd(), 9)
+        self.assertEqual(polynomial.derivative().get_coefficient(46), 47)
+        self.assertEqual(polynomial.eval(-1), 0)
+        self.assertIsInstance(parse_to_polynomial("(x^3+1)^20"), DensePolynomial)
+        self.assertFalse(parse_to_polynomial("x^20+x^18+x^16+x^14+x^12+x^10").is_sparse())
+        self.assertEqual(parse_to_polynomial("4*x^7").get_exponent_gcd(), 1)
+        self.assertRaises(EvaluationError, parse_to_polynomial("x^1000").eval, 3.0)
+
+    def test_square_free_decomposition(self):
+        self.assertEqual(parse_to_polynomial("(x-2)^6").square_free_decomposition(), [(Polynomial({1: 1, 0: -2}), 6)])
+        self.assertEqual(parse_to_polynomial("3*x^2").square_free_decomposition(), [(Polynomial({1: 1}), 2)])
+        self.assertEqual(parse_to_polynomial("x^3*(x-1)^4*(x+1)^2").square_free_decomposition(),
+                         [(Polynomial({1: 1, 0: 1}), 2), (Polynomial({1: 1}), 3), (Polynomial({1: 1, 0: -1}), 4)])
+        self.assertEqual(parse_to_polynomial("(x^2+1)^2*(x-1)").square_free_decomposition(),
+                         [(Polynomial({1: 1, 0: -1}), 1), (Polynomial({2: 1, 0: 1}), 2)])
+        # decimal coefficients are read back as the fractions they were written as
+        self.assertEqual(parse_to_polynomial("(x-0.1)^3*(x+1/3)").square_free_decomposition(),
+                         [(Polynomial({1: 1, 0: 1 / 3}), 1), (Polynomial({1: 1, 0: -0.1}), 3)])
+        self.assertEqual(parse_to_polynomial("(x-1)^10*(x+2)^8").square_free_decomposition(),
+                         [(Polynomial({1: 1, 0: 2}), 8), (Polynomial({1: 1, 0: -1}), 10)])
+
+        self.assertTrue(parse_to_polynomial("x^2-1").is_square_free())
+        self.assertTrue(parse_to_polynomial("(x-1)*(x-1.001)*(x-1.002)").is_square_free())
+        self.assertFalse(parse_to_polynomial("(x-1)^2*(x+2)").is_square_free())
+        self.assertFalse(parse_to_polynomial("(x^2+x+1)^2").is_square_free())
+        self.assertEqual(parse_to_polynomial("x^2+2*x+1").gcd(parse_to_polynomial("x^2-1")), Polynomial({1: 1, 0: 1}))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,239 @@
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from collections import OrderedDict
+
+from solver.solve import parse_and_solve_and_round
+
+logger = logging.getLogger(__name__)
+
+CACHE_SIZE = int(os.environ.get("SOLVER_CACHE_SIZE", "1024"))
+# the on-disk tier is shared by every worker process that points at the same file
+CACHE_PATH = os.environ.get("SOLVER_CACHE_PATH", "")
+DISK_CACHE_SIZE = int(os.environ.get("SOLVER_DISK_CACHE_SIZE", "100000"))
+# SQLite waits this long for another worker's write lock before giving up on the disk tier
+DISK_TIMEOUT = 1.0
+
+
+def normalize_key(expression: str, epsilon, engine=None) -> str:
+    """
+    Cache key of a solve: the expression without whitespace, the precision and the engine.
+    """
+    return "{}|{!r}|{}".format("".join(expression.split()), float(epsilon), engine or "")
+
+
+class SolverResultCache:
+    """
+    Memoizes parse_and_solve_and_round, which only depends on its arguments.
+    Results live in a bounded in-memory LRU and, when `path` is given, in a
+    SQLite file that outlives the process and is shared by the Django workers.
+    Only successful solves are cached; parse and evaluation errors are raised again every time.
+    """
+
+    def __init__(self, size: int = CACHE_SIZE, path: str = None, disk_size: int = DISK_CACHE_SIZE,
+                 solver=parse_and_solve_and_round):
+        if size < 1:
+            raise ValueError("Solver cache size must be at least 1")
+        self.size = size
+        self.path = path or None
+        self.disk_size = disk_size
+        self.solver = solver
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = None
+        self._connection_pid = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _get_connection(self):
+        # SQLite connections cannot be used across fork, so a forked worker opens its own
+        if self._connection is None or self._connection_pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=DISK_TIMEOUT, check_same_thread=False,
+                                         isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            # losing the last writes on a power cut only costs a few solves again
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS results "
+                               "(key TEXT PRIMARY KEY, roots TEXT NOT NULL, accessed REAL NOT NULL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+            self._connection = connection
+            self._connection_pid = os.getpid()
+        return self._connection
+
+    def _read_disk(self, key: str):
+        if self.path is None:
+            return None
+        try:
+            connection = self._get_connection()
+            row = connection.execute("SELECT roots FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            connection.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+            return json.loads(row[0])
+        except sqlite3.Error as e:
+            logger.warning("Solver disk cache read failed: %s", e)
+            return None
+
+    def _write_disk(self, key: str, roots: list):
+        if self.path is None:
+            return
+        try:
+            connection = self._get_connection()
+            connection.execute("INSERT OR REPLACE INTO results (key, roots, accessed) VALUES (?, ?, ?)",
+                               (key, json.dumps(roots), time.time()))
+            count = connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            if count > self.disk_size:
+                connection.execute("DELETE FROM results WHERE key IN "
+                                   "(SELECT key FROM results ORDER BY accessed LIMIT ?)", (count - self.disk_size,))
+        except sqlite3.Error as e:
+            logger.warning("Solver disk cache write failed: %s", e)
+
+    def _remember(self, key: str, roots: list):
+        self._entries[key] = roots
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, expression: str, epsilon, engine=None):
+        """
+        The cached roots of the expression, or None when it was not solved yet.
+        """
+        key = normalize_key(expression, epsilon, engine)
+        with self._lock:
+            roots = self._entries.get(key)
+            if roots is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return list(roots)
+            roots = self._read_disk(key)
+            if roots is not None:
+                self._remember(key, roots)
+                self.disk_hits += 1
+                return list(roots)
+            self.misses += 1
+            return None
+
+    def put(self, expression: str, epsilon, roots: list, engine=None):
+        key = normalize_key(expression, epsilon, engine)
+        roots = list(roots)
+        with self._lock:
+            self._remember(key, roots)
+            self._write_disk(key, roots)
+
+    def solve(self, expression: str, epsilon, engine=None) -> list:
+        """
+        parse_and_solve_and_round through the cache.
+        """
+        roots = self.get(expression, epsilon, engine)
+        if roots is None:
+            roots = self.solver(expression, epsilon, engine)
+            self.put(expression, epsilon, roots, engine)
+        return roots
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self.path is not None:
+                try:
+                    self._get_connection().execute("DELETE FROM results")
+                except sqlite3.Error as e:
+                    logger.warning("Solver disk cache clear failed: %s", e)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.size,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None and self._connection_pid == os.getpid():
+                self._connection.close()
+            self._connection = None
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> SolverResultCache:
+    """
+    Return the solver result cache of the current process, configured from
+    SOLVER_CACHE_SIZE, SOLVER_CACHE_PATH and SOLVER_DISK_CACHE_SIZE.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SolverResultCache(CACHE_SIZE, CACHE_PATH, DISK_CACHE_SIZE)
+    return _cache
+
+
+class Tests(unittest.TestCase):
+
+    def test_normalize_key(self):
+        self.assertEqual(normalize_key("x^2 - 1 = 0", 0.00001), normalize_key("x^2-1=0", 1e-5))
+        self.assertNotEqual(normalize_key("x^2-1", 0.00001), normalize_key("x^2-1", 0.0001))
+        self.assertNotEqual(normalize_key("x^2-1", 0.00001), normalize_key("x^2-1", 0.00001, "sturm"))
+
+    def test_memory_lru(self):
+        calls = []
+
+        def solver(expression, epsilon, engine=None):
+            calls.append(expression)
+            return parse_and_solve_and_round(expression, epsilon, engine)
+
+        cache = SolverResultCache(size=2, solver=solver)
+        self.assertEqual(cache.solve("x^2-1", 0.00001), [-1, 1])
+        self.assertEqual(cache.solve("x^2 - 1", 0.00001), [-1, 1])
+        self.assertEqual(cache.solve("x-2", 0.00001), [2])
+        self.assertEqual(cache.solve("x^2-1", 0.00001), [-1, 1])
+        # x-2 is the least recently used entry
+        self.assertEqual(cache.solve("x+5", 0.00001), [-5])
+        self.assertEqual(cache.solve("x-2", 0.00001), [2])
+        self.assertEqual(calls, ["x^2-1", "x-2", "x+5", "x-2"])
+        self.assertEqual(cache.get_stats()["memory_hits"], 2)
+        self.assertEqual(cache.get_stats()["misses"], 4)
+        self.assertEqual(cache.get_stats()["evictions"], 2)
+
+        # callers get their own copy of the roots
+        cache.solve("x-2", 0.00001).append(3)
+        self.assertEqual(cache.solve("x-2", 0.00001), [2])
+
+    def test_disk_tier(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "solver.sqlite3")
+            writer = SolverResultCache(size=4, path=path, disk_size=2)
+            self.assertEqual(writer.solve("x^2-1=8", 0.00001), [-3, 3])
+            self.assertEqual(writer.solve("0*x+0", 0.00001), ["Infinite number of roots"])
+
+            # another worker process sees the results through the file
+            reader = SolverResultCache(size=4, path=path, solver=None)
+            self.assertEqual(reader.solve("x^2-1=8", 0.00001), [-3, 3])
+            self.assertEqual(reader.solve("0*x+0", 0.00001), ["Infinite number of roots"])
+            self.assertEqual(reader.get_stats()["disk_hits"], 2)
+            self.assertEqual(reader.solve("x^2-1=8", 0.00001), [-3, 3])
+            self.assertEqual(reader.get_stats()["memory_hits"], 1)
+
+            # the file keeps only the most recently used entries
+            writer.solve("x^2+2.5*x+1.5", 0.00001)
+            fresh = SolverResultCache(path=path)
+            self.assertIsNone(fresh.get("x^2-1=8", 0.00001))
+            self.assertEqual(fresh.get("x^2+2.5*x+1.5", 0.00001), [-1.5, -1])
+            for cache in (writer, reader, fresh):
+                cache.close()
@@ -1,9 +1,20 @@
 import unittest
-from math import log
+from math import copysign, log
 
-from solver.polynomial import parse_to_polynomial
+from solver import closed_form, eigenvalue, sturm
+from solver.error import EvaluationError, ExpressionSyntaxError
+from solver.expression_tree import parse_equation
+from solver.polynomial import Polynomial, convert_tree_to_polynomial, parse_to_polynomial, select_backend
 
 INFINITE_NUMBER_OF_ROOTS = "Infinite number of roots"
+MAX_BISECTION_ITERATIONS = 100
+# above this many terms the generated Horner function would take longer to compile than it saves
+COMPILED_HORNER_MAX_TERMS = 32
+# equations up to this degree are solved with the closed-form formulas when no engine is asked for
+CLOSED_FORM_MAX_DEGREE = 4
+# above this degree the exact gcd costs more than the root engines, and float
+# coefficients this large are rarely exact enough for a repeated factor to show anyway
+SQUARE_FREE_MAX_DEGREE = 24
 
 
 def convert_from_epsilon_to_n_digit(epsilon):
@@ -21,26 +32,56 @@ def try_round_root(polynomial, raw_root, n_digits):
         return raw_root
 
 
-def find_root_using_bisection(polynomial, epsilon, lower, upper, upper_included=False):
-    if abs(polynomial.eval(lower)) <= epsilon:
+def compile_horner(polynomial):
+    """
+    Build a function that evaluates `polynomial` at a finite number with Horner's
+    rule. Up to COMPILED_HORNER_MAX_TERMS terms the coefficients are unrolled into
+    generated code as constants, so an evaluation is one multiply-add per term.
+    """
+    coefficients = [float(coefficient) for coefficient in polynomial.get_full_coefficient()]
+    if len(coefficients) > COMPILED_HORNER_MAX_TERMS:
+        def evaluate(x):
+            result = coefficients[0]
+            for coefficient in coefficients[1:]:
+                result = result * x + coefficient
+            return result
+        return evaluate
+
+    lines = ["def evaluate(x):", "    result = {!r}".format(coefficients[0])]
+    for coefficient in coefficients[1:]:
+        lines.append("    result = result * x + {!r}".format(coefficient))
+    lines.append("    return result")
+    namespace = {}
+    exec("\n".join(lines), namespace)
+    return namespace["evaluate"]
+
+
+def find_root_using_bisection(polynomial, epsilon, lower, upper, upper_included=False, evaluate=None):
+    if evaluate is None:
+        evaluate = compile_horner(polynomial)
+    lower_value = evaluate(lower)
+    upper_value = evaluate(upper)
+    if abs(lower_value) <= epsilon:
         return lower
-    if abs(polynomial.eval(upper)) <= epsilon:
+    if abs(upper_value) <= epsilon:
         if not upper_included:
             return None
         else:
             return upper
 
-    if polynomial.eval(lower) * polynomial.eval(upper) > 0:
+    if lower_value * upper_value > 0:
         return None
-    MAX_ITERATIONS = 100
     i = 0
     middle = (lower + upper) / 2
-    while abs(polynomial.eval(middle)) > epsilon and i < MAX_ITERATIONS:
-        if polynomial.eval(middle) * polynomial.eval(upper) > 0:
+    middle_value = evaluate(middle)
+    while abs(middle_value) > epsilon and i < MAX_BISECTION_ITERATIONS:
+        if middle_value * upper_value > 0:
             upper = middle
+            upper_value = middle_value
         else:
             lower = middle
         middle = (lower + upper) / 2
+        middle_value = evaluate(middle)
         i = i + 1
 
     n_digits = convert_from_epsilon_to_n_digit(epsilon)
@@ -48,86 +89,211 @@ def find_root_using_bisection(polynomial, epsilon, lower, upper, upper_included=
     return middle
 
 
-def get_lower_bound_with_opposite_sign(polynomial, upper, init_step=1):
-    if polynomial.eval(float('-inf')) * polynomial.eval(upper) > 0:
-        return None
-
-    step = init_step
-    lower = upper - step
-    while polynomial.eval(lower) * polynomial.eval(upper) > 0:
-        step = step * 2
-        lower = lower - step
-
-    return lower
-
-
-def get_upper_bound_with_opposite_sign(polynomial, lower, init_step=1):
-    if polynomial.eval(float('inf')) * polynomial.eval(lower) > 0:
-        return None
-
-    step = init_step
-    upper = lower + step
-    while polynomial.eval(lower) * polynomial.eval(upper) > 0:
-        step = step * 2
-        upper = upper + step
-
-    return upper
+def get_root_bound(polynomial):
+    """
+    Bound strictly above the magnitude of every root, from the non-zero terms
+    only: the smaller of the Cauchy and Fujiwara bounds, as in sturm.get_root_bound.
+    """
+    degree = polynomial.get_highest_degree()
+    leading = abs(float(polynomial.get_coefficient(degree)))
+    ratios = {term_degree: abs(float(coefficient)) / leading
+              for term_degree, coefficient in polynomial.dictionary.items()
+              if term_degree != degree and coefficient != 0}
+    if not ratios:
+        return 1.0
+    cauchy = 1 + max(ratios.values())
+    fujiwara = 2 * max((ratio / 2 if term_degree == 0 else ratio) ** (1 / (degree - term_degree))
+                       for term_degree, ratio in ratios.items())
+    return min(cauchy, fujiwara * 1.001 + 1e-9)
 
 
 def solve_from_derivative_roots(polynomial, epsilon, derivative_roots):
+    # the roots of the derivative and the root bound split the line into intervals where the polynomial is monotone
+    evaluate = compile_horner(polynomial)
+    bound = get_root_bound(polynomial)
+    bounds = [-bound] + derivative_roots + [bound]
     roots = []
-    if len(derivative_roots) > 0:
-        lower_bound = get_lower_bound_with_opposite_sign(polynomial, derivative_roots[0])
-        if lower_bound is not None:
-            roots.append(find_root_using_bisection(polynomial, epsilon, lower_bound, derivative_roots[0]))
-
-        for index in range(len(derivative_roots) - 1):
-            root = find_root_using_bisection(polynomial, epsilon, derivative_roots[index], derivative_roots[index + 1])
-            roots.append(root)
-
-        upper_bound = get_upper_bound_with_opposite_sign(polynomial, derivative_roots[-1])
-        if upper_bound is not None:
-            roots.append(find_root_using_bisection(polynomial, epsilon, derivative_roots[-1],
-                                                   upper_bound, upper_included=True))
-    else:
-        lower_bound = get_lower_bound_with_opposite_sign(polynomial, 0)
-        upper_bound = get_upper_bound_with_opposite_sign(polynomial, 0)
-
-        if lower_bound is not None:
-            roots.append(find_root_using_bisection(polynomial, epsilon, lower_bound, 0))
-        if upper_bound is not None:
-            roots.append(find_root_using_bisection(polynomial, epsilon, 0, upper_bound, upper_included=True))
-        
+    for index in range(len(bounds) - 1):
+        roots.append(find_root_using_bisection(polynomial, epsilon, bounds[index], bounds[index + 1],
+                                               upper_included=index == len(bounds) - 2, evaluate=evaluate))
     return list(filter(lambda x: x is not None, roots))
 
 
-def solve_equation(polynomial, epsilon):
+def compile_sparse(polynomial):
+    """
+    Build a function that evaluates `polynomial` term by term, which for a few
+    terms of high degree is much cheaper than Horner's rule over every coefficient.
+    """
+    terms = [(degree, float(coefficient)) for degree, coefficient in polynomial.dictionary.items()]
+    if len(terms) > COMPILED_HORNER_MAX_TERMS:
+        def evaluate(x):
+            return sum(coefficient * x ** degree for degree, coefficient in terms)
+    else:
+        namespace = {}
+        exec("def evaluate(x):\n    return " + " + ".join("{!r} * x ** {}".format(coefficient, degree)
+                                                         for degree, coefficient in terms), namespace)
+        evaluate = namespace["evaluate"]
+
+    def evaluate_or_raise(x):
+        try:
+            return evaluate(x)
+        except OverflowError:
+            raise EvaluationError("Maximum power exceeded")
+    return evaluate_or_raise
+
+
+def find_positive_roots(polynomial, epsilon):
+    """
+    Positive roots of a sparse polynomial, sorted. Dividing by x^k for its lowest
+    degree k keeps the positive roots and leaves a constant term, which the
+    derivative then drops: the positive roots of that derivative, found the same
+    way with one term less, split (0, inf) into intervals where the polynomial is
+    monotone. The recursion is as deep as the number of terms, not the degree.
+    """
+    lowest_degree = polynomial.get_lowest_degree()
+    polynomial = Polynomial({degree - lowest_degree: coefficient
+                             for degree, coefficient in polynomial.dictionary.items()})
+    if len(polynomial.dictionary) <= 1:
+        return []
+
+    evaluate = compile_sparse(polynomial)
+    bounds = [0.0] + find_positive_roots(polynomial.derivative(), epsilon)
+    roots = []
+    for index in range(len(bounds) - 1):
+        roots.append(find_root_using_bisection(polynomial, epsilon, bounds[index], bounds[index + 1],
+                                               evaluate=evaluate))
+    roots.append(find_root_using_bisection(polynomial, epsilon, bounds[-1], get_root_bound(polynomial),
+                                           upper_included=True, evaluate=evaluate))
+    # 0 only comes back when the constant term is within epsilon of zero, and it is not a root
+    return [root for root in roots if root is not None and root > 0]
+
+
+def solve_sparse(polynomial, epsilon):
+    """
+    Real roots of a sparse polynomial without materializing its coefficients:
+    0 when x divides it, the positive roots of p(x) and the negated positive
+    roots of p(-x).
+    """
+    reflected = Polynomial({degree: -coefficient if degree % 2 else coefficient
+                            for degree, coefficient in polynomial.dictionary.items()})
+    roots = [-root for root in reversed(find_positive_roots(reflected, epsilon))]
+    if polynomial.get_lowest_degree() > 0:
+        roots.append(0)
+    return roots + find_positive_roots(polynomial, epsilon)
+
+
+def solve_substituted(polynomial, epsilon, lowest_degree, exponent_gcd):
+    """
+    Solve p(x) = x^k q(x^g), where k is the lowest degree of p and g the gcd of
+    its exponents after dividing by x^k, through q(y), whose degree is (n - k) / g.
+    Each real root y of q gives the real g-th roots of y.
+    """
+    reduced = select_backend(Polynomial({(degree - lowest_degree) // exponent_gcd: coefficient
+                                         for degree, coefficient in polynomial.dictionary.items()}))
+    roots = [0] if lowest_degree > 0 else []
+    for root in solve_equation(reduced, epsilon):
+        if root == INFINITE_NUMBER_OF_ROOTS or root == 0:
+            continue
+        if exponent_gcd % 2 == 1:
+            roots.append(copysign(abs(root) ** (1 / exponent_gcd), root))
+        elif root > 0:
+            roots.extend([-root ** (1 / exponent_gcd), root ** (1 / exponent_gcd)])
+    return round_distinct_roots(polynomial, roots, epsilon)
+
+
+def solve_equation(polynomial, epsilon, engine=None):
     if polynomial.get_highest_degree() == 0:
         if polynomial.get_coefficient(0) != 0:
             return []
         else:
             return [INFINITE_NUMBER_OF_ROOTS]
 
-    if polynomial.get_highest_degree() == 1:
-        [a, b] = polynomial.get_full_coefficient()
-        return [-b / a]
-    else:
-        derivative = polynomial.derivative()
-        derivative_roots = solve_equation(derivative, epsilon)
-        return solve_from_derivative_roots(polynomial, epsilon, derivative_roots)
+    if engine is None:
+        if 2 <= polynomial.get_highest_degree() <= CLOSED_FORM_MAX_DEGREE:
+            roots = closed_form.find_real_roots(polynomial.get_full_coefficient())
+            # None when the roots are too close together for the formulas to be trusted
+            if roots is not None:
+                return round_distinct_roots(polynomial, roots, epsilon)
+        lowest_degree = polynomial.get_lowest_degree()
+        exponent_gcd = polynomial.get_exponent_gcd()
+        if lowest_degree > 0 or exponent_gcd > 1:
+            return solve_substituted(polynomial, epsilon, lowest_degree, exponent_gcd)
+        if polynomial.is_sparse():
+            return round_distinct_roots(polynomial, solve_sparse(polynomial, epsilon), epsilon)
+        engine = DEFAULT_ENGINE
+    if engine not in ROOT_ENGINES:
+        raise ValueError("Unknown root engine: " + engine)
+    solve = ROOT_ENGINES[engine]
+    if polynomial.get_highest_degree() <= 1 or polynomial.get_highest_degree() > SQUARE_FREE_MAX_DEGREE:
+        return solve(polynomial, epsilon)
+
+    # a repeated root is a root of p' as well, where bisection sees no sign change
+    # and the other engines lose half the digits, so each square-free factor is
+    # solved on its own, where every root is simple
+    if polynomial.is_square_free():
+        return solve(polynomial, epsilon)
+    factors = polynomial.square_free_decomposition()
+    roots = []
+    for factor, _ in factors:
+        roots.extend(solve(select_backend(factor), epsilon))
+    return sorted(roots)
 
 
-def parse_and_solve_and_round(expression, epsilon):
-    if expression.find("=") < 0:
-        roots = solve_equation(parse_to_polynomial(expression), epsilon)
-    else:
-        if expression.endswith("=0"):
-            roots = solve_equation(parse_to_polynomial(expression[0:len(expression)-2]), epsilon)
-        else:
-            index_of_equal = expression.find("=")
-            a = parse_to_polynomial(expression[0:index_of_equal])
-            b = parse_to_polynomial(expression[index_of_equal+1:])
-            roots = solve_equation(a.minus(b), epsilon)
+def solve_using_bisection(polynomial, epsilon):
+    # walk the derivatives down to the linear one, then solve back up using the
+    # roots of each derivative; a loop rather than recursion so high degrees fit
+    derivatives = [polynomial]
+    while derivatives[-1].get_highest_degree() > 1:
+        derivatives.append(derivatives[-1].derivative())
+
+    [a, b] = derivatives.pop().get_full_coefficient()
+    roots = [-b / a]
+    while derivatives:
+        roots = solve_from_derivative_roots(derivatives.pop(), epsilon, roots)
+    return roots
+
+
+def round_distinct_roots(polynomial, roots, epsilon):
+    # a repeated root perturbed by float coefficients comes back as several
+    # roots that only differ below the requested precision
+    n_digits = convert_from_epsilon_to_n_digit(epsilon)
+    distinct_roots = []
+    for root in sorted(roots):
+        if not distinct_roots or round(root, n_digits) != round(distinct_roots[-1], n_digits):
+            distinct_roots.append(try_round_root(polynomial, root, n_digits))
+    return distinct_roots
+
+
+def solve_using_eigenvalues(polynomial, epsilon):
+    roots = eigenvalue.find_real_roots(polynomial.get_full_coefficient(), epsilon)
+    return round_distinct_roots(polynomial, roots, epsilon)
+
+
+def solve_using_sturm_sequence(polynomial, epsilon):
+    roots = sturm.find_real_roots(polynomial.get_full_coefficient())
+    return round_distinct_roots(polynomial, roots, epsilon)
+
+
+ROOT_ENGINES = {
+    "bisection": solve_using_bisection,
+    "eigenvalue": solve_using_eigenvalues,
+    "sturm": solve_using_sturm_sequence,
+}
+# Sturm isolation separates clustered roots that the derivative recursion of bisection merges
+DEFAULT_ENGINE = "sturm"
+
+
+def solve_parsed_equation(sides, epsilon, engine=None, variable="x"):
+    """
+    Rounded roots of an equation already split and parsed by parse_equation,
+    so the callers that also render it only parse it once.
+    """
+    if len(sides) > 2:
+        raise ExpressionSyntaxError("Token is not supported: =")
+    polynomial = convert_tree_to_polynomial(sides[0], variable)
+    if len(sides) == 2:
+        polynomial = polynomial.minus(convert_tree_to_polynomial(sides[1], variable))
+    roots = solve_equation(polynomial, epsilon, engine)
 
     if roots == [INFINITE_NUMBER_OF_ROOTS]:
         return roots
@@ -135,15 +301,26 @@ def parse_and_solve_and_round(expression, epsilon):
     return list(map(lambda root: round(root, n_digits), roots))
 
 
-class Tests(unittest.TestCase):
+def parse_and_solve_and_round(expression, epsilon, engine=None):
+    return solve_parsed_equation(parse_equation(expression), epsilon, engine)
+
 
-    def test_get_lower_bound_with_opposite_sign(self):
-        self.assertEqual(get_lower_bound_with_opposite_sign(parse_to_polynomial("x^3"), 1), 0)
-        self.assertEqual(get_lower_bound_with_opposite_sign(parse_to_polynomial("x^2+9"), -2), None)
+class Tests(unittest.TestCase):
 
-    def test_get_upper_bound_with_opposite_sign(self):
-        self.assertEqual(get_upper_bound_with_opposite_sign(parse_to_polynomial("x^3"), 1), None)
-        self.assertEqual(get_upper_bound_with_opposite_sign(parse_to_polynomial("x^3"), -10), 5)
+    def test_get_root_bound(self):
+        cases = [("x^2-x-2", 2), ("x^3-3*x^2+2*x-10", 3.3089), ("x^50-3*x^20+x^3-0.5", 1.0445), ("x-7", 7),
+                 ("1000*x^2-1", 0.0317), ("x^4", 0)]
+        for expression, largest_root in cases:
+            bound = get_root_bound(parse_to_polynomial(expression))
+            self.assertGreater(bound, largest_root, expression)
+            self.assertLess(bound, 2 * largest_root + 2, expression)
+
+    def test_compile_horner(self):
+        polynomial = parse_to_polynomial("3*x^4+8*x^3-6*x^2-24*x+1")
+        evaluate = compile_horner(polynomial)
+        for x in [-2, -0.5, 0, 1.5, 10]:
+            self.assertAlmostEqual(evaluate(x), polynomial.eval(x))
+        self.assertEqual(compile_horner(parse_to_polynomial("x^100+1"))(2), 2.0 ** 100 + 1)
 
     def test_bisect(self):
         epsilon = 0.00001
@@ -302,3 +479,57 @@ class Tests(unittest.TestCase):
         roots = parse_and_solve_and_round(expression, epsilon)
         expected_roots = [7.4881, 12.5119]
         self.assertEqual(roots, expected_roots)
+
+    def test_root_engines(self):
+        epsilon = 0.00001
+        expressions = ["x^2-1=8", "x^2+2.5*x+1.5", "x^4-4*x^2+20*x-7", "0*x-7", "0*x+0", "x^5-5*x^3+4=0",
+                       "x+x^9=1000", "x^4/4-x^2/2", "3*x^2=0", "(x-10)^10=10000", "x^2+1", "(x-1)^2"]
+        for expression in expressions:
+            for engine in ["eigenvalue", "sturm"]:
+                self.assertEqual(parse_and_solve_and_round(expression, epsilon, engine),
+                                 parse_and_solve_and_round(expression, epsilon, "bisection"), expression)
+        self.assertRaises(ValueError, parse_and_solve_and_round, "x-1", epsilon, "newton")
+
+    def test_closed_form(self):
+        # without an engine, degrees 2 to 4 use the formulas and agree with bisection
+        epsilon = 0.00001
+        expressions = ["x^2-1=8", "x^2+2.5*x+1.5", "x^4-4*x^2+20*x-7", "x^3+x=100", "x^4/4-x^2/2", "3*x^2=0",
+                       "x^2+1", "(x-1)^2", "x^3+6*x^2+11*x+6", "(x-0.25)^3*(x-0.2501)", "x^4-10*x^3+35*x^2-50*x+24",
+                       "(x^2-2)^2", "0.001*x^2-1000*x+0.001"]
+        for expression in expressions:
+            self.assertEqual(parse_and_solve_and_round(expression, epsilon),
+                             parse_and_solve_and_round(expression, epsilon, "bisection"), expression)
+        # bisection stops once |p(x)| < epsilon, which is still up to 4e-4 away from the small roots here
+        self.assertEqual(parse_and_solve_and_round("x^3-x^2+0.0001", epsilon), [-0.01, 0.0101, 0.9999])
+
+    def test_solve_sparse(self):
+        epsilon = 0.00001
+        polynomial = parse_to_polynomial("x^50-3*x^20+x^3-0.5")
+        self.assertEqual([round(root, 4) for root in solve_sparse(polynomial, epsilon)],
+                         [-1.0445, 0.8311, 0.8458, 1.0335])
+        self.assertEqual(find_positive_roots(parse_to_polynomial("x^40+1"), epsilon), [])
+        # x^k q(x^g) is solved through q
+        cases = [("x^200-1", [-1, 1]), ("x^500-2", [-1.0014, 1.0014]), ("x^1000-5", [-1.0016, 1.0016]),
+                 ("(x^3+1)^20", [-1]), ("x^999-3*x^500+x", [0, 0.9981, 1.0019]), ("x^7", [0]),
+                 ("x^101-x^53+x^7-1", [1]), ("x^64-3*x^31+2", [1, 1.0198]), ("x^60-x^59-1", [-0.9884, 1.0515])]
+        for expression, roots in cases:
+            self.assertEqual(parse_and_solve_and_round(expression, epsilon), roots, expression)
+
+    def test_clustered_roots(self):
+        # past the closed forms, without an engine
+        epsilon = 0.00001
+        cases = [("(x-1)*(x-1.01)*(x-1.02)*(x-1.03)*(x-1.04)", [1, 1.01, 1.02, 1.03, 1.04]),
+                 ("(x-1)^2*(x-1.01)^2*(x-1.02)", [1, 1.01, 1.02]),
+                 ("(x-1)*(x-1.001)*(x-1.002)*(x-1.003)*(x-2)", [1, 1.001, 1.002, 1.003, 2])]
+        for expression, roots in cases:
+            self.assertEqual(parse_and_solve_and_round(expression, epsilon), roots, expression)
+
+    def test_repeated_roots(self):
+        # each engine only sees the square-free factors
+        epsilon = 0.00001
+        cases = [("(x-1)^3*(x-2)^2", [1, 2]), ("(x-2)^6", [2]), ("x^3*(x-1)^4*(x+1)^2", [-1, 0, 1]),
+                 ("(x-0.25)^3*(x-0.2501)", [0.25, 0.2501]), ("(x^2-2)^2", [-1.4142, 1.4142]),
+                 ("(x-1)^10*(x+2)^8", [-2, 1])]
+        for expression, roots in cases:
+            for engine in ROOT_ENGINES:
+                self.assertEqual(parse_and_solve_and_round(expression, epsilon, engine), roots, expression)
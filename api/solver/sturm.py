@@ -0,0 +1,232 @@
+import unittest
+from fractions import Fraction
+from math import gcd
+
+# enough halvings to shrink any float interval down to adjacent floats
+MAX_REFINE_ITERATIONS = 2100
+
+
+def evaluate(coefficients: list, x):
+    """
+    Horner evaluation of `coefficients` (highest degree first) at `x`.
+    """
+    result = 0
+    for coefficient in coefficients:
+        result = result * x + coefficient
+    return result
+
+
+def get_derivative(coefficients: list) -> list:
+    degree = len(coefficients) - 1
+    return [coefficient * (degree - index) for index, coefficient in enumerate(coefficients[:-1])]
+
+
+def make_primitive(coefficients: list) -> list:
+    """
+    Integer coefficients without a common factor and with the signs of the
+    rational `coefficients`, i.e. the same polynomial up to a positive constant.
+    """
+    coefficients = [Fraction(coefficient) for coefficient in coefficients]
+    multiple = 1
+    for coefficient in coefficients:
+        multiple = multiple * coefficient.denominator // gcd(multiple, coefficient.denominator)
+    integers = [int(coefficient * multiple) for coefficient in coefficients]
+    content = 0
+    for integer in integers:
+        content = gcd(content, integer)
+    return [integer // content for integer in integers]
+
+
+def get_negative_pseudo_remainder(numerator: list, denominator: list) -> list:
+    """
+    -rem(numerator, denominator) up to a positive constant, in integers: the
+    pseudo-remainder multiplies by lc^(d + 1), so its sign is fixed up when that is negative.
+    """
+    leading = denominator[0]
+    steps = len(numerator) - len(denominator) + 1
+    remainder = list(numerator)
+    for _ in range(steps):
+        factor = remainder[0]
+        remainder = [leading * coefficient for coefficient in remainder]
+        for index in range(len(denominator)):
+            remainder[index] -= factor * denominator[index]
+        remainder.pop(0)
+    while remainder and remainder[0] == 0:
+        remainder.pop(0)
+    if not remainder:
+        return remainder
+    if leading > 0 or steps % 2 == 0:
+        remainder = [-coefficient for coefficient in remainder]
+    return make_primitive(remainder)
+
+
+def get_sturm_sequence(coefficients: list) -> list:
+    """
+    p, p', -rem(p, p'), ... as primitive integer polynomials, each one a positive
+    multiple of the classical chain, so the sign changes are the same. When p
+    has repeated roots the chain ends at gcd(p, p') instead of a constant.
+    """
+    primitive = make_primitive(coefficients)
+    sequence = [primitive, make_primitive(get_derivative(primitive))]
+    while len(sequence[-1]) > 1:
+        remainder = get_negative_pseudo_remainder(sequence[-2], sequence[-1])
+        if not remainder:
+            break
+        sequence.append(remainder)
+    return sequence
+
+
+def count_sign_changes(sequence: list, x: Fraction) -> int:
+    # evaluate den^degree * p(num / den) in integers, which has the sign of p(x)
+    x = Fraction(x)
+    numerator, denominator = x.numerator, x.denominator
+    denominator_powers = [1]
+    for _ in range(len(sequence[0])):
+        denominator_powers.append(denominator_powers[-1] * denominator)
+
+    changes = 0
+    previous = 0
+    for polynomial in sequence:
+        value = polynomial[0]
+        for index in range(1, len(polynomial)):
+            value = value * numerator + polynomial[index] * denominator_powers[index]
+        if value != 0:
+            if previous != 0 and (value > 0) != (previous > 0):
+                changes += 1
+            previous = value
+    return changes
+
+
+def get_root_bound(coefficients: list) -> Fraction:
+    """
+    Bound strictly above the magnitude of every root: the smaller of the Cauchy
+    bound and the Fujiwara bound, the latter rounded up.
+    """
+    degree = len(coefficients) - 1
+    leading = abs(Fraction(coefficients[0]))
+    ratios = [abs(Fraction(coefficient)) / leading for coefficient in coefficients[1:]]
+    cauchy = 1 + max(ratios)
+    fujiwara_terms = [float(ratio) ** (1 / (index + 1)) for index, ratio in enumerate(ratios[:-1])]
+    fujiwara_terms.append(float(ratios[-1] / 2) ** (1 / degree))
+    fujiwara = Fraction(2 * max(fujiwara_terms) * 1.001 + 1e-9)
+    return min(cauchy, fujiwara)
+
+
+def get_square_free_sequence(coefficients: list):
+    """
+    The square-free part p / gcd(p, p') of the polynomial and its Sturm sequence.
+    It has the same distinct roots as p, all simple, so it changes sign across
+    each of them even where p touches zero without crossing, and no point makes
+    its whole sequence vanish.
+    """
+    sequence = get_sturm_sequence(coefficients)
+    common = sequence[-1]
+    if len(common) == 1:
+        return sequence[0], sequence
+    quotient = []
+    remainder = [Fraction(coefficient) for coefficient in sequence[0]]
+    while len(remainder) >= len(common):
+        factor = remainder[0] / common[0]
+        quotient.append(factor)
+        for index in range(len(common)):
+            remainder[index] -= factor * common[index]
+        remainder.pop(0)
+    square_free = make_primitive(quotient)
+    return square_free, get_sturm_sequence(square_free)
+
+
+def isolate_real_roots(coefficients: list, sequence: list) -> list:
+    """
+    Disjoint intervals (lower, upper] that each hold exactly one real root of the
+    square-free polynomial with `coefficients` (highest degree first) and Sturm
+    `sequence`, found in one pass by bisecting the root bound until the
+    sign-change counts drop to 0 or 1.
+    """
+    bound = get_root_bound(coefficients)
+    intervals = []
+    pending = [(-bound, bound, count_sign_changes(sequence, -bound), count_sign_changes(sequence, bound))]
+    while pending:
+        lower, upper, lower_changes, upper_changes = pending.pop()
+        root_count = lower_changes - upper_changes
+        if root_count == 0:
+            continue
+        if root_count == 1:
+            intervals.append((lower, upper))
+            continue
+        middle = (lower + upper) / 2
+        middle_changes = count_sign_changes(sequence, middle)
+        pending.append((middle, upper, middle_changes, upper_changes))
+        pending.append((lower, middle, lower_changes, middle_changes))
+    return sorted(intervals)
+
+
+def refine_root(coefficients: list, lower: float, upper: float) -> float:
+    """
+    Bisect the float polynomial over (lower, upper], which holds one simple
+    root, down to adjacent floats.
+    """
+    upper_value = evaluate(coefficients, upper)
+    if upper_value == 0:
+        return upper
+    upper_positive = upper_value > 0
+    for _ in range(MAX_REFINE_ITERATIONS):
+        middle = (lower + upper) / 2
+        if middle in (lower, upper):
+            return middle
+        middle_value = evaluate(coefficients, middle)
+        if middle_value == 0:
+            return middle
+        if (middle_value > 0) == upper_positive:
+            upper = middle
+        else:
+            lower = middle
+    return (lower + upper) / 2
+
+
+def find_real_roots(coefficients: list) -> list:
+    """
+    Distinct real roots of the polynomial with `coefficients` (highest degree
+    first), sorted. Roots are isolated exactly with a Sturm sequence and then
+    refined to full float precision on the square-free part.
+    """
+    square_free, sequence = get_square_free_sequence(coefficients)
+    intervals = isolate_real_roots(square_free, sequence)
+    square_free = [float(coefficient) for coefficient in square_free]
+    return [refine_root(square_free, float(lower), float(upper)) for lower, upper in intervals]
+
+
+class Tests(unittest.TestCase):
+
+    def test_sturm_sequence(self):
+        # x^3 - x: the chain is p, p', 2x/3 and 1, scaled to primitive integers
+        sequence = get_sturm_sequence([1, 0, -1, 0])
+        self.assertEqual(sequence, [[1, 0, -1, 0], [3, 0, -1], [1, 0], [1]])
+        self.assertEqual(count_sign_changes(sequence, -2) - count_sign_changes(sequence, 2), 3)
+        self.assertEqual(count_sign_changes(sequence, 0) - count_sign_changes(sequence, 2), 1)
+
+    def test_root_bound(self):
+        for coefficients in [[1, -3, 2], [2, 0, -50], [1, 0, 0, 1000], [1, 6, 11, 6]]:
+            bound = get_root_bound([Fraction(coefficient) for coefficient in coefficients])
+            roots = find_real_roots(coefficients)
+            self.assertTrue(all(abs(root) < bound for root in roots))
+
+    def test_isolate_real_roots(self):
+        square_free, sequence = get_square_free_sequence([1, 0, -5, 0, 4])
+        intervals = isolate_real_roots(square_free, sequence)
+        self.assertEqual(len(intervals), 4)
+        for (lower, upper), root in zip(intervals, [-2, -1, 1, 2]):
+            self.assertTrue(lower < root <= upper)
+
+    def test_find_real_roots(self):
+        self.assertEqual(find_real_roots([1, 0, -1]), [-1, 1])
+        self.assertEqual(find_real_roots([1, 0, 1]), [])
+        self.assertEqual(find_real_roots([3, 0, 0]), [0])
+        # repeated roots do not change sign but are still found once
+        roots = find_real_roots([1, -4, 6, -4, 1])
+        self.assertEqual(len(roots), 1)
+        self.assertAlmostEqual(roots[0], 1, 9)
+        roots = find_real_roots([1, -3, 0, 4])
+        self.assertAlmostEqual(roots[0], -1, 9)
+        self.assertAlmostEqual(roots[1], 2, 9)
+        # x^2 (x - 1)^2: the first bisection point is the double root 0
+        self.assertEqual(find_real_roots([1, -2, 1, 0, 0]), [0, 1])
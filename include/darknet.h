@@ -825,6 +825,7 @@ typedef struct network {
     int optimized_memory;
     int dynamic_minibatch;
     size_t workspace_size_limit;
+    int weights_shared;     // the layer weights belong to the network this one was loaded from by load_network_shared
 } network;
 
 // network.h
@@ -1008,6 +1009,7 @@ typedef struct box_label {
 // parser.c
 LIB_API network *load_network(char *cfg, char *weights, int clear);
 LIB_API network *load_network_custom(char *cfg, char *weights, int clear, int batch);
+LIB_API network *load_network_shared(char *cfg, network *source);
 LIB_API network *load_network(char *cfg, char *weights, int clear);
 LIB_API void free_network(network net);
 LIB_API void free_network_ptr(network* net);
@@ -1027,6 +1029,8 @@ LIB_API detection *get_network_boxes(network *net, int w, int h, float thresh, f
 LIB_API det_num_pair* network_predict_batch(network *net, image im, int batch_size, int w, int h, float thresh, float hier, int *map, int relative, int letter);
 LIB_API void free_detections(detection *dets, int n);
 LIB_API void free_batch_detections(det_num_pair *det_num_pairs, int n);
+LIB_API int get_network_detection_rows(network *net, int batch, int w, int h, float thresh, float hier, int *map, int relative,
+    int letter, int classes, float nms, float *rows, int max_rows);
 LIB_API void fuse_conv_batchnorm(network net);
 LIB_API void calculate_binary_weights(network net);
 LIB_API char *detection_to_json(detection *dets, int nboxes, int classes, char **names, long long int frame_id, char *filename);
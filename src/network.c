@@ -980,6 +980,46 @@ void free_batch_detections(det_num_pair *det_num_pairs, int n)
     free(det_num_pairs);
 }
 
+// Thresholding, NMS and export of the detections of image `batch` of the last forward pass as flat rows,
+// so bindings do not have to walk the detection structs: one (class_id, prob, x, y, w, h) row of `rows`
+// per class with a non-zero probability, in detection order. At most `max_rows` rows are written; the
+// number of rows found is returned, so a caller whose buffer was too small can call again with a larger one.
+int get_network_detection_rows(network *net, int batch, int w, int h, float thresh, float hier, int *map, int relative,
+    int letter, int classes, float nms, float *rows, int max_rows)
+{
+    int nboxes = 0;
+    detection *dets;
+    if (batch > 0 || net->batch > 1) {
+        dets = make_network_boxes_batch(net, thresh, &nboxes, batch);
+        fill_network_boxes_batch(net, w, h, thresh, hier, map, relative, dets, letter, batch);
+    }
+    else {
+        dets = get_network_boxes(net, w, h, thresh, hier, map, relative, &nboxes, letter);
+    }
+    if (nms) do_nms_sort(dets, nboxes, classes, nms);
+
+    int count = 0;
+    int i, j;
+    for (i = 0; i < nboxes; ++i) {
+        for (j = 0; j < classes; ++j) {
+            if (dets[i].prob[j] > 0) {
+                if (count < max_rows) {
+                    float *row = rows + count * 6;
+                    row[0] = j;
+                    row[1] = dets[i].prob[j];
+                    row[2] = dets[i].bbox.x;
+                    row[3] = dets[i].bbox.y;
+                    row[4] = dets[i].bbox.w;
+                    row[5] = dets[i].bbox.h;
+                }
+                ++count;
+            }
+        }
+    }
+    free_detections(dets, nboxes);
+    return count;
+}
+
 // JSON format:
 //{
 // "frame_id":8990,
@@ -1216,7 +1256,24 @@ void free_network(network net)
 {
     int i;
     for (i = 0; i < net.n; ++i) {
-        free_layer(net.layers[i]);
+        layer l = net.layers[i];
+        if (net.weights_shared) {
+            // freed with the network they were shared from
+            l.weights = NULL;
+            l.biases = NULL;
+            l.scales = NULL;
+            l.rolling_mean = NULL;
+            l.rolling_variance = NULL;
+#ifdef GPU
+            l.weights_gpu = NULL;
+            l.weights_gpu16 = NULL;
+            l.biases_gpu = NULL;
+            l.scales_gpu = NULL;
+            l.rolling_mean_gpu = NULL;
+            l.rolling_variance_gpu = NULL;
+#endif
+        }
+        free_layer(l);
     }
     free(net.layers);
 
@@ -1460,6 +1517,86 @@ void copy_weights_net(network net_train, network *net_map)
 }
 
 
+// Whether networks loaded by load_network_shared can run on the weights of `net`: not when they live in sub-layers
+int can_share_network_weights(network net)
+{
+    int k;
+    for (k = 0; k < net.n; ++k) {
+        LAYER_TYPE type = net.layers[k].type;
+        if (type == CRNN || type == RNN || type == GRU || type == LSTM || type == CONV_LSTM) return 0;
+    }
+    return 1;
+}
+
+// Points the layer weights of `net`, parsed from the same cfg as the loaded network `source`, at the weights of
+// `source`, so several networks run on one copy of the weights with their own activations and workspace.
+// Convolutional layers parsed onto `source` (parse_network_cfg_shared) already point at them; the other layers
+// free their own weights. The batchnorm fused into the weights of `source` is dropped from `net` too.
+// free_network then leaves the shared weights to `source`, which has to outlive `net`.
+void share_network_weights(network *net, network source)
+{
+    int k;
+    for (k = 0; k < net->n; ++k) {
+        layer *l = &net->layers[k];
+        layer src = source.layers[k];
+        if (l->share_layer == &source.layers[k]) {
+            // only the weights are shared, the training buffers taken along are not used for inference
+            l->share_layer = NULL;
+            l->weight_updates = NULL;
+            l->bias_updates = NULL;
+            l->scale_updates = NULL;
+            l->mean = NULL;
+            l->variance = NULL;
+            l->mean_delta = NULL;
+            l->variance_delta = NULL;
+#ifdef GPU
+            l->weight_updates_gpu = NULL;
+            l->weight_updates_gpu16 = NULL;
+            l->bias_updates_gpu = NULL;
+            l->scale_updates_gpu = NULL;
+            l->mean_gpu = NULL;
+            l->variance_gpu = NULL;
+            l->mean_delta_gpu = NULL;
+            l->variance_delta_gpu = NULL;
+#endif
+        }
+        else {
+            if (l->type == CONVOLUTIONAL && l->batch_normalize && !src.batch_normalize) {
+                free_convolutional_batchnorm(l);
+            }
+            free(l->weights);
+            free(l->biases);
+            free(l->scales);
+            free(l->rolling_mean);
+            free(l->rolling_variance);
+#ifdef GPU
+            if (l->weights_gpu) cuda_free(l->weights_gpu);
+            if (l->weights_gpu16) cuda_free(l->weights_gpu16);
+            if (l->biases_gpu) cuda_free(l->biases_gpu);
+            if (l->scales_gpu) cuda_free(l->scales_gpu);
+            if (l->rolling_mean_gpu) cuda_free(l->rolling_mean_gpu);
+            if (l->rolling_variance_gpu) cuda_free(l->rolling_variance_gpu);
+#endif
+        }
+        l->weights = src.weights;
+        l->biases = src.biases;
+        l->scales = src.scales;
+        l->rolling_mean = src.rolling_mean;
+        l->rolling_variance = src.rolling_variance;
+#ifdef GPU
+        l->weights_gpu = src.weights_gpu;
+        l->weights_gpu16 = src.weights_gpu16;
+        l->biases_gpu = src.biases_gpu;
+        l->scales_gpu = src.scales_gpu;
+        l->rolling_mean_gpu = src.rolling_mean_gpu;
+        l->rolling_variance_gpu = src.rolling_variance_gpu;
+#endif
+        l->batch_normalize = src.batch_normalize;
+        l->weights_normalization = src.weights_normalization;
+    }
+    net->weights_shared = 1;
+}
+
 // combine Training and Validation networks
 network combine_train_valid_networks(network net_train, network net_map)
 {
@@ -167,6 +167,8 @@ int get_network_background(network net);
 //LIB_API void calculate_binary_weights(network net);
 network combine_train_valid_networks(network net_train, network net_map);
 void copy_weights_net(network net_train, network *net_map);
+int can_share_network_weights(network net);
+void share_network_weights(network *net, network source);
 void free_network_recurrent_state(network net);
 void randomize_network_recurrent_state(network net);
 void remember_network_recurrent_state(network net);
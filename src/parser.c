@@ -136,6 +136,7 @@ typedef struct size_params{
     int time_steps;
     int train;
     network net;
+    network *weights_source;    // loaded network the convolutional layers share their weights with, see load_network_shared
 } size_params;
 
 local_layer parse_local(list *options, size_params params)
@@ -192,6 +193,7 @@ convolutional_layer parse_convolutional(list *options, size_params params)
     convolutional_layer *share_layer = NULL;
     if(share_index >= 0) share_layer = &params.net.layers[share_index];
     else if(share_index != -1000000000) share_layer = &params.net.layers[params.index + share_index];
+    if (params.weights_source) share_layer = &params.weights_source->layers[params.index];
 
     int batch,h,w,c;
     h = params.h;
@@ -1331,6 +1333,12 @@ network parse_network_cfg(char *filename)
 }
 
 network parse_network_cfg_custom(char *filename, int batch, int time_steps)
+{
+    return parse_network_cfg_shared(filename, batch, time_steps, NULL);
+}
+
+// the convolutional layers are made on the weights of `weights_source`, loaded from the same cfg, if it is not NULL
+network parse_network_cfg_shared(char *filename, int batch, int time_steps, network *weights_source)
 {
     list *sections = read_cfg(filename);
     node *n = sections->front;
@@ -1338,6 +1346,7 @@ network parse_network_cfg_custom(char *filename, int batch, int time_steps)
     network net = make_network(sections->size - 1);
     net.gpu_index = gpu_index;
     size_params params;
+    params.weights_source = weights_source;
 
     if (batch > 0) params.train = 0;    // allocates memory for Detection only
     else params.train = 1;              // allocates memory for Detection & Training
@@ -2257,6 +2266,20 @@ network *load_network_custom(char *cfg, char *weights, int clear, int batch)
     return net;
 }
 
+// parse `cfg` again into a network that runs on the weights of `source`, loaded from it, with its own activations
+network *load_network_shared(char *cfg, network *source)
+{
+    if (!can_share_network_weights(*source)) {
+        fprintf(stderr, " Can't share the weights of %s \n", cfg);
+        return NULL;
+    }
+    printf(" Try to load cfg: %s, sharing the weights of a loaded network \n", cfg);
+    network* net = (network*)xcalloc(1, sizeof(network));
+    *net = parse_network_cfg_shared(cfg, source->batch, 1, source);
+    share_network_weights(net, *source);
+    return net;
+}
+
 // load network & get batch size from cfg-file
 network *load_network(char *cfg, char *weights, int clear)
 {